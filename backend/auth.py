@@ -1,13 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, inspect as sa_inspect
 from sqlalchemy.orm import Session
 from typing import Optional
+from fastapi.concurrency import run_in_threadpool
 
 # Impor dari file-file lokal Anda
-from . import models, schemas, database
+import models, schemas, database
+from modules.principal_cache import principal_cache
+from modules import password_hasher
 
 # --- Konfigurasi Keamanan ---
 # PENTING: Di lingkungan produksi, ganti SECRET_KEY ini dengan nilai yang kompleks
@@ -16,23 +19,12 @@ SECRET_KEY = "INI_ADALAH_KUNCI_RAHASIA_YANG_HARUS_ANDA_GANTI"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 # Token akan valid selama 60 menit
 
-# Konteks untuk hashing password menggunakan bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Skema OAuth2 yang menunjuk ke endpoint login Anda
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
 
 # --- Fungsi Utilitas Keamanan ---
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Memverifikasi password polos dengan hash di database."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """Membuat hash dari password polos."""
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict) -> str:
     """Membuat JSON Web Token (JWT) baru."""
     to_encode = data.copy()
@@ -48,13 +40,19 @@ def get_user(db: Session, username: str) -> Optional[models.User]:
     """Mengambil data pengguna dari database berdasarkan username."""
     return db.query(models.User).filter(models.User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
-    """Mengautentikasi pengguna. Mengembalikan user object jika valid, None jika tidak."""
-    user = get_user(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
+async def authenticate_user_offloaded(db: Session, username: str, password: str) -> Optional[models.User]:
+    """
+    Mengautentikasi pengguna; mengembalikan user object jika valid, None jika tidak. Hashing password
+    hanya lewat password_hasher (process pool), tidak pernah di event loop. Jika hash tersimpan dibuat
+    dengan cost lama, hash baru dari verifikasi yang sama langsung disimpan.
+    """
+    user = await run_in_threadpool(get_user, db, username)
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password if user else None)
+    if not user or not valid:
         return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
     return user
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.User:
@@ -67,6 +65,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         detail="Tidak dapat memvalidasi kredensial",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Token yang baru saja diverifikasi dilayani dari cache tanpa jwt.decode maupun query pengguna.
+    # Principal di cache tidak terikat sesi; merge(load=False) menempelkannya ke sesi request ini tanpa SELECT.
+    if principal_cache is not None:
+        cached_user = principal_cache.get(token)
+        if cached_user is not None:
+            return db.merge(cached_user, load=False)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -79,6 +84,10 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = get_user(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    if principal_cache is not None and payload.get("exp") is not None:
+        db.expunge(user)
+        principal_cache.put(token, user.username, user, float(payload["exp"]))
+        return db.merge(user, load=False)
     return user
 
 def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
@@ -89,4 +98,28 @@ def get_current_active_user(current_user: models.User = Depends(get_current_user
     # Jika Anda menambahkan kolom `is_active` di model User, Anda bisa memeriksanya di sini.
     # if not current_user.is_active:
     #     raise HTTPException(status_code=400, detail="User tidak aktif")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+# --- Invalidasi Cache Token ---
+
+def invalidate_token(token: str):
+    """Membuang satu token dari cache, misalnya saat logout."""
+    if principal_cache is not None:
+        principal_cache.invalidate_token(token)
+
+def invalidate_user_tokens(username: str):
+    """Membuang semua token pengguna dari cache, sehingga request berikutnya membaca ulang dari database."""
+    if principal_cache is not None:
+        principal_cache.invalidate_subject(username)
+
+def get_auth_cache_stats() -> dict:
+    return principal_cache.stats() if principal_cache is not None else {}
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Perubahan data pengguna (password, username, penghapusan akun) membatalkan principal yang di-cache
+    invalidate_user_tokens(target.username)
+    for old_username in sa_inspect(target).attrs.username.history.deleted:
+        invalidate_user_tokens(old_username)
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark untuk setiap fungsi metrik di comment_analyzer (dan skor brain rot) dengan
+pipeline transformer stub, sehingga bisa dijalankan tanpa model, API key, maupun jaringan.
+Yang diukur adalah biaya kode aplikasi di sekitar model; --pipeline-latency menambahkan biaya
+inferensi tiruan per teks.
+
+Jalankan dari direktori backend:
+    python -m benchmarks.bench_metrics --n 20000 --output hasil_metrics.json
+"""
+import argparse
+
+from benchmarks import fakes
+
+fakes.configure_offline_environment()
+
+import pandas as pd
+
+from benchmarks.harness import best_of, write_results
+from modules import comment_analyzer
+from modules.brainrot_scoring import BehaviorFeatures, compute_brainrot_score
+from modules.gemini_analyzer import classify_activity_url, count_content_types
+
+GEMINI_ANALYSIS = {
+    "joker_keywords": ["terrible take", "why would anyone", "awful", "lol", "bro"],
+    "thanos_keywords": ["makes sense", "the argument", "honestly i think", "editing", "first comment"],
+}
+
+
+def behavior_score(activities: list) -> int:
+    features = BehaviorFeatures()
+    for activity in activities:
+        features.add(pd.Timestamp(activity["timestamp"]).to_pydatetime(), classify_activity_url(activity["url"]))
+    return compute_brainrot_score(count_content_types(activities), features.as_dict())
+
+def cases(df: pd.DataFrame, activities: list) -> dict:
+    """Nama benchmark -> fungsi tanpa argumen. Setiap kasus bekerja pada salinan df sendiri."""
+    scored = comment_analyzer.add_sentiment_scores_to_df(df.copy())
+    metrics = comment_analyzer.build_text_metrics(df)
+    return {
+        "add_sentiment_scores_to_df": lambda: comment_analyzer.add_sentiment_scores_to_df(df.copy()),
+        "analyze_emotions_hf": lambda: comment_analyzer.analyze_emotions_hf(df),
+        "build_text_metrics": lambda: comment_analyzer.build_text_metrics(df),
+        "calculate_lexical_diversity": lambda: comment_analyzer.calculate_lexical_diversity(df),
+        "calculate_lexical_diversity (metrics bersama)": lambda: comment_analyzer.calculate_lexical_diversity(df, metrics),
+        "calculate_reinforcement_score": lambda: comment_analyzer.calculate_reinforcement_score(df),
+        "calculate_reinforcement_score (metrics bersama)": lambda: comment_analyzer.calculate_reinforcement_score(df, metrics),
+        "calculate_archetype_scores_from_gemini": lambda: comment_analyzer.calculate_archetype_scores_from_gemini(df, GEMINI_ANALYSIS),
+        "sentiment_distribution": lambda: scored['sentiment_label'].value_counts(normalize=True),
+        "compute_brainrot_score": lambda: behavior_score(activities),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000, help="Jumlah komentar sintetis")
+    parser.add_argument("--activities", type=int, default=20000, help="Jumlah aktivitas untuk skor brain rot")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pipeline-latency", type=float, default=0.0, help="Detik per teks untuk pipeline stub")
+    parser.add_argument("--inference-cache", action="store_true", help="Aktifkan cache inferensi SQLite (default mati)")
+    parser.add_argument("--only", nargs="*", help="Jalankan hanya benchmark dengan nama ini")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    fakes.install(pipeline_latency=args.pipeline_latency, inference_cache=args.inference_cache)
+    df = pd.DataFrame({"text": fakes.synthetic_corpus(args.n)})
+    activities = fakes.synthetic_activities(args.activities)
+
+    results = {}
+    for name, fn in cases(df, activities).items():
+        if args.only and name not in args.only:
+            continue
+        seconds, _ = best_of(fn, args.repeat)
+        per_item = args.activities if name == "compute_brainrot_score" else args.n
+        results[name] = {"seconds": round(seconds, 4), "items_per_second": round(per_item / seconds) if seconds else None}
+        print(f"{name:<50} {seconds:8.4f} s")
+
+    params = {"n": args.n, "activities": args.activities, "repeat": args.repeat,
+              "pipeline_latency": args.pipeline_latency, "inference_cache": args.inference_cache}
+    write_results(args.output, "bench_metrics", params, results)
+
+
+if __name__ == "__main__":
+    main()
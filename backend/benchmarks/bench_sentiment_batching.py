@@ -0,0 +1,64 @@
+"""
+Membandingkan throughput (komentar/detik) pemanggilan pipeline sentimen langsung
+dengan inferensi ber-batch berdasarkan panjang token.
+
+Jalankan dari direktori backend:
+    python -m benchmarks.bench_sentiment_batching --n 10000 --batch-sizes 16 32 64
+"""
+import argparse
+import random
+import time
+
+from transformers import pipeline
+
+from modules.comment_analyzer import SENTIMENT_MODEL
+from modules.inference_engine import configure_torch_threads, run_batched
+
+WORDS = (
+    "video ini bagus banget great content subscribe lol wkwk setuju gak sih terrible take "
+    "love this the editing is insane bro why would anyone do that mantap jiwa first comment "
+    "honestly i think the argument makes sense but the delivery was awful nice"
+).split()
+
+
+def synthetic_corpus(n: int, seed: int = 42) -> list:
+    # Panjang komentar YouTube kira-kira log-normal: kebanyakan pendek, sedikit yang sangat panjang
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        length = max(1, min(300, int(rng.lognormvariate(2.3, 0.9))))
+        corpus.append(" ".join(rng.choice(WORDS) for _ in range(length)))
+    return corpus
+
+def measure(label: str, fn, n: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    rate = n / elapsed
+    print(f"{label:<28} {elapsed:8.2f} s  {rate:10.1f} komentar/detik")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_torch_threads(args.threads)
+    pipe = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+    texts = synthetic_corpus(args.n)
+    pipe(texts[:8], truncation=True, max_length=512)  # pemanasan
+
+    baseline = measure("pipeline(texts) langsung", lambda: pipe(texts, truncation=True, max_length=512), args.n)
+    for batch_size in args.batch_sizes:
+        rate = measure(
+            f"run_batched(batch={batch_size})",
+            lambda: run_batched(pipe, texts, batch_size=batch_size, max_length=512),
+            args.n,
+        )
+        print(f"{'':<28} speedup {rate / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Membandingkan metrik teks lama (satu pemindaian str.contains per frasa engagement, dua regex
+alternasi untuk arketipe, dan lowercase+join ulang untuk keragaman leksikal) dengan TextMetrics
+yang me-lowercase dan menokenisasi setiap komentar sekali. Hasil kedua sisi diverifikasi sama.
+
+Jalankan dari direktori backend:
+    python -m benchmarks.bench_text_metrics --n 100000
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+import pandas as pd
+
+from modules import text_metrics
+from modules.comment_analyzer import (
+    ENGAGEMENT_PHRASES,
+    build_text_metrics,
+    calculate_archetype_scores_from_gemini,
+    calculate_lexical_diversity,
+    calculate_reinforcement_score,
+)
+
+WORDS = (
+    "video ini bagus banget great content subscribe lol wkwk setuju gak sih terrible take "
+    "love this the editing is insane bro why would anyone do that mantap jiwa first comment "
+    "honestly i think the argument makes sense but the delivery was awful nice"
+).split()
+
+GEMINI_ANALYSIS = {
+    "joker_keywords": ["terrible take", "why would anyone", "awful", "lol", "bro"],
+    "thanos_keywords": ["makes sense", "the argument", "honestly i think", "editing", "first comment"],
+}
+
+
+def legacy_metrics(df: pd.DataFrame) -> dict:
+    full_text = " ".join(df['text'].dropna().astype(str).str.lower())
+    words = full_text.split()
+    diversity = round((len(set(words)) / len(words)) * 100, 2) if words else 0.0
+
+    text_series = df['text'].dropna().astype(str)
+    engagement_count = sum(text_series.str.contains(phrase, case=False, na=False, regex=False).sum() for phrase in ENGAGEMENT_PHRASES)
+    reinforcement = round(min(100.0, (engagement_count / len(df)) * 200), 2)
+
+    all_comments_lower = df['text'].dropna().astype(str).str.lower()
+    scores = {}
+    for name in ("joker", "thanos"):
+        pattern = '|'.join(re.escape(k.lower()) for k in GEMINI_ANALYSIS[f"{name}_keywords"])
+        count = all_comments_lower.str.contains(pattern, case=False, na=False, regex=True).sum()
+        scores[f"{name}_score"] = round((count / len(all_comments_lower)) * 100, 2)
+    return {"lexical_diversity": diversity, "reinforcement": reinforcement, **scores}
+
+def shared_metrics(df: pd.DataFrame) -> dict:
+    metrics = build_text_metrics(df)
+    return {
+        "lexical_diversity": calculate_lexical_diversity(df, metrics),
+        "reinforcement": calculate_reinforcement_score(df, metrics),
+        **calculate_archetype_scores_from_gemini(df, GEMINI_ANALYSIS, metrics),
+    }
+
+def synthetic_corpus(n: int, seed: int = 42) -> list:
+    # Panjang komentar log-normal; sebagian diberi frasa engagement berhuruf besar agar
+    # pencocokan case-insensitive ikut teruji dan skor reinforcement tidak selalu nol
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        length = max(1, min(300, int(rng.lognormvariate(2.3, 0.9))))
+        text = " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+        if rng.random() < 0.1:
+            text = f"{text} {rng.choice(ENGAGEMENT_PHRASES).upper()}"
+        corpus.append(text)
+    return corpus
+
+def best_of(fn, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.DataFrame({"text": synthetic_corpus(args.n)})
+    print(f"{args.n} komentar, {len(WORDS)} kata kosakata sintetis")
+
+    legacy_time, legacy_result = best_of(lambda: legacy_metrics(df), args.repeat)
+    results = {"legacy": {"seconds": round(legacy_time, 3)}}
+    print(f"{'lama (str.contains per frasa)':<32} {legacy_time:8.3f} s")
+
+    automaton = text_metrics.ahocorasick
+    variants = [("TextMetrics + in", None)]
+    if automaton is not None:
+        variants.append(("TextMetrics + aho-corasick", automaton))
+    for label, module in variants:
+        text_metrics.ahocorasick = module
+        elapsed, result = best_of(lambda: shared_metrics(df), args.repeat)
+        assert result == legacy_result, (result, legacy_result)
+        results[label] = {"seconds": round(elapsed, 3), "speedup": round(legacy_time / elapsed, 2)}
+        print(f"{label:<32} {elapsed:8.3f} s  {legacy_time / elapsed:5.2f}x")
+    text_metrics.ahocorasick = automaton
+
+    print(json.dumps({"n": args.n, "metrics": legacy_result, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Membandingkan klasifikasi URL lama (rantai pengecekan substring) dengan URLClassifier
+berbasis indeks domain pada sejuta URL sintetis. --extra-domains menambahkan domain artikel
+sintetis ke kedua sisi untuk melihat bagaimana biaya per URL tumbuh seiring jumlah aturan.
+
+Jalankan dari direktori backend:
+    python -m benchmarks.bench_url_classifier --n 1000000 --extra-domains 0 200
+"""
+import argparse
+import json
+import random
+import time
+
+from modules.gemini_analyzer import CONTENT_TYPES
+from modules.url_classifier import URLClassifier, DEFAULT_RULES_PATH
+
+URL_TEMPLATES = [
+    "https://www.tiktok.com/@user{n}/video/{n}",
+    "https://m.tiktok.com/v/{n}",
+    "https://www.youtube.com/shorts/{n}",
+    "https://www.youtube.com/watch?v={n}",
+    "https://m.youtube.com/watch?v={n}&t=10",
+    "https://www.youtube.com/feed/subscriptions",
+    "https://www.kompas.com/sains/read/{n}",
+    "https://news.detik.com/berita/d-{n}",
+    "https://www.bbc.com/news/world-{n}",
+    "https://github.com/user/repo/issues/{n}",
+    "https://en.wikipedia.org/wiki/Article_{n}",
+    "https://www.google.com/search?q=query{n}",
+]
+
+
+def legacy_classify(url: str, extra_article_domains: tuple = ()) -> str:
+    if "tiktok.com" in url:
+        return "tiktok"
+    elif "youtube.com/shorts" in url:
+        return "youtube_short"
+    elif "youtube.com/watch" in url:
+        return "youtube_video"
+    elif "kompas.com" in url or "detik.com" in url or "bbc.com" in url:
+        return "article"
+    elif any(domain in url for domain in extra_article_domains):
+        return "article"
+    return "other"
+
+def extra_domains(count: int) -> tuple:
+    return tuple(f"media{i}.example.id" for i in range(count))
+
+def synthetic_urls(n: int, domains: tuple = (), seed: int = 7) -> list:
+    rng = random.Random(seed)
+    templates = URL_TEMPLATES + [f"https://www.{domain}/read/{{n}}" for domain in domains[:20]]
+    return [rng.choice(templates).format(n=rng.randrange(10**6)) for _ in range(n)]
+
+def measure(label: str, fn, n: int):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:7.3f} s  {n / elapsed / 1e6:6.2f} juta URL/detik")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--extra-domains", type=int, nargs="+", default=[0, 200])
+    args = parser.parse_args()
+
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        base_rules = json.load(f)
+
+    for count in args.extra_domains:
+        domains = extra_domains(count)
+        rules = {**base_rules, "domains": {**base_rules["domains"], **dict.fromkeys(domains, "article")}}
+        classifier = URLClassifier(rules, categories=CONTENT_TYPES)
+        urls = synthetic_urls(args.n, domains)
+        print(f"--- {len(rules['domains']) + len(rules['paths'])} aturan domain ---")
+
+        legacy = measure("rantai substring (lama)", lambda: [legacy_classify(url, domains) for url in urls], args.n)
+        indexed = measure("URLClassifier.classify_many", lambda: classifier.classify_many(urls), args.n)
+        measure("URLClassifier.count", lambda: classifier.count(urls), args.n)
+
+        mismatches = sum(1 for old, new in zip(legacy, indexed) if old != new)
+        print(f"Perbedaan hasil dengan klasifikasi lama: {mismatches} dari {args.n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Membandingkan dua file hasil benchmark JSON (dari --output) dan menampilkan perubahan setiap
+angka di bagian "results". Untuk metrik waktu/latensi, kenaikan di atas --threshold persen
+ditandai sebagai regresi; untuk throughput, penurunanlah yang ditandai.
+
+    python -m benchmarks.compare hasil_lama.json hasil_baru.json --threshold 10
+"""
+import argparse
+import json
+
+# Angka yang semakin besar semakin baik; selain ini (detik, milidetik) semakin kecil semakin baik
+HIGHER_IS_BETTER = ("throughput_rps", "items_per_second", "per_second", "speedup")
+IGNORED = ("count", "requests", "concurrency")
+
+
+def flatten(value, prefix: str = "") -> dict:
+    if isinstance(value, dict):
+        flat = {}
+        for key, child in value.items():
+            flat.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    old_flat, new_flat = flatten(old.get("results", {})), flatten(new.get("results", {}))
+    rows = []
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        name = key.rsplit(".", 1)[-1]
+        if name in IGNORED or name.endswith("_count") or ".status_counts." in key:
+            continue
+        before, after = old_flat[key], new_flat[key]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if name in HIGHER_IS_BETTER else change
+        rows.append((key, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Persen perubahan yang dianggap regresi")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{old.get('benchmark')} {old.get('git_commit')} ({old.get('created_at')}) -> {new.get('git_commit')} ({new.get('created_at')})")
+
+    rows = compare(old, new, args.threshold)
+    for key, before, after, change, regression in rows:
+        flag = "  REGRESI" if regression else ""
+        print(f"{key:<70} {before:>12.4f} -> {after:>12.4f}  {change:+7.1f}%{flag}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regresi dari {len(rows)} metrik (ambang {args.threshold}%)")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
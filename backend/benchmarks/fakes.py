@@ -0,0 +1,240 @@
+"""
+Pengganti lokal untuk layanan eksternal, agar benchmark berjalan tanpa API key maupun jaringan:
+klien YouTube Data API palsu, pipeline transformer stub, dan model Gemini palsu (FakeModel dari
+llm_client). Latensi dan ukuran korpus bisa diatur.
+
+Urutan pemakaian: configure_offline_environment() sebelum modul aplikasi diimpor (config membaca
+environment saat import), lalu install() untuk memasang pengganti ke modul yang sudah dimuat.
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+WORDS = (
+    "video ini bagus banget great content subscribe lol wkwk setuju gak sih terrible take "
+    "love this the editing is insane bro why would anyone do that mantap jiwa first comment "
+    "honestly i think the argument makes sense but the delivery was awful nice"
+).split()
+
+ENGAGEMENT_SUFFIXES = ["like if you agree", "comment below", "what do you think", "cek bio"]
+
+SENTIMENT_LABELS = ["negative", "neutral", "positive"]
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+
+def configure_offline_environment(workdir: Optional[str] = None) -> str:
+    """
+    Mengarahkan semua file database/cache ke direktori sementara dan memilih model LLM palsu,
+    tanpa menimpa variabel yang sudah diatur pemanggil. Harus dipanggil sebelum `config` diimpor.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="psychemap-bench-")
+    os.environ.setdefault("DATA_DIR", workdir)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'psychemap.db')}")
+    os.environ.setdefault("INFERENCE_CACHE_PATH", os.path.join(workdir, "inference_cache.db"))
+    os.environ.setdefault("RESULT_CACHE_PATH", os.path.join(workdir, "result_cache.db"))
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.db"))
+    os.environ.setdefault("LLM_MODEL", "fake")
+    os.environ.setdefault("WARMUP_MODELS", "0")
+    os.environ.setdefault("INFERENCE_SERVER_ADDRESS", "")
+    return workdir
+
+
+def synthetic_comment(rng: random.Random) -> str:
+    # Panjang komentar log-normal seperti komentar YouTube; sebagian memuat frasa engagement
+    length = max(1, min(300, int(rng.lognormvariate(2.3, 0.9))))
+    text = " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+    if rng.random() < 0.1:
+        text = f"{text} {rng.choice(ENGAGEMENT_SUFFIXES)}"
+    return text
+
+def synthetic_corpus(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [synthetic_comment(rng) for _ in range(n)]
+
+
+ACTIVITY_URLS = [
+    "https://www.tiktok.com/@user/video/{n}",
+    "https://www.youtube.com/shorts/{n:011d}",
+    "https://www.youtube.com/watch?v={n:011d}",
+    "https://medium.com/@penulis/artikel-panjang-{n}",
+    "https://www.google.com/search?q=berita+{n}",
+]
+
+def synthetic_activities(n: int, seed: int = 42, start: Optional[datetime] = None) -> list:
+    """Riwayat aktivitas browsing dengan jeda acak (sesi scroll rapat dan jeda panjang di antaranya)."""
+    rng = random.Random(seed)
+    timestamp = start or datetime(2026, 1, 1, tzinfo=timezone.utc)
+    activities = []
+    for i in range(n):
+        timestamp += timedelta(seconds=rng.choice([15, 30, 45, 90, 600, 3600]))
+        url = rng.choices(ACTIVITY_URLS, weights=[4, 3, 2, 1, 1])[0].format(n=i)
+        activities.append({"timestamp": timestamp.isoformat(), "url": url})
+    return activities
+
+
+class _FakeRequest:
+    def __init__(self, fn, latency: float):
+        self._fn = fn
+        self._latency = latency
+
+    def execute(self):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._fn()
+
+
+class FakeYouTube:
+    """
+    Meniru bagian YouTube Data API v3 yang dipakai youtube_fetcher: commentThreads, channels,
+    playlistItems, dan search. Setiap video punya `comments_per_video` komentar deterministik
+    (urut terbaru lebih dulu, seperti order='time'), dan setiap execute() menunggu `latency` detik.
+    """
+
+    def __init__(self, latency: float = 0.05, comments_per_video: int = 200, videos_per_channel: int = 20, seed: int = 42):
+        self.latency = latency
+        self.comments_per_video = comments_per_video
+        self.videos_per_channel = videos_per_channel
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._comments = {}
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _video_comments(self, video_id: str) -> list:
+        with self._lock:
+            comments = self._comments.get(video_id)
+        if comments is None:
+            rng = random.Random(f"{self.seed}:{video_id}")
+            newest = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            comments = [
+                {
+                    "id": f"{video_id}-{n}",
+                    "snippet": {"topLevelComment": {"snippet": {
+                        "textDisplay": synthetic_comment(rng),
+                        "publishedAt": (newest - timedelta(minutes=n)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    }}},
+                }
+                for n in range(self.comments_per_video)
+            ]
+            with self._lock:
+                self._comments[video_id] = comments
+        return comments
+
+    def commentThreads(self):
+        return _Resource(list=self._list_comment_threads)
+
+    def channels(self):
+        return _Resource(list=self._list_channels)
+
+    def playlistItems(self):
+        return _Resource(list=self._list_playlist_items)
+
+    def search(self):
+        return _Resource(list=self._search)
+
+    def _page(self, items: list, page_token: Optional[str], max_results: int) -> dict:
+        self._count()
+        start = int(page_token or 0)
+        response = {"items": items[start:start + max_results]}
+        if start + max_results < len(items):
+            response["nextPageToken"] = str(start + max_results)
+        return response
+
+    def _list_comment_threads(self, videoId: str, maxResults: int = 20, pageToken: Optional[str] = None, **kwargs):
+        return _FakeRequest(lambda: self._page(self._video_comments(videoId), pageToken, maxResults), self.latency)
+
+    def _list_channels(self, id: str, **kwargs):
+        def run():
+            self._count()
+            return {"items": [{"contentDetails": {"relatedPlaylists": {"uploads": f"UU{id[2:]}"}}}]}
+        return _FakeRequest(run, self.latency)
+
+    def _list_playlist_items(self, playlistId: str, maxResults: int = 5, pageToken: Optional[str] = None, **kwargs):
+        # ID video 11 karakter yang stabil per playlist, agar bisa dipakai lagi sebagai target video
+        items = [
+            {"contentDetails": {"videoId": f"{zlib.crc32(f'{playlistId}:{n}'.encode()):011d}"[:11]}}
+            for n in range(self.videos_per_channel)
+        ]
+        return _FakeRequest(lambda: self._page(items, pageToken, maxResults), self.latency)
+
+    def _search(self, q: str, **kwargs):
+        def run():
+            self._count()
+            return {"items": [{"id": {"channelId": f"UC{zlib.crc32(q.encode()):022d}"}}]}
+        return _FakeRequest(run, self.latency)
+
+
+class _Resource:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+class StubPipeline:
+    """
+    Pengganti pipeline transformers dengan keluaran berbentuk sama: label dan skor diturunkan
+    dari hash teks (deterministik), dengan biaya `latency_per_text` detik per teks untuk
+    meniru waktu inferensi model.
+    """
+
+    def __init__(self, task: str, latency_per_text: float = 0.0, top_k: Optional[int] = 1):
+        self.task = task
+        self.latency_per_text = latency_per_text
+        self.top_k = top_k
+        self.calls = 0
+        self.texts = 0
+
+    def _classify(self, text: str):
+        digest = zlib.crc32(text.encode("utf-8"))
+        if self.top_k is None:
+            raw = [((digest >> (3 * i)) & 7) + 1 for i in range(len(EMOTION_LABELS))]
+            total = sum(raw)
+            return [{"label": label, "score": value / total} for label, value in zip(EMOTION_LABELS, raw)]
+        return {"label": SENTIMENT_LABELS[digest % 3], "score": 0.5 + (digest % 50) / 100}
+
+    def __call__(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        self.calls += 1
+        self.texts += len(batch)
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(batch))
+        results = [self._classify(text) for text in batch]
+        return results[0] if single else results
+
+
+def install(
+    youtube_latency: float = 0.05,
+    comments_per_video: int = 200,
+    videos_per_channel: int = 20,
+    llm_latency: float = 0.2,
+    pipeline_latency: float = 0.0,
+    inference_cache: bool = True,
+    llm_cache: bool = True,
+) -> dict:
+    """Memasang klien YouTube palsu, pipeline stub, dan model LLM palsu ke modul aplikasi."""
+    from modules import comment_analyzer, youtube_fetcher
+    from modules.llm_client import FakeModel, llm_client
+
+    fakes = {
+        "youtube": FakeYouTube(youtube_latency, comments_per_video, videos_per_channel),
+        "sentiment": StubPipeline("sentiment-analysis", pipeline_latency),
+        "emotion": StubPipeline("text-classification", pipeline_latency, top_k=None),
+        "llm": FakeModel(llm_latency),
+    }
+    youtube_fetcher.youtube = fakes["youtube"]
+    # get_pipeline mengembalikan entri yang sudah ada, jadi transformers tidak pernah diimpor
+    comment_analyzer._pipelines.update(sentiment=fakes["sentiment"], emotion=fakes["emotion"])
+    if not inference_cache:
+        comment_analyzer.inference_cache = None
+    llm_client.model = fakes["llm"]
+    if not llm_cache:
+        llm_client.cache = None
+    return fakes
@@ -0,0 +1,92 @@
+"""
+Utilitas bersama untuk benchmark: pengukuran waktu, persentil latensi, klien HTTP kecil
+berbasis urllib, dan penyimpanan hasil sebagai JSON agar bisa dibandingkan antar run
+(lihat benchmarks/compare.py).
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+def best_of(fn: Callable, repeat: int) -> tuple:
+    """Waktu tercepat dari `repeat` kali pemanggilan, beserta hasil pemanggilan terakhir."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def percentiles(samples: list) -> dict:
+    """Ringkasan latensi (detik -> milidetik) dengan p50/p95/p99 nearest-rank."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+def http_request(url: str, data: Optional[dict] = None, json_body=None, token: Optional[str] = None, timeout: float = 120) -> tuple:
+    """(status, body) tanpa melempar HTTPError, sehingga respons 4xx/5xx ikut tercatat."""
+    headers = {}
+    body = None
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+        headers["Content-Type"] = "application/json"
+    elif data is not None:
+        body = urllib.parse.urlencode(data).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def register_and_login(base_url: str, username: str, password: str) -> str:
+    http_request(f"{base_url}/api/register", json_body={"username": username, "password": password})
+    status, body = http_request(f"{base_url}/api/token", data={"username": username, "password": password})
+    if status != 200:
+        raise SystemExit(f"Login gagal ({status}): {body[:200]!r}")
+    return json.loads(body)["access_token"]
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(path: Optional[str], benchmark: str, params: dict, results: dict) -> dict:
+    """Membungkus hasil dengan metadata run dan, jika path diisi, menyimpannya sebagai JSON."""
+    report = {
+        "benchmark": benchmark,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {path}")
+    return report
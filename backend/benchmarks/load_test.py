@@ -0,0 +1,146 @@
+"""
+Load test HTTP untuk endpoint FastAPI. Secara default aplikasi dijalankan di proses ini dengan
+klien YouTube palsu, pipeline stub, dan model LLM palsu (benchmarks/fakes.py), sehingga tidak
+butuh API key maupun jaringan. Dengan --url, request dikirim ke server yang sudah berjalan.
+
+Setiap skenario dijalankan bergantian dengan `--concurrency` klien paralel dan dilaporkan sebagai
+throughput (request/detik) serta latensi p50/p95/p99.
+
+Jalankan dari direktori backend:
+    python -m benchmarks.load_test --requests 200 --concurrency 8 --output hasil_load.json
+    python -m benchmarks.load_test --scenarios analyze_behavior --activities 5000 --youtube-latency 0.2
+"""
+import argparse
+import itertools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.harness import http_request, percentiles, register_and_login, write_results
+
+SCENARIOS = ("analyze_youtube", "analyze_behavior", "dashboard_data", "users_me")
+
+
+def start_server(args) -> tuple:
+    """Menjalankan aplikasi dengan pengganti lokal di thread uvicorn pada port bebas."""
+    import socket
+
+    import uvicorn
+
+    fakes.install(
+        youtube_latency=args.youtube_latency,
+        comments_per_video=args.comments_per_video,
+        llm_latency=args.llm_latency,
+        pipeline_latency=args.pipeline_latency,
+    )
+    import main
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="bench-uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("Server gagal dijalankan")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, thread
+
+def request_factory(scenario: str, base_url: str, token: str, args):
+    """Fungsi tanpa argumen yang mengirim satu request skenario dan mengembalikan status HTTP."""
+    if scenario == "analyze_youtube":
+        # Target berputar di antara --distinct-videos video: putaran pertama dihitung penuh,
+        # berikutnya dilayani cache hasil analisis
+        videos = itertools.cycle(f"https://www.youtube.com/watch?v=bench{n:06d}" for n in range(args.distinct_videos))
+        lock = threading.Lock()
+
+        def send():
+            with lock:
+                target = next(videos)
+            return http_request(f"{base_url}/api/analyze_youtube?target={target}", token=token)[0]
+        return send
+    if scenario == "analyze_behavior":
+        activities = fakes.synthetic_activities(args.activities)
+        return lambda: http_request(f"{base_url}/api/analyze_behavior?narrative=false", json_body=activities, token=token)[0]
+    if scenario == "dashboard_data":
+        return lambda: http_request(f"{base_url}/api/dashboard_data", token=token)[0]
+    if scenario == "users_me":
+        return lambda: http_request(f"{base_url}/api/users/me", token=token)[0]
+    raise ValueError(f"Skenario tidak dikenal: {scenario}")
+
+def run_scenario(send, requests: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            status = send()
+        except OSError as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "status_counts": dict(statuses),
+        "latency": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Server yang sudah berjalan; tanpa ini aplikasi dijalankan lokal dengan fakes")
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Jumlah request per skenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct-videos", type=int, default=20)
+    parser.add_argument("--activities", type=int, default=500, help="Jumlah aktivitas per request analyze_behavior")
+    parser.add_argument("--youtube-latency", type=float, default=0.05, help="Detik per pemanggilan API YouTube palsu")
+    parser.add_argument("--comments-per-video", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Detik per pemanggilan model LLM palsu")
+    parser.add_argument("--pipeline-latency", type=float, default=0.0, help="Detik per teks untuk pipeline stub")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        fakes.configure_offline_environment()
+        base_url, server, thread = start_server(args)
+    token = register_and_login(base_url, "load_test_user", "load-test-password")
+
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            result = run_scenario(request_factory(scenario, base_url, token, args), args.requests, args.concurrency)
+            results[scenario] = result
+            latency = result["latency"]
+            print(f"{scenario:<18} {result['throughput_rps']:>8} req/s  p50 {latency.get('p50_ms')} ms  "
+                  f"p95 {latency.get('p95_ms')} ms  p99 {latency.get('p99_ms')} ms  status {result['status_counts']}")
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    write_results(args.output, "load_test", params, results)
+
+
+if __name__ == "__main__":
+    main()
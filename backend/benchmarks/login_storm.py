@@ -0,0 +1,110 @@
+"""
+Mengukur latensi endpoint lain (default GET /api/users/me) sebelum dan selama badai login.
+Setiap login menjalankan bcrypt; tanpa process pool, pekerjaan itu memakai threadpool dan CPU
+yang sama dengan endpoint lain sehingga p99-nya melonjak.
+
+Jalankan server dua kali untuk membandingkan, lalu jalankan skrip ini dari direktori backend:
+    PASSWORD_HASH_WORKERS=0 uvicorn main:app --port 8000   # bcrypt di threadpool (perilaku lama)
+    PASSWORD_HASH_WORKERS=2 uvicorn main:app --port 8000   # bcrypt di process pool
+    python -m benchmarks.login_storm --url http://127.0.0.1:8000 --storm-concurrency 64 --duration 10
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import http_request, percentiles, register_and_login, write_results
+
+USERNAME = "login_storm_user"
+PASSWORD = "login-storm-password"
+
+
+def login(base_url: str) -> tuple:
+    return http_request(f"{base_url}/api/token", data={"username": USERNAME, "password": PASSWORD})
+
+def probe(url: str, token: str, stop: threading.Event, concurrency: int) -> list:
+    """Memanggil endpoint probe terus-menerus sampai stop di-set; mengembalikan latensi per request."""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            status, _ = http_request(url, token=token)
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                with lock:
+                    latencies.append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return latencies
+
+def storm(base_url: str, stop: threading.Event, concurrency: int) -> list:
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            status, _ = login(base_url)
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                with lock:
+                    latencies.append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return latencies
+
+def run_phase(base_url: str, probe_url: str, token: str, duration: float, probe_concurrency: int, storm_concurrency: int) -> dict:
+    stop = threading.Event()
+    results = {}
+    threads = [threading.Thread(target=lambda: results.__setitem__("probe", probe(probe_url, token, stop, probe_concurrency)))]
+    if storm_concurrency:
+        threads.append(threading.Thread(target=lambda: results.__setitem__("login", storm(base_url, stop, storm_concurrency))))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    phase = {"probe": percentiles(results["probe"])}
+    if storm_concurrency:
+        phase["login"] = percentiles(results["login"])
+        phase["login"]["per_second"] = round(len(results["login"]) / duration, 2)
+    return phase
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--probe-path", default="/api/users/me")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--probe-concurrency", type=int, default=4)
+    parser.add_argument("--storm-concurrency", type=int, default=64)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    token = register_and_login(base_url, USERNAME, PASSWORD)
+    probe_url = f"{base_url}{args.probe_path}"
+
+    results = {
+        "baseline": run_phase(base_url, probe_url, token, args.duration, args.probe_concurrency, 0),
+        "login_storm": run_phase(base_url, probe_url, token, args.duration, args.probe_concurrency, args.storm_concurrency),
+    }
+    for phase, values in results.items():
+        p = values["probe"]
+        print(f"{phase:<12} probe p50 {p.get('p50_ms')} ms  p95 {p.get('p95_ms')} ms  p99 {p.get('p99_ms')} ms  ({p['count']} request)")
+    print(f"login selama badai: {results['login_storm']['login']}")
+
+    params = {"url": base_url, "probe_path": args.probe_path, "duration": args.duration,
+              "probe_concurrency": args.probe_concurrency, "storm_concurrency": args.storm_concurrency}
+    write_results(args.output, "login_storm", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import json
+from typing import Optional
+
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.orm import Session
+
+import models
+from modules import telemetry
+from modules.comment_analyzer import archetype_code
+
+# Naikkan jika analysis_columns mengisi kolom baru, agar baris lama di-backfill ulang saat startup
+ANALYSIS_COLUMNS_VERSION = 1
+
+
+def analysis_columns(analysis_type: str, result: dict) -> dict:
+    """Mengambil metrik utama dari hasil analisis untuk kolom bertipe di tabel analyses."""
+    if analysis_type == "behavior":
+        score = result.get("brainrot_score")
+        return {"brainrot_score": int(score) if isinstance(score, (int, float)) and score >= 0 else None}
+    if analysis_type == "community":
+        metrics = result.get("quantitative_metrics") or {}
+        sentiment = result.get("sentiment_distribution") or {}
+        joker_score = float(metrics.get("joker_score", 0))
+        thanos_score = float(metrics.get("thanos_score", 0))
+        return {
+            "predicted_archetype": archetype_code(joker_score, thanos_score),
+            "joker_score": joker_score,
+            "thanos_score": thanos_score,
+            "positive_percent": float(sentiment.get("positive_percent", 0)),
+            "negative_percent": float(sentiment.get("negative_percent", 0)),
+            "neutral_percent": float(sentiment.get("neutral_percent", 0)),
+        }
+    return {}
+
+def create_analysis(db: Session, owner_id: int, analysis_type: str, result: dict, result_json: Optional[str] = None, commit: bool = True) -> models.Analysis:
+    analysis = models.Analysis(
+        analysis_type=analysis_type,
+        result_json=result_json if result_json is not None else json.dumps(result),
+        owner_id=owner_id,
+        columns_version=ANALYSIS_COLUMNS_VERSION,
+        **analysis_columns(analysis_type, result),
+    )
+    db.add(analysis)
+    if commit:
+        with telemetry.span("db_commit"):
+            db.commit()
+    return analysis
+
+def get_analysis(db: Session, owner_id: int, analysis_id: int) -> Optional[models.Analysis]:
+    Analysis = models.Analysis
+    return db.query(Analysis).filter(Analysis.id == analysis_id, Analysis.owner_id == owner_id).first()
+
+def update_analysis_result(db: Session, analysis: models.Analysis, result: dict) -> models.Analysis:
+    # Hanya result_json yang berubah (mis. narasi yang menyusul); kolom metrik tetap dari hasil awal
+    analysis.result_json = json.dumps(result)
+    db.commit()
+    return analysis
+
+def backfill_analysis_columns(db: Session, batch_size: int = 500) -> int:
+    """
+    Mengisi kolom bertipe untuk baris yang belum diproses versi analysis_columns saat ini. Setiap baris
+    ditandai columns_version, termasuk yang result_json-nya rusak atau metriknya memang kosong
+    (mis. brainrot_score -1), sehingga startup berikutnya tidak memprosesnya lagi.
+    """
+    Analysis = models.Analysis
+    filled = 0
+    last_id = 0
+    while True:
+        rows = db.query(Analysis).filter(
+            Analysis.id > last_id,
+            or_(Analysis.columns_version.is_(None), Analysis.columns_version < ANALYSIS_COLUMNS_VERSION),
+        ).order_by(Analysis.id).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            row.columns_version = ANALYSIS_COLUMNS_VERSION
+            try:
+                columns = analysis_columns(row.analysis_type, json.loads(row.result_json or "{}"))
+            except (ValueError, TypeError, AttributeError):
+                continue
+            for name, value in columns.items():
+                setattr(row, name, value)
+            filled += 1
+        last_id = rows[-1].id
+        db.commit()
+    return filled
+
+def list_analyses(db: Session, owner_id: int, analysis_type: Optional[str] = None, limit: int = 20, before_id: Optional[int] = None) -> list:
+    """
+    Riwayat analisis terbaru lebih dulu dengan paginasi keyset pada (timestamp, id), seperti
+    list_journal_entries, sehingga urutannya dibaca langsung dari indeks (owner_id, [analysis_type,]
+    timestamp) tanpa mengurutkan seluruh riwayat. before_id adalah id baris terakhir halaman sebelumnya.
+    """
+    Analysis = models.Analysis
+    query = db.query(Analysis).filter(Analysis.owner_id == owner_id)
+    if analysis_type is not None:
+        query = query.filter(Analysis.analysis_type == analysis_type)
+    if before_id is not None:
+        position = db.query(Analysis.timestamp, Analysis.id).filter(
+            Analysis.id == before_id, Analysis.owner_id == owner_id
+        ).subquery()
+        query = query.filter(tuple_(Analysis.timestamp, Analysis.id) < db.query(position).scalar_subquery())
+    return query.order_by(Analysis.timestamp.desc(), Analysis.id.desc()).limit(limit).all()
+
+JOURNAL_PREVIEW_LENGTH = 120
+
+def list_journal_entries(db: Session, owner_id: int, limit: int = 50, after_id: Optional[int] = None, summary: bool = False) -> list:
+    """
+    Jurnal terbaru lebih dulu dengan paginasi keyset pada (timestamp, id). Posisi kursor dibaca
+    dari baris after_id lewat subquery, sehingga timestamp dibandingkan dengan nilai yang tersimpan
+    di database apa adanya (SQLite menyimpan datetime sebagai teks). Mode summary hanya mengambil
+    potongan awal content dan tidak memuat analysis_json.
+    """
+    JournalEntry = models.JournalEntry
+    if summary:
+        query = db.query(
+            JournalEntry.id, JournalEntry.timestamp, JournalEntry.owner_id,
+            func.substr(JournalEntry.content, 1, JOURNAL_PREVIEW_LENGTH).label("preview"),
+        )
+    else:
+        query = db.query(JournalEntry)
+    query = query.filter(JournalEntry.owner_id == owner_id)
+    if after_id is not None:
+        position = db.query(JournalEntry.timestamp, JournalEntry.id).filter(
+            JournalEntry.id == after_id, JournalEntry.owner_id == owner_id
+        ).subquery()
+        query = query.filter(tuple_(JournalEntry.timestamp, JournalEntry.id) < db.query(position).scalar_subquery())
+    rows = query.order_by(JournalEntry.timestamp.desc(), JournalEntry.id.desc()).limit(limit).all()
+    if summary:
+        return [{"id": row.id, "timestamp": row.timestamp, "owner_id": row.owner_id, "preview": row.preview or ""} for row in rows]
+    return rows
@@ -1,9 +1,102 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-DATABASE_URL = "sqlite:///./psychemap.db"
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+
+def _engine_options(url: str) -> dict:
+    """
+    Opsi engine per backend. SQLite berbasis file memakai pool biasa dengan timeout kunci; SQLite
+    in-memory memakai pool bawaan SQLAlchemy (satu koneksi). Server database (Postgres) mendapat
+    ukuran pool dari config dan pre-ping agar koneksi yang diputus server tidak dipakai ulang.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        if parsed.database and parsed.database != ":memory:":
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: pembaca tidak menunggu penulis dan sebaliknya; hanya penulis yang saling antre (busy_timeout).
+    # synchronous=NORMAL aman di mode WAL dan menghindari fsync di setiap commit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+class AppSession(Session):
+    # Kelas sesi bersama untuk engine sync dan async, sehingga event sesi (misalnya rollup) berlaku di keduanya
+    pass
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AppSession)
+Base = declarative_base()
+
+def get_db():
+    """Dependensi sesi database bersama; dipakai endpoint dan auth sehingga satu request memakai satu sesi."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Engine async opsional (misalnya postgresql+asyncpg://...) untuk deployment multi-node; driver async
+# hanya perlu terpasang jika ASYNC_DATABASE_URL diisi.
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_URL:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AppSession)
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("ASYNC_DATABASE_URL belum diatur")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+def add_missing_columns(metadata):
+    """
+    create_all hanya membuat tabel yang belum ada. Untuk tabel lama, kolom (nullable) dan indeks
+    yang ditambahkan belakangan di models dibuat di sini agar database yang sudah ada tetap terpakai.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+import models
+import database
+import crud
+from config import JOB_WORKERS, JOB_HEARTBEAT_INTERVAL, JOB_STALE_AFTER, JOB_PROGRESS_MIN_INTERVAL
+from modules.analysis_pipeline import run_community_analysis, AnalysisError
+from modules.result_cache import result_cache, parsed_from_key
+
+# Tabel analysis_jobs adalah sumber kebenaran bersama antar worker uvicorn: dedupe per target_key
+# (indeks unik parsial untuk job aktif), daftar pelanggan, serta stage/progress dan heartbeat.
+# Yang disimpan di memori hanya job yang dijalankan proses ini, untuk status terbaru dan heartbeat.
+ACTIVE_STATUSES = ("queued", "running")
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_live_status = {}  # job_id -> {"status", "stage", "progress", "written_at"}
+_tasks = set()
+_worker_semaphore = asyncio.Semaphore(JOB_WORKERS)
+_heartbeat_task = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _spawn(coro):
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+async def submit_youtube_job(target: str, key: str, owner_id: int) -> dict:
+    """
+    Mendaftarkan analisis latar belakang untuk target (kunci dari result_cache.resolve_target). Jika
+    target yang sama sedang diproses di worker mana pun, pengirim ikut menumpang pada job tersebut
+    alih-alih menjalankan pipeline kedua kalinya.
+    """
+    job_id, created, status = await run_in_threadpool(_join_or_create_job_row, target, key, owner_id)
+    if not created:
+        if job_id in _live_status:
+            status = _public_status(job_id)
+        return {"job_id": job_id, "shared": True, **status}
+
+    _live_status[job_id] = {**status, "written_at": time.monotonic()}
+    _spawn(_run_job(job_id, key))
+    _ensure_heartbeat()
+    return {"job_id": job_id, "shared": False, **status}
+
+async def _run_job(job_id: str, key: str):
+    live = _live_status[job_id]
+
+    def on_stage(stage: str, progress: float):
+        live["stage"] = stage
+        live["progress"] = round(progress, 3)
+        # Dibatasi per job; perubahan yang dilewati ikut tertulis pada heartbeat berikutnya
+        now = time.monotonic()
+        if now - live["written_at"] >= JOB_PROGRESS_MIN_INTERVAL:
+            live["written_at"] = now
+            _spawn(run_in_threadpool(_write_heartbeats, {job_id: dict(live)}))
+
+    try:
+        async with _worker_semaphore:
+            live["status"] = "running"
+            await run_in_threadpool(_update_job_row, job_id, status="running", heartbeat_at=_now())
+            # Lewat result_cache agar job dan endpoint sinkron berbagi hasil serta komputasi yang sedang berjalan
+            result, _ = await result_cache.get_or_compute(
+                key, lambda: run_community_analysis(parsed_from_key(key), on_stage=on_stage)
+            )
+        await run_in_threadpool(_finish_job_row, job_id, result)
+    except AnalysisError as e:
+        await run_in_threadpool(_update_job_row, job_id, status="failed", error=e.detail)
+    except Exception as e:
+        print(f"Job analisis {job_id} gagal: {e}")
+        await run_in_threadpool(_update_job_row, job_id, status="failed", error=str(e))
+    finally:
+        _live_status.pop(job_id, None)
+
+def _ensure_heartbeat():
+    global _heartbeat_task
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = _spawn(_heartbeat_loop())
+
+async def _heartbeat_loop():
+    # Berhenti sendiri saat proses ini tidak lagi menjalankan job; dimulai lagi oleh submit berikutnya
+    while _live_status:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        snapshot = {job_id: dict(live) for job_id, live in _live_status.items()}
+        if not snapshot:
+            continue
+        try:
+            await run_in_threadpool(_write_heartbeats, snapshot)
+        except Exception as e:
+            print(f"Error saat menulis heartbeat job: {e}")
+
+def _public_status(job_id: str) -> dict:
+    live = _live_status[job_id]
+    return {"status": live["status"], "stage": live["stage"], "progress": live["progress"]}
+
+def _can_access(db, job: models.AnalysisJob, user_id: int) -> bool:
+    if job.owner_id == user_id:
+        return True
+    return db.get(models.AnalysisJobSubscriber, (job.id, user_id)) is not None
+
+def _fail_stale_jobs(db, *criteria) -> int:
+    """Job aktif yang heartbeat-nya kosong atau lebih lama dari JOB_STALE_AFTER ditandai gagal (tanpa commit)."""
+    Job = models.AnalysisJob
+    cutoff = _now() - timedelta(seconds=JOB_STALE_AFTER)
+    return db.execute(
+        update(Job)
+        .where(Job.status.in_(ACTIVE_STATUSES), (Job.heartbeat_at.is_(None)) | (Job.heartbeat_at < cutoff), *criteria)
+        .values(status="failed", error="Job terhenti: worker yang menjalankannya tidak lagi merespons.")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+def get_job_status(job_id: str, user_id: int) -> Optional[dict]:
+    """
+    Status job dari tabel analysis_jobs (stage/progress ditulis berkala oleh worker yang menjalankannya),
+    ditimpa status di memori jika job berjalan di proses ini. None jika job tidak ada atau user_id
+    bukan pemilik maupun pelanggannya.
+    """
+    db = database.SessionLocal()
+    try:
+        job = db.get(models.AnalysisJob, job_id)
+        if job is None or not _can_access(db, job, user_id):
+            return None
+        if job.status in ACTIVE_STATUSES and job_id not in _live_status and _fail_stale_jobs(db, models.AnalysisJob.id == job_id):
+            db.commit()
+            db.refresh(job)
+        status = {
+            "job_id": job.id, "status": job.status, "stage": job.stage, "progress": job.progress,
+            "error": job.error, "created_at": job.created_at, "updated_at": job.updated_at,
+        }
+    finally:
+        db.close()
+    if job_id in _live_status:
+        status.update(_public_status(job_id))
+    return status
+
+def get_job_result(job_id: str, user_id: int) -> Optional[dict]:
+    db = database.SessionLocal()
+    try:
+        job = db.get(models.AnalysisJob, job_id)
+        if job is None or job.result_json is None or not _can_access(db, job, user_id):
+            return None
+        return json.loads(job.result_json)
+    finally:
+        db.close()
+
+def recover_interrupted_jobs():
+    """
+    Dipanggil saat worker dimulai. Hanya job aktif tanpa heartbeat baru yang ditandai gagal, sehingga
+    job yang masih dijalankan worker lain (yang terus memperbarui heartbeat-nya) tidak tersentuh.
+    """
+    db = database.SessionLocal()
+    try:
+        _fail_stale_jobs(db)
+        db.commit()
+    finally:
+        db.close()
+
+def _join_or_create_job_row(target: str, key: str, owner_id: int, attempts: int = 3) -> tuple:
+    """
+    Mengembalikan (job_id, dibuat, status). Setiap langkah adalah pernyataan tulis, sehingga bergabung ke
+    job aktif diserialisasi dengan _finish_job_row: pelanggan yang tercatat sebelum job selesai pasti
+    mendapat entri Analysis, dan job yang sudah selesai tidak bisa diikuti lagi.
+    """
+    Job = models.AnalysisJob
+    db = database.SessionLocal()
+    try:
+        for _ in range(attempts):
+            try:
+                _fail_stale_jobs(db, Job.target_key == key)
+                job = db.execute(
+                    update(Job)
+                    .where(Job.target_key == key, Job.status.in_(ACTIVE_STATUSES))
+                    .values(updated_at=_now())
+                    .returning(Job.id, Job.owner_id, Job.status, Job.stage, Job.progress)
+                    .execution_options(synchronize_session=False)
+                ).first()
+                if job is not None:
+                    if job.owner_id != owner_id and db.get(models.AnalysisJobSubscriber, (job.id, owner_id)) is None:
+                        db.add(models.AnalysisJobSubscriber(job_id=job.id, user_id=owner_id))
+                    db.commit()
+                    return job.id, False, {"status": job.status, "stage": job.stage, "progress": job.progress or 0.0}
+
+                job_id = uuid.uuid4().hex
+                db.add(Job(
+                    id=job_id, target=target, target_key=key, status="queued", progress=0.0, owner_id=owner_id,
+                    worker_id=WORKER_ID, heartbeat_at=_now(),
+                ))
+                db.commit()
+                return job_id, True, {"status": "queued", "stage": None, "progress": 0.0}
+            except IntegrityError:
+                # Worker lain membuat job aktif untuk target yang sama, atau pengguna yang sama bergabung dua kali
+                db.rollback()
+        raise RuntimeError(f"Tidak bisa mendaftarkan job untuk {key}.")
+    finally:
+        db.close()
+
+def _update_job_row(job_id: str, **fields):
+    db = database.SessionLocal()
+    try:
+        db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _write_heartbeats(snapshot: dict):
+    # Hanya job yang masih aktif; penulisan yang terlambat tidak menimpa job yang sudah selesai/gagal
+    Job = models.AnalysisJob
+    now = _now()
+    db = database.SessionLocal()
+    try:
+        for job_id, live in snapshot.items():
+            db.query(Job).filter(Job.id == job_id, Job.status.in_(ACTIVE_STATUSES)).update(
+                {"status": live["status"], "stage": live["stage"], "progress": live["progress"], "heartbeat_at": now},
+                synchronize_session=False,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+def _finish_job_row(job_id: str, result: dict):
+    # Setiap pengguna yang menumpang pada job ini mendapat entri Analysis di riwayatnya sendiri. Status
+    # diubah lebih dulu (mengunci baris), lalu pelanggan dibaca, sehingga tidak ada yang bergabung di antaranya.
+    Job = models.AnalysisJob
+    result_json = json.dumps(result)
+    db = database.SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(
+            {"status": "done", "stage": None, "progress": 1.0, "result_json": result_json, "heartbeat_at": _now()},
+            synchronize_session=False,
+        )
+        owner_id = db.query(Job.owner_id).filter(Job.id == job_id).scalar()
+        subscriber_ids = {
+            user_id for (user_id,) in db.query(models.AnalysisJobSubscriber.user_id).filter(models.AnalysisJobSubscriber.job_id == job_id)
+        }
+        analyses = {
+            user_id: crud.create_analysis(db, user_id, "community", result, result_json=result_json, commit=False)
+            for user_id in sorted(subscriber_ids | {owner_id})
+        }
+        db.flush()
+        db.query(Job).filter(Job.id == job_id).update({"analysis_id": analyses[owner_id].id}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
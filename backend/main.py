@@ -1,22 +1,54 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Literal, Optional, Union
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 import models
 import database
 import schemas
 import auth
-from modules.youtube_fetcher import parse_youtube_input, get_video_ids_from_channel, get_comments_from_videos
-from modules.gemini_analyzer import get_intelligent_analysis_from_gemini, get_brainrot_analysis
-from modules.comment_analyzer import (
-    add_sentiment_scores_to_df,
-    analyze_emotions_hf,
-    calculate_lexical_diversity,
-    calculate_reinforcement_score,
-    calculate_archetype_scores_from_gemini
-)
+import crud
+import jobs
+from modules.youtube_fetcher import parse_youtube_input, QuotaUsage
+from modules.analysis_pipeline import run_community_analysis, AnalysisError
+from modules.result_cache import result_cache, parsed_from_key
+from modules.gemini_analyzer import count_content_types, request_brainrot_narrative, classify_activity_url, CONTENT_TYPES
+from modules.behavior_ingest import BehaviorAccumulator, as_utc
+from modules.brainrot_scoring import BehaviorFeatures, compute_brainrot_score
+from modules.comment_analyzer import warm_up_models, get_inference_cache_stats
 from modules.anima_path_generator import generate_recovery_plan
+from modules.llm_client import llm_client
+from modules.event_stream import EventChannel
+from modules import user_rollups, password_hasher, telemetry
+from config import WARMUP_MODELS, TELEMETRY_ENABLED, SERVER_TIMING_ENABLED
 
 # Buat tabel di database saat aplikasi pertama kali dijalankan
 models.Base.metadata.create_all(bind=database.engine)
+database.add_missing_columns(models.Base.metadata)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model dimuat malas saat pertama dipakai; warm-up di background agar startup tidak tertahan
+    jobs.recover_interrupted_jobs()
+    _backfill_analysis_columns()
+    _rebuild_missing_rollups()
+    if WARMUP_MODELS:
+        threading.Thread(target=warm_up_models, name="model-warmup", daemon=True).start()
+    yield
+    password_hasher.shutdown()
+    await database.dispose_engines()
 
-app = FastAPI(title="PsycheMap Anima API", version="2.0.0")
+app = FastAPI(title="PsycheMap Anima API", version="2.0.0", lifespan=lifespan)
 
 # Konfigurasi CORS
 app.add_middleware(
@@ -25,35 +57,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
-cache = TTLCache(maxsize=100, ttl=3600)
+# Jumlah/durasi request per route untuk /metrics dan header Server-Timing opsional
+if TELEMETRY_ENABLED or SERVER_TIMING_ENABLED:
+    app.add_middleware(telemetry.TelemetryMiddleware, server_timing=SERVER_TIMING_ENABLED)
 
-# Dependensi untuk mendapatkan sesi database
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Dependensi sesi database bersama (juga dipakai auth), sehingga satu request memakai satu sesi
+get_db = database.get_db
 
 # === AUTHENTICATION ENDPOINTS ===
+# Hashing bcrypt berjalan di process pool password_hasher; bagian database tetap di threadpool
 @app.post("/api/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = auth.get_user(db, username=user.username)
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(auth.get_user, db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username sudah terdaftar")
     
-    hashed_password = auth.get_password_hash(user.password)
-    new_user = models.User(username=user.username, hashed_password=hashed_password)
+    hashed_password = await password_hasher.hash_password(user.password)
+    return await run_in_threadpool(_create_user, db, user.username, hashed_password)
+
+def _create_user(db: Session, username: str, hashed_password: str) -> models.User:
+    new_user = models.User(username=username, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     return new_user
 
 @app.post("/api/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = auth.authenticate_user(db, username=form_data.username, password=form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await auth.authenticate_user_offloaded(db, username=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,83 +103,254 @@ def read_users_me(current_user: models.User = Depends(auth.get_current_active_us
 
 # === ANALYSIS ENDPOINTS (AUTHENTICATED) ===
 @app.get("/api/analyze_youtube")
-def analyze_youtube_target(
+async def analyze_youtube_target(
     target: str = Query(..., description="YouTube Channel ID, Video URL, atau Channel URL"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    if target in cache:
-        print(f"Mengambil hasil dari cache untuk: {target}")
-        return cache[target]
-
-    print(f"Melakukan analisis penuh untuk: {target}")
-    parsed_input = parse_youtube_input(target)
-    if parsed_input["type"] == "unknown":
+    api_usage = QuotaUsage()
+    key = await run_in_threadpool(result_cache.resolve_target, target, partial(parse_youtube_input, usage=api_usage))
+    if key is None:
         raise HTTPException(status_code=400, detail="Input URL YouTube tidak valid.")
 
-    video_ids = [parsed_input["id"]] if parsed_input["type"] == "video" else get_video_ids_from_channel(parsed_input["id"])
-    if not video_ids:
-        raise HTTPException(status_code=404, detail="Tidak ada video ditemukan.")
-    
-    comments = get_comments_from_videos(video_ids)
-    if not comments:
-        raise HTTPException(status_code=404, detail="Tidak ada komentar yang bisa dianalisis.")
-
-    comments_df = pd.DataFrame(comments)
-    comments_df = add_sentiment_scores_to_df(comments_df)
-    gemini_analysis = get_intelligent_analysis_from_gemini(comments_df)
-    archetype_scores = calculate_archetype_scores_from_gemini(comments_df, gemini_analysis)
-    emotion_scores = analyze_emotions_hf(comments_df)
-    diversity_score = calculate_lexical_diversity(comments_df)
-    reinforcement_score = calculate_reinforcement_score(comments_df)
-    
-    sentiment_counts = comments_df['sentiment_label'].value_counts(normalize=True) * 100
-    sentiment_aggregation = {
-        'positive_percent': sentiment_counts.get('positive', 0),
-        'negative_percent': sentiment_counts.get('negative', 0),
-        'neutral_percent': sentiment_counts.get('neutral', 0)
-    }
+    try:
+        final_result, source = await result_cache.get_or_compute(
+            key, lambda: run_community_analysis(parsed_from_key(key), api_usage)
+        )
+    except AnalysisError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    archetype = "Komunitas Seimbang/Netral"
-    if archetype_scores.get("joker_score", 0) > 50:
-        archetype = "Arketipe Joker: Komunitas Reaktif & Anarkis"
-    elif archetype_scores.get("thanos_score", 0) > 50:
-        archetype = "Arketipe Thanos: Komunitas Logis & Ekstrem"
-    
-    final_result = {
-        "analysis_summary": { "input_type": parsed_input["type"], "total_comments_analyzed": len(comments) },
-        "archetype_diagnosis": { "predicted_archetype": archetype, "details": gemini_analysis.get("analysis_summary") },
-        "gemini_context_analysis": { "community_vibe": gemini_analysis.get("community_vibe"), "joker_keywords_detected": gemini_analysis.get("joker_keywords"), "thanos_keywords_detected": gemini_analysis.get("thanos_keywords"), "main_themes": gemini_analysis.get("main_themes", []) },
-        "quantitative_metrics": { "joker_score": archetype_scores.get("joker_score", 0), "thanos_score": archetype_scores.get("thanos_score", 0), "skinner_reinforcement_score": reinforcement_score, "lexical_diversity_percent": diversity_score },
-        "emotion_distribution": emotion_scores,
-        "sentiment_distribution": sentiment_aggregation
-    }
-    
-    new_analysis = models.Analysis(analysis_type="community", result_json=json.dumps(final_result), owner_id=current_user.id)
-    db.add(new_analysis)
-    db.commit()
-    
-    cache[target] = final_result
+    if source != "computed":
+        print(f"Mengambil hasil dari cache ({source}) untuk: {target}")
+        return final_result
+
+    await run_in_threadpool(_save_analysis, db, current_user.id, "community", final_result)
     return final_result
 
+def _save_analysis(db: Session, owner_id: int, analysis_type: str, result: dict) -> int:
+    return crud.create_analysis(db, owner_id, analysis_type, result).id
+
+def _save_analysis_in_new_session(owner_id: int, analysis_type: str, result: dict):
+    # Endpoint streaming menyimpan hasil setelah respons mulai dikirim, di luar umur sesi dari get_db
+    db = database.SessionLocal()
+    try:
+        _save_analysis(db, owner_id, analysis_type, result)
+    finally:
+        db.close()
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events, media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/analyze_youtube/stream")
+async def analyze_youtube_target_stream(
+    target: str = Query(..., description="YouTube Channel ID, Video URL, atau Channel URL"),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    Varian server-sent events dari /api/analyze_youtube: event "metrics" dikirim begitu metrik
+    kuantitatif selesai, "gemini_chunk" berisi potongan teks Gemini saat tiba, "gemini" berisi
+    hasil Gemini yang sudah di-parse, lalu "result" berisi hasil lengkap (atau "error").
+    """
+    api_usage = QuotaUsage()
+    key = await run_in_threadpool(result_cache.resolve_target, target, partial(parse_youtube_input, usage=api_usage))
+    if key is None:
+        raise HTTPException(status_code=400, detail="Input URL YouTube tidak valid.")
+
+    channel = EventChannel()
+    owner_id = current_user.id
+
+    async def produce():
+        try:
+            final_result, source = await result_cache.get_or_compute(
+                key, lambda: run_community_analysis(parsed_from_key(key), api_usage, on_event=channel.emit)
+            )
+        except AnalysisError as e:
+            channel.emit("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        if source == "computed":
+            await run_in_threadpool(_save_analysis_in_new_session, owner_id, "community", final_result)
+        channel.emit("result", final_result)
+
+    return _event_stream_response(channel.stream(produce()))
+
+@app.get("/api/cache_stats")
+def get_cache_stats(current_user: models.User = Depends(auth.get_current_active_user)):
+    return {"analysis_results": result_cache.stats(), "inference": get_inference_cache_stats(), "llm": llm_client.stats(), "auth": auth.get_auth_cache_stats()}
+
+# Format teks Prometheus; tanpa autentikasi agar bisa di-scrape, batasi aksesnya di level jaringan
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/jobs/analyze_youtube", response_model=schemas.AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_analyze_youtube_job(
+    target: str = Query(..., description="YouTube Channel ID, Video URL, atau Channel URL"),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    # Sama seperti /api/analyze_youtube: handle channel yang sudah pernah di-resolve tidak memakai search.list lagi
+    key = await run_in_threadpool(result_cache.resolve_target, target, parse_youtube_input)
+    if key is None:
+        raise HTTPException(status_code=400, detail="Input URL YouTube tidak valid.")
+    return await jobs.submit_youtube_job(target, key, current_user.id)
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.AnalysisJob)
+def get_analysis_job(job_id: str, current_user: models.User = Depends(auth.get_current_active_user)):
+    # Hanya pemilik dan pengguna yang menumpang pada job ini; selain itu 404 agar keberadaan job tidak bocor
+    job_status = jobs.get_job_status(job_id, current_user.id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job tidak ditemukan.")
+    return job_status
+
+@app.get("/api/jobs/{job_id}/result")
+def get_analysis_job_result(job_id: str, current_user: models.User = Depends(auth.get_current_active_user)):
+    job_status = jobs.get_job_status(job_id, current_user.id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job tidak ditemukan.")
+    if job_status["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job_status["error"] or "Job analisis gagal.")
+    if job_status["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job belum selesai (status: {job_status['status']}).")
+    return jobs.get_job_result(job_id, current_user.id)
+
 @app.post("/api/analyze_behavior")
 def analyze_user_behavior(
     activities: List[schemas.UserActivity], 
+    narrative: bool = Query(True, description="Sertakan narasi Gemini jika sudah tersedia di cache"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     try:
         activities_dict = [activity.dict() for activity in activities]
-        analysis_result = get_brainrot_analysis(activities_dict)
-        
-        new_analysis = models.Analysis(analysis_type="behavior", result_json=json.dumps(analysis_result), owner_id=current_user.id)
-        db.add(new_analysis)
-        db.commit()
+        content_types = count_content_types(activities_dict)
+
+        # Fitur sesi butuh urutan waktu; aktivitas tanpa timestamp hanya ikut dihitung jenisnya
+        features = BehaviorFeatures()
+        timed = sorted((as_utc(a["timestamp"]), a["url"]) for a in activities_dict if a["timestamp"] is not None)
+        for timestamp, url in timed:
+            features.add(timestamp, classify_activity_url(url))
+
+        analysis_result = _brainrot_result(content_types, features, narrative)
+        analysis = crud.create_analysis(db, current_user.id, "behavior", analysis_result)
         
-        return analysis_result
+        # analysis_id dipakai untuk mengambil narasi yang masih "pending" lewat /api/analyses/{id}/narrative
+        return {**analysis_result, "analysis_id": analysis.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _brainrot_result(content_types: dict, features: BehaviorFeatures, narrative: bool) -> dict:
+    """
+    Skor dihitung lokal dan deterministik. Narasi Gemini bersifat opsional: jika belum ada di cache
+    untuk vektor penghitung ini, pembuatannya dijadwalkan di background dan statusnya "pending".
+    """
+    feature_values = features.as_dict()
+    if narrative:
+        analysis_status, analysis = request_brainrot_narrative(content_types)
+    else:
+        analysis_status, analysis = "disabled", None
+    return {
+        "brainrot_score": compute_brainrot_score(content_types, feature_values),
+        "analysis": analysis,
+        "analysis_status": analysis_status,
+        "scoring": "local",
+        "content_types": content_types,
+        "features": feature_values,
+    }
+
+@app.post("/api/analyze_behavior/stream")
+async def analyze_user_behavior_stream(
+    request: Request,
+    reset: bool = Query(False, description="Mulai ulang agregat alih-alih menambahkannya"),
+    narrative: bool = Query(True, description="Sertakan narasi Gemini jika sudah tersedia di cache"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    Menerima riwayat aktivitas sebagai NDJSON (satu objek {"timestamp", "url"} per baris, boleh
+    dikirim dengan chunked transfer). Baris diklasifikasi sambil dibaca, dan penghitungnya
+    ditambahkan ke agregat tersimpan milik pengguna, sehingga upload berikutnya cukup berisi
+    aktivitas baru. 409 jika upload lain dari pengguna yang sama di-merge lebih dulu selama upload ini.
+    """
+    owner_id = current_user.id
+    since, feature_state = (None, None) if reset else await run_in_threadpool(_read_behavior_aggregate, db, owner_id)
+    # Lepaskan koneksi sesi request (juga yang dibuka auth) sebelum upload dibaca, yang bisa lama;
+    # sesi yang sama membuka koneksi baru saat merge
+    await run_in_threadpool(db.close)
+    accumulator = BehaviorAccumulator(
+        since=since,
+        features=BehaviorFeatures.from_state(json.loads(feature_state)) if feature_state else None,
+    )
+    async for chunk in request.stream():
+        accumulator.feed(chunk)
+    accumulator.close()
+
+    totals = await run_in_threadpool(_merge_behavior_aggregate, db, owner_id, accumulator, reset, since)
+    if totals is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Agregat aktivitas berubah oleh upload lain selama upload ini berlangsung; kirim ulang riwayatnya.",
+        )
+    content_types = {name: totals[name] for name in CONTENT_TYPES}
+    analysis_result = _brainrot_result(content_types, accumulator.features, narrative)
+
+    analysis_id = await run_in_threadpool(_save_analysis, db, owner_id, "behavior", analysis_result)
+    return {
+        **analysis_result,
+        "analysis_id": analysis_id,
+        "total_activities": totals["total_activities"],
+        "ingested": {"accepted": accumulator.total_activities, "skipped": accumulator.skipped, "invalid": accumulator.invalid},
+    }
+
+def _read_behavior_aggregate(db: Session, owner_id: int) -> tuple:
+    # Nilai last_activity_at apa adanya dari database, dipakai lagi sebagai pembanding saat merge
+    row = db.query(models.BehaviorAggregate.last_activity_at, models.BehaviorAggregate.feature_state).filter(
+        models.BehaviorAggregate.owner_id == owner_id
+    ).first()
+    return (row.last_activity_at, row.feature_state) if row else (None, None)
+
+def _merge_behavior_aggregate(
+    db: Session, owner_id: int, accumulator: BehaviorAccumulator, reset: bool, since: Optional[datetime]
+) -> Optional[dict]:
+    """
+    UPDATE kolom = kolom + n, hanya jika last_activity_at masih sama dengan nilai yang dibaca sebelum
+    upload (`since`). Jika upload lain dari pengguna yang sama sudah di-merge di antaranya, aktivitas
+    yang tumpang tindih bisa terhitung dua kali dan state fitur sesinya tertimpa, jadi merge dibatalkan
+    dan None dikembalikan agar klien mengirim ulang terhadap agregat terbaru.
+    """
+    Aggregate = models.BehaviorAggregate
+    increments = {name: accumulator.content_types[name] for name in CONTENT_TYPES}
+    increments["total_activities"] = accumulator.total_activities
+    if reset:
+        db.query(Aggregate).filter(Aggregate.owner_id == owner_id).delete(synchronize_session=False)
+
+    values = {name: getattr(Aggregate, name) + count for name, count in increments.items()}
+    feature_state = json.dumps(accumulator.features.to_state())
+    values["feature_state"] = feature_state
+    if accumulator.last_timestamp is not None:
+        values["last_activity_at"] = case(
+            (Aggregate.last_activity_at > accumulator.last_timestamp, Aggregate.last_activity_at),
+            else_=accumulator.last_timestamp,
+        )
+    unchanged = Aggregate.last_activity_at.is_(None) if since is None else Aggregate.last_activity_at == since
+    updated = db.query(Aggregate).filter(Aggregate.owner_id == owner_id, unchanged).update(values, synchronize_session=False)
+    if not updated:
+        if db.query(Aggregate.owner_id).filter(Aggregate.owner_id == owner_id).first() is not None:
+            db.rollback()
+            return None
+        db.add(Aggregate(owner_id=owner_id, last_activity_at=accumulator.last_timestamp, feature_state=feature_state, **increments))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Upload pertama lain membuat baris agregat lebih dulu
+        db.rollback()
+        return None
+
+    aggregate = db.get(Aggregate, owner_id)
+    db.refresh(aggregate)
+    return {name: getattr(aggregate, name) for name in (*CONTENT_TYPES, "total_activities")}
+
 @app.post("/api/journal", response_model=schemas.JournalEntry)
 def create_journal_entry(
     entry: schemas.JournalEntryCreate, 
@@ -160,16 +365,122 @@ def create_journal_entry(
     db.refresh(db_entry)
     return db_entry
 
-@app.get("/api/journal", response_model=List[schemas.JournalEntry])
-def get_journal_entries(current_user: models.User = Depends(auth.get_current_active_user), db: Session = Depends(get_db)):
-    return db.query(models.JournalEntry).filter(models.JournalEntry.owner_id == current_user.id).order_by(models.JournalEntry.timestamp.desc()).all()
+@app.get("/api/journal", response_model=Union[List[schemas.JournalEntry], List[schemas.JournalEntrySummary]])
+def get_journal_entries(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = Query(None, description="Nilai header X-Next-Cursor dari halaman sebelumnya"),
+    fields: Literal["full", "summary"] = Query("full", description='"summary" hanya berisi potongan awal content, tanpa analysis_json'),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Jurnal terbaru lebih dulu, dipaginasi dengan kursor keyset (header X-Next-Cursor). Entri jurnal
+    hanya bertambah, jadi ETag diturunkan dari jumlah dan waktu jurnal terakhir di rollup pengguna:
+    polling ulang halaman yang tidak berubah dijawab 304 tanpa menjalankan query halaman.
+    """
+    journal_count, last_journal_at = user_rollups.journal_version(db, current_user.id)
+    version = f"{current_user.id}:{journal_count}:{last_journal_at}:{cursor}:{limit}:{fields}"
+    etag = f'W/"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    entries = crud.list_journal_entries(db, current_user.id, limit=limit, after_id=cursor, summary=fields == "summary")
+    response.headers.update(headers)
+    if len(entries) == limit:
+        last = entries[-1]
+        response.headers["X-Next-Cursor"] = str(last["id"] if fields == "summary" else last.id)
+    return entries
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # Perbandingan lemah: W/"x" dan "x" dianggap sama
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
 
 @app.get("/api/anima_path")
-def get_anima_path(current_user: models.User = Depends(auth.get_current_active_user)):
-    user_profile = {"dominant_archetype": "Joker", "low_focus_score": True}
+def get_anima_path(current_user: models.User = Depends(auth.get_current_active_user), db: Session = Depends(get_db)):
+    user_profile = user_rollups.recovery_profile(db, current_user.id)
     plan = generate_recovery_plan(user_profile)
     return plan
 
+@app.get("/api/anima_path/stream")
+async def get_anima_path_stream(current_user: models.User = Depends(auth.get_current_active_user), db: Session = Depends(get_db)):
+    """Varian server-sent events: "profile" lebih dulu, lalu "plan_chunk" dari Gemini, lalu "plan"."""
+    user_profile = await run_in_threadpool(user_rollups.recovery_profile, db, current_user.id)
+    channel = EventChannel()
+
+    async def produce():
+        channel.emit("profile", user_profile)
+        plan = await run_in_threadpool(generate_recovery_plan, user_profile, partial(channel.emit, "plan_chunk"))
+        channel.emit("plan", plan)
+
+    return _event_stream_response(channel.stream(produce()))
+
 @app.get("/api/dashboard_data")
 def get_dashboard_data(current_user: models.User = Depends(auth.get_current_active_user), db: Session = Depends(get_db)):
-    return {"message": f"Data dasbor untuk {current_user.username}"}
+    # Dibaca dari rollup per pengguna yang diperbarui saat analisis/jurnal ditulis, tanpa memindai riwayat
+    return {"message": f"Data dasbor untuk {current_user.username}", **user_rollups.dashboard_summary(db, current_user.id)}
+
+@app.get("/api/analyses/{analysis_id}/narrative", response_model=schemas.BehaviorNarrative)
+def get_behavior_narrative(
+    analysis_id: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Narasi Gemini untuk analisis brain rot yang tersimpan. Selama statusnya "pending", narasi dicari
+    di cache untuk vektor penghitung analisis tersebut (dijadwalkan ulang jika belum ada), dan begitu
+    tersedia ditulis kembali ke result_json baris itu, sehingga klien cukup polling endpoint ini
+    alih-alih mengunggah ulang riwayatnya.
+    """
+    analysis = crud.get_analysis(db, current_user.id, analysis_id)
+    if analysis is None or analysis.analysis_type != "behavior":
+        raise HTTPException(status_code=404, detail="Analisis tidak ditemukan.")
+    result = json.loads(analysis.result_json or "{}")
+    if result.get("analysis_status") == "pending" and result.get("content_types"):
+        analysis_status, narrative = request_brainrot_narrative(result["content_types"])
+        if analysis_status != "pending":
+            result = {**result, "analysis_status": analysis_status, "analysis": narrative}
+            crud.update_analysis_result(db, analysis, result)
+    return {"analysis_id": analysis.id, "analysis_status": result.get("analysis_status", "disabled"), "analysis": result.get("analysis")}
+
+@app.get("/api/analyses", response_model=schemas.AnalysisPage)
+def get_analysis_history(
+    analysis_type: Optional[str] = Query(None, description='"community" atau "behavior"'),
+    limit: int = Query(20, ge=1, le=100),
+    before_id: Optional[int] = Query(None, description="Nilai next_before_id dari halaman sebelumnya"),
+    include_result: bool = Query(False, description="Sertakan result_json lengkap untuk setiap analisis"),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    analyses = crud.list_analyses(db, current_user.id, analysis_type=analysis_type, limit=limit, before_id=before_id)
+    items = []
+    for analysis in analyses:
+        item = {name: getattr(analysis, name) for name in schemas.AnalysisSummary.__fields__ if name != "result"}
+        if include_result and analysis.result_json:
+            item["result"] = json.loads(analysis.result_json)
+        items.append(item)
+    next_before_id = analyses[-1].id if len(analyses) == limit else None
+    return {"items": items, "next_before_id": next_before_id}
+
+def _backfill_analysis_columns():
+    db = database.SessionLocal()
+    try:
+        filled = crud.backfill_analysis_columns(db)
+        if filled:
+            print(f"Kolom metrik diisi untuk {filled} analisis lama.")
+    finally:
+        db.close()
+
+def _rebuild_missing_rollups():
+    db = database.SessionLocal()
+    try:
+        rebuilt = user_rollups.rebuild_missing_rollups(db)
+        if rebuilt:
+            print(f"Rollup dasbor dibangun untuk {rebuilt} pengguna.")
+    finally:
+        db.close()
@@ -1,13 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index, Date, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from .database import Base
+from database import Base
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True, required=True)
-    hashed_password = Column(String, required=True)
+    username = Column(String, unique=True, index=True, nullable=False)
+    hashed_password = Column(String, nullable=False)
     
     analyses = relationship("Analysis", back_populates="owner")
     journal_entries = relationship("JournalEntry", back_populates="owner")
@@ -19,9 +19,26 @@ class Analysis(Base):
     analysis_type = Column(String) # "community" atau "behavior"
     result_json = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"))
+
+    # Metrik utama dari result_json dalam kolom bertipe, agar riwayat dan dasbor bisa di-query dengan SQL
+    predicted_archetype = Column(String, nullable=True) # "joker", "thanos", atau "neutral"
+    joker_score = Column(Float, nullable=True)
+    thanos_score = Column(Float, nullable=True)
+    positive_percent = Column(Float, nullable=True)
+    negative_percent = Column(Float, nullable=True)
+    neutral_percent = Column(Float, nullable=True)
+    brainrot_score = Column(Integer, nullable=True)
+    # Versi crud.analysis_columns yang mengisi kolom di atas; NULL = baris lama yang belum di-backfill
+    columns_version = Column(Integer, nullable=True, index=True)
     
     owner = relationship("User", back_populates="analyses")
 
+    __table_args__ = (
+        Index("ix_analyses_owner_type_timestamp", "owner_id", "analysis_type", "timestamp"),
+        # Riwayat tanpa filter jenis (crud.list_analyses)
+        Index("ix_analyses_owner_timestamp_id", "owner_id", "timestamp", "id"),
+    )
+
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
     id = Column(Integer, primary_key=True, index=True)
@@ -30,4 +47,132 @@ class JournalEntry(Base):
     analysis_json = Column(String) # Hasil analisis Gemini untuk jurnal ini
     owner_id = Column(Integer, ForeignKey("users.id"))
 
-    owner = relationship("User", back_populates="journal_entries")
\ No newline at end of file
+    owner = relationship("User", back_populates="journal_entries")
+
+    __table_args__ = (
+        Index("ix_journal_entries_owner_timestamp_id", "owner_id", "timestamp", "id"),
+    )
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    id = Column(String, primary_key=True, index=True) # UUID hex
+    target = Column(String)
+    target_key = Column(String, index=True) # "video:<id>" atau "channel:<id>"
+    status = Column(String, default="queued") # "queued", "running", "done", atau "failed"
+    stage = Column(String, nullable=True)
+    progress = Column(Float, default=0.0)
+    error = Column(String, nullable=True)
+    result_json = Column(String, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Proses yang menjalankan job dan kapan terakhir ia melapor; job aktif tanpa heartbeat baru dianggap terputus
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Paling banyak satu job aktif per target di semua worker; pengirim berikutnya menumpang pada job itu
+        Index(
+            "ux_analysis_jobs_active_target", "target_key", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+class AnalysisJobSubscriber(Base):
+    # Pengguna lain yang menumpang pada job; bersama owner_id menentukan siapa yang boleh melihat job
+    __tablename__ = "analysis_job_subscribers"
+    job_id = Column(String, ForeignKey("analysis_jobs.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+
+class BehaviorAggregate(Base):
+    # Penghitung jenis konten kumulatif per pengguna dari upload riwayat aktivitas yang di-stream
+    __tablename__ = "behavior_aggregates"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    tiktok = Column(Integer, default=0)
+    youtube_short = Column(Integer, default=0)
+    youtube_video = Column(Integer, default=0)
+    article = Column(Integer, default=0)
+    other = Column(Integer, default=0)
+    total_activities = Column(Integer, default=0)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+    # State BehaviorFeatures (JSON) agar fitur sesi berlanjut antar upload
+    feature_state = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class VideoState(Base):
+    # Jumlah parsial per video, agar analisis ulang cukup menambahkan komentar baru ke jumlah yang sudah ada
+    __tablename__ = "video_states"
+    video_id = Column(String, primary_key=True)
+    comment_count = Column(Integer, default=0)
+    positive_count = Column(Integer, default=0)
+    negative_count = Column(Integer, default=0)
+    neutral_count = Column(Integer, default=0)
+    engagement_hits = Column(Integer, default=0)
+    emotion_count = Column(Integer, default=0)
+    emotion_sums = Column(String, nullable=True) # JSON, urutan sesuai EMOTION_LABELS
+    emotion_length = Column(Float, default=0.0)
+    emotion_length_sums = Column(String, nullable=True) # JSON, jumlah vektor emosi berbobot panjang teks
+    watermark = Column(DateTime(timezone=True), nullable=True) # semua komentar sampai publishedAt ini sudah tersimpan
+    # Pengambilan yang terpotong batas halaman/komentar sebelum mencapai watermark dilanjutkan dari halaman ini;
+    # pending_watermark menjadi watermark baru setelah lanjutan tersebut mencapai watermark lama
+    resume_page_token = Column(String, nullable=True)
+    pending_watermark = Column(DateTime(timezone=True), nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CommentRecord(Base):
+    __tablename__ = "comment_records"
+    comment_id = Column(String, primary_key=True)
+    video_id = Column(String, ForeignKey("video_states.video_id"), index=True)
+    text = Column(String)
+    text_hash = Column(String, index=True)
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+    sentiment_label = Column(String)
+    compound = Column(Float)
+    emotion_json = Column(String, nullable=True) # null jika komentar tidak masuk sampel emosi
+    engagement_hits = Column(Integer, default=0)
+
+    # Sampel teks terbaru per video untuk metrik teks di analisis inkremental
+    __table_args__ = (
+        Index("ix_comment_records_video_published", "video_id", "published_at"),
+    )
+
+class UserRollup(Base):
+    # Agregat per pengguna yang diperbarui setiap kali Analysis/JournalEntry ditulis (lihat modules/user_rollups.py)
+    __tablename__ = "user_rollups"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    community_count = Column(Integer, default=0)
+    behavior_count = Column(Integer, default=0)
+    journal_count = Column(Integer, default=0)
+    joker_count = Column(Integer, default=0)
+    thanos_count = Column(Integer, default=0)
+    neutral_count = Column(Integer, default=0)
+    joker_score_sum = Column(Float, default=0.0)
+    thanos_score_sum = Column(Float, default=0.0)
+    positive_percent_sum = Column(Float, default=0.0)
+    negative_percent_sum = Column(Float, default=0.0)
+    neutral_percent_sum = Column(Float, default=0.0)
+    brainrot_count = Column(Integer, default=0)
+    brainrot_score_sum = Column(Float, default=0.0)
+    latest_archetype = Column(String, nullable=True)
+    latest_brainrot_score = Column(Integer, nullable=True)
+    last_community_at = Column(DateTime(timezone=True), nullable=True)
+    last_behavior_at = Column(DateTime(timezone=True), nullable=True)
+    last_journal_at = Column(DateTime(timezone=True), nullable=True)
+
+class UserDailyRollup(Base):
+    # Bucket harian (UTC) untuk grafik tren di dasbor
+    __tablename__ = "user_daily_rollups"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    community_count = Column(Integer, default=0)
+    behavior_count = Column(Integer, default=0)
+    journal_count = Column(Integer, default=0)
+    joker_count = Column(Integer, default=0)
+    thanos_count = Column(Integer, default=0)
+    neutral_count = Column(Integer, default=0)
+    brainrot_count = Column(Integer, default=0)
+    brainrot_score_sum = Column(Float, default=0.0)
@@ -0,0 +1,270 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+from config import (
+    ANALYSIS_THREADS, ANALYSIS_MAX_CONCURRENCY, INCREMENTAL_ANALYSIS, INCREMENTAL_TEXT_SAMPLE_PER_VIDEO, EMOTION_WEIGHTING,
+)
+from modules import comment_store, telemetry
+from modules.text_metrics import TextMetrics
+from modules.youtube_fetcher import get_video_ids_from_channel, get_comments_from_videos, QuotaUsage
+from modules.gemini_analyzer import get_intelligent_analysis_from_gemini
+from modules.comment_analyzer import (
+    add_sentiment_scores_to_df,
+    analyze_emotions_hf,
+    calculate_lexical_diversity,
+    calculate_reinforcement_score,
+    calculate_archetype_scores_from_gemini,
+    build_text_metrics,
+    archetype_code,
+    emotion_vectors_for_comments,
+    EMOTION_LABELS,
+    ENGAGEMENT_PHRASES
+)
+
+# Jumlah video terbaru yang dianalisis untuk target berupa channel
+MAX_VIDEOS_PER_ANALYSIS = 10
+
+# Pool terpisah dari threadpool FastAPI, sehingga analisis yang panjang tidak menghabiskan
+# thread untuk endpoint lain; semaphore membatasi jumlah analisis yang berjalan bersamaan.
+_executor = ThreadPoolExecutor(max_workers=ANALYSIS_THREADS, thread_name_prefix="analysis")
+_semaphore = asyncio.Semaphore(ANALYSIS_MAX_CONCURRENCY)
+
+
+class AnalysisError(Exception):
+    """Kegagalan analisis yang perlu diteruskan ke klien dengan status HTTP tertentu."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class StageTimer:
+    """
+    Menjalankan tahap pipeline di thread pool analisis dan mencatat durasinya (ms).
+    on_stage(stage, progress) dipanggil setiap kali satu tahap selesai.
+    """
+
+    def __init__(self, total_stages: int, on_stage: Optional[Callable[[str, float], None]] = None):
+        self.timings = {}
+        self.total_stages = total_stages
+        self.on_stage = on_stage
+
+    async def run(self, stage: str, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[stage] = round(elapsed * 1000, 1)
+            # Dicatat di event loop (bukan di thread executor) agar span masuk ke konteks request
+            telemetry.record_span(stage, elapsed)
+        if self.on_stage:
+            self.on_stage(stage, min(1.0, len(self.timings) / self.total_stages))
+        return result
+
+
+def _sentiment_distribution(df: pd.DataFrame) -> dict:
+    sentiment_counts = df['sentiment_label'].value_counts(normalize=True) * 100
+    return {
+        'positive_percent': sentiment_counts.get('positive', 0),
+        'negative_percent': sentiment_counts.get('negative', 0),
+        'neutral_percent': sentiment_counts.get('neutral', 0)
+    }
+
+ARCHETYPE_DIAGNOSES = {
+    "joker": "Arketipe Joker: Komunitas Reaktif & Anarkis",
+    "thanos": "Arketipe Thanos: Komunitas Logis & Ekstrem",
+    "neutral": "Komunitas Seimbang/Netral",
+}
+
+def _predict_archetype(archetype_scores: dict) -> str:
+    return ARCHETYPE_DIAGNOSES[archetype_code(archetype_scores.get("joker_score", 0), archetype_scores.get("thanos_score", 0))]
+
+async def run_community_analysis(
+    parsed_input: dict,
+    api_usage: Optional[QuotaUsage] = None,
+    on_stage: Optional[Callable[[str, float], None]] = None,
+    on_event: Optional[Callable[[str, Any], None]] = None,
+) -> dict:
+    """
+    Pipeline analisis komunitas sebagai DAG async. Setelah komentar diambil, sentimen, emosi,
+    keragaman leksikal, dan skor reinforcement berjalan bersamaan; hanya Gemini (dan skor
+    arketipe sesudahnya) yang menunggu hasil sentimen.
+
+    Dengan INCREMENTAL_ANALYSIS, hanya komentar yang lebih baru dari watermark per video yang
+    diambil dan diskor; agregatnya dihitung dari jumlah parsial yang tersimpan (modules.comment_store).
+
+    on_event(nama, data), untuk endpoint streaming, menerima "metrics" begitu metrik kuantitatif
+    selesai, "gemini_chunk" untuk setiap potongan teks Gemini, lalu "gemini" setelah hasilnya di-parse.
+    """
+    api_usage = api_usage or QuotaUsage()
+    async with _semaphore:
+        stages = ["fetch_comments", "sentiment", "gemini", "archetype", "emotion", "text_metrics"]
+        if INCREMENTAL_ANALYSIS:
+            stages += ["load_state", "store", "load_aggregates"]
+        if parsed_input["type"] != "video":
+            stages.append("fetch_videos")
+        timer = StageTimer(len(stages), on_stage)
+        started = time.perf_counter()
+
+        if parsed_input["type"] == "video":
+            video_ids = [parsed_input["id"]]
+        else:
+            video_ids = await timer.run(
+                "fetch_videos", get_video_ids_from_channel, parsed_input["id"],
+                limit=MAX_VIDEOS_PER_ANALYSIS, usage=api_usage
+            )
+        if not video_ids:
+            raise AnalysisError(404, "Tidak ada video ditemukan.")
+        video_ids = video_ids[:MAX_VIDEOS_PER_ANALYSIS]
+
+        analyze = _analyze_incremental if INCREMENTAL_ANALYSIS else _analyze_all
+        metrics, gemini_analysis, archetype_scores = await analyze(video_ids, timer, api_usage, on_event)
+        print(f"Pemakaian YouTube API untuk {parsed_input['id']}: {api_usage.as_dict()}")
+        timer.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Durasi tahap analisis untuk {parsed_input['id']} (ms): {timer.timings}")
+
+    return {
+        "analysis_summary": {
+            "input_type": parsed_input["type"], "total_comments_analyzed": metrics["total_comments_analyzed"],
+            # "incremental": metrik mencakup semua komentar tersimpan; "full": hanya komentar yang diambil kali ini
+            "analysis_mode": "incremental" if INCREMENTAL_ANALYSIS else "full",
+            "api_usage": api_usage.as_dict(), "stage_timings_ms": timer.timings
+        },
+        "archetype_diagnosis": { "predicted_archetype": _predict_archetype(archetype_scores), "details": gemini_analysis.get("analysis_summary") },
+        "gemini_context_analysis": { "community_vibe": gemini_analysis.get("community_vibe"), "joker_keywords_detected": gemini_analysis.get("joker_keywords"), "thanos_keywords_detected": gemini_analysis.get("thanos_keywords"), "main_themes": gemini_analysis.get("main_themes", []) },
+        "quantitative_metrics": { "joker_score": archetype_scores.get("joker_score", 0), "thanos_score": archetype_scores.get("thanos_score", 0), "skinner_reinforcement_score": metrics["skinner_reinforcement_score"], "lexical_diversity_percent": metrics["lexical_diversity_percent"] },
+        "emotion_distribution": metrics["emotion_distribution"],
+        "sentiment_distribution": metrics["sentiment_distribution"]
+    }
+
+async def _gemini_and_archetype(timer: StageTimer, df: pd.DataFrame, text_metrics: TextMetrics, on_event) -> tuple:
+    on_chunk = partial(on_event, "gemini_chunk") if on_event else None
+    gemini_analysis = await timer.run("gemini", get_intelligent_analysis_from_gemini, df, on_chunk=on_chunk)
+    archetype_scores = await timer.run("archetype", calculate_archetype_scores_from_gemini, df, gemini_analysis, text_metrics)
+    if on_event:
+        on_event("gemini", {"gemini_analysis": gemini_analysis, "archetype_scores": archetype_scores})
+    return gemini_analysis, archetype_scores
+
+async def _analyze_all(video_ids: list, timer: StageTimer, api_usage: QuotaUsage, on_event) -> tuple:
+    """Mengambil dan menskor semua komentar terbaru dari awal setiap kali dianalisis."""
+    comments = await timer.run(
+        "fetch_comments", get_comments_from_videos, video_ids,
+        max_videos=MAX_VIDEOS_PER_ANALYSIS, usage=api_usage
+    )
+    if not comments:
+        raise AnalysisError(404, "Tidak ada komentar yang bisa dianalisis.")
+    telemetry.count("psychemap_comments_processed_total", len(comments), mode="full")
+
+    comments_df = pd.DataFrame(comments)
+    # Tahap yang hanya membaca teks memakai salinan sendiri, karena tahap sentimen menambah kolom ke comments_df
+    text_df = comments_df[['text']].copy()
+
+    sentiment_task = asyncio.ensure_future(timer.run("sentiment", add_sentiment_scores_to_df, comments_df))
+    # Lowercase, tokenisasi, dan hit frasa dihitung sekali lalu dipakai ulang oleh semua metrik teks
+    text_metrics_task = asyncio.ensure_future(timer.run("text_metrics", build_text_metrics, text_df))
+
+    async def quantitative_metrics():
+        df, emotion_scores, text_metrics = await asyncio.gather(
+            sentiment_task, timer.run("emotion", analyze_emotions_hf, text_df), text_metrics_task,
+        )
+        metrics = {
+            "total_comments_analyzed": len(comments), "emotion_distribution": emotion_scores,
+            "sentiment_distribution": _sentiment_distribution(df),
+            "skinner_reinforcement_score": calculate_reinforcement_score(text_df, text_metrics),
+            "lexical_diversity_percent": calculate_lexical_diversity(text_df, text_metrics),
+        }
+        if on_event:
+            on_event("metrics", metrics)
+        return metrics
+
+    async def gemini_and_archetype():
+        # Metrik teks jauh lebih cepat dari inferensi sentimen, jadi Gemini praktis tetap mulai tepat setelah sentimen
+        df, text_metrics = await asyncio.gather(sentiment_task, text_metrics_task)
+        return await _gemini_and_archetype(timer, df, text_metrics, on_event)
+
+    (gemini_analysis, archetype_scores), metrics = await asyncio.gather(gemini_and_archetype(), quantitative_metrics())
+    return metrics, gemini_analysis, archetype_scores
+
+def _fetch_new_comments(video_ids: list, cursors: tuple, api_usage: QuotaUsage) -> tuple:
+    watermarks, page_tokens = cursors
+    progress = {}
+    comments = get_comments_from_videos(
+        video_ids, max_videos=MAX_VIDEOS_PER_ANALYSIS, usage=api_usage,
+        watermarks=watermarks, page_tokens=page_tokens, progress=progress,
+    )
+    return comment_store.drop_known_comments(comments), progress
+
+def _engagement_hits(texts: list):
+    """Jumlah frasa engagement per komentar, sejajar dengan urutan `texts`."""
+    metrics = TextMetrics(texts)
+    metrics.match({"engagement": ENGAGEMENT_PHRASES})
+    return metrics.hits("engagement").sum(axis=1)
+
+def _load_stored(video_ids: list) -> tuple:
+    return (
+        comment_store.load_recent_comments_df(video_ids, INCREMENTAL_TEXT_SAMPLE_PER_VIDEO),
+        comment_store.load_aggregates(video_ids, len(EMOTION_LABELS)),
+    )
+
+async def _analyze_incremental(video_ids: list, timer: StageTimer, api_usage: QuotaUsage, on_event) -> tuple:
+    """
+    Hanya komentar baru yang diambil dan diskor (sentimen, emosi, hit engagement), lalu disimpan
+    bersama jumlah parsialnya. Distribusi sentimen/emosi dan skor reinforcement dihitung dari
+    jumlah parsial tersebut. Metrik yang butuh teks (keragaman leksikal, arketipe, sampel Gemini)
+    tidak bisa dijumlahkan per video, jadi memakai INCREMENTAL_TEXT_SAMPLE_PER_VIDEO komentar
+    tersimpan terbaru per video tanpa inferensi ulang, sehingga biayanya tetap terbatas.
+    """
+    cursors = await timer.run("load_state", comment_store.load_fetch_cursors, video_ids)
+    comments, progress = await timer.run("fetch_comments", _fetch_new_comments, video_ids, cursors, api_usage)
+    telemetry.count("psychemap_comments_processed_total", len(comments), mode="incremental")
+
+    new_df = pd.DataFrame(comments, columns=['video_id', 'comment_id', 'published_at', 'text'])
+    texts = new_df['text'].fillna('').astype(str).tolist()
+    scored_df, (emotions, emotion_mask), engagement_hits = await asyncio.gather(
+        timer.run("sentiment", add_sentiment_scores_to_df, new_df),
+        timer.run("emotion", emotion_vectors_for_comments, texts),
+        timer.run("text_metrics", _engagement_hits, texts),
+    )
+    await timer.run("store", comment_store.save_scored_comments, video_ids, scored_df, emotions, emotion_mask, engagement_hits, progress)
+
+    stored_df, totals = await timer.run("load_aggregates", _load_stored, video_ids)
+    if stored_df.empty:
+        raise AnalysisError(404, "Tidak ada komentar yang bisa dianalisis.")
+
+    text_metrics = TextMetrics.from_df(stored_df)
+    metrics = _metrics_from_totals(totals)
+    metrics["lexical_diversity_percent"] = calculate_lexical_diversity(stored_df, text_metrics)
+    if on_event:
+        on_event("metrics", metrics)
+
+    gemini_analysis, archetype_scores = await _gemini_and_archetype(timer, stored_df, text_metrics, on_event)
+    return metrics, gemini_analysis, archetype_scores
+
+def _metrics_from_totals(totals: dict) -> dict:
+    comment_count = totals["comment_count"]
+    if EMOTION_WEIGHTING == "length":
+        weight, sums = totals["emotion_length"], totals["emotion_length_sums"]
+    else:
+        weight, sums = totals["emotion_count"], totals["emotion_sums"]
+    if weight:
+        emotion_scores = {label: round(float(score) * 100, 2) for label, score in zip(EMOTION_LABELS, sums / weight)}
+    else:
+        emotion_scores = {label: 0 for label in EMOTION_LABELS}
+    return {
+        "total_comments_analyzed": comment_count,
+        "emotion_distribution": emotion_scores,
+        "sentiment_distribution": {
+            'positive_percent': totals["positive_count"] / comment_count * 100,
+            'negative_percent': totals["negative_count"] / comment_count * 100,
+            'neutral_percent': totals["neutral_count"] / comment_count * 100,
+        },
+        "skinner_reinforcement_score": round(min(100.0, (totals["engagement_hits"] / comment_count) * 200), 2),
+    }
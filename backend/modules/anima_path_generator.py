@@ -1,18 +1,34 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY
-import pandas as pd
-import json
-from typing import List, Dict, Any
+from modules.llm_client import llm_client, LLMResponseError
+from typing import Dict, Any, Optional, Callable
 
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-except Exception as e:
-    print(f"Error saat konfigurasi Gemini: {e}")
-    model = None
+# Rencana bawaan ketika Gemini tidak tersedia atau gagal, agar /api/anima_path selalu berisi tiga tantangan
+DEFAULT_RECOVERY_PLAN = {
+    "challenges": [
+        {"type": "membaca", "title": "Baca satu artikel panjang", "description": "Baca satu artikel panjang (minimal 15 menit) tanpa berpindah ke aplikasi lain."},
+        {"type": "menulis", "title": "Tulis jurnal refleksi", "description": "Tulis jurnal refleksi singkat setiap malam tentang apa yang Anda konsumsi hari itu."},
+        {"type": "interaksi", "title": "Hubungi seorang teman", "description": "Telepon atau temui satu teman dan ngobrol tanpa membuka ponsel."},
+    ],
+}
 
-def generate_recovery_plan(user_profile: dict):
-    # user_profile berisi ringkasan skor historis pengguna
+CHALLENGE_TYPES = ("membaca", "menulis", "interaksi")
+
+def _recovery_plan_fallback(message: str) -> Dict[str, Any]:
+    return {**DEFAULT_RECOVERY_PLAN, "fallback": True, "error": message}
+
+def _validate_recovery_plan(plan: Any):
+    # Respons yang tidak berisi tepat satu tantangan per jenis ditolak, sehingga tidak masuk cache LLM
+    challenges = plan.get("challenges")
+    if not isinstance(challenges, list) or len(challenges) != len(CHALLENGE_TYPES):
+        raise LLMResponseError("Rencana pemulihan harus berisi tepat tiga tantangan.")
+    for challenge in challenges:
+        if not isinstance(challenge, dict) or not all(isinstance(challenge.get(field), str) for field in ("type", "title", "description")):
+            raise LLMResponseError("Setiap tantangan harus memiliki type, title, dan description.")
+    if sorted(challenge["type"] for challenge in challenges) != sorted(CHALLENGE_TYPES):
+        raise LLMResponseError(f"Jenis tantangan harus {', '.join(CHALLENGE_TYPES)}.")
+
+def generate_recovery_plan(user_profile: dict, on_chunk: Optional[Callable[[str], None]] = None):
+    # user_profile berisi ringkasan skor historis pengguna.
+    # Profil yang sama menghasilkan prompt yang sama, sehingga jawabannya diambil dari cache LLM.
     
     prompt = f"""
     Buatkan rencana pemulihan 1 minggu untuk pengguna dengan profil berikut: {user_profile}.
@@ -20,8 +36,18 @@ def generate_recovery_plan(user_profile: dict):
     1. Satu tantangan membaca (misal: baca artikel panjang).
     2. Satu tantangan menulis (misal: tulis jurnal refleksi).
     3. Satu tantangan interaksi dunia nyata (misal: telepon teman).
-    Berikan jawaban dalam format JSON.
+
+    Berikan jawaban HANYA dalam format JSON yang valid seperti ini, dengan "type" persis salah satu dari
+    "membaca", "menulis", atau "interaksi":
+    {{
+      "challenges": [
+        {{"type": "membaca", "title": "Judul singkat", "description": "Deskripsi tantangan."}},
+        {{"type": "menulis", "title": "Judul singkat", "description": "Deskripsi tantangan."}},
+        {{"type": "interaksi", "title": "Judul singkat", "description": "Deskripsi tantangan."}}
+      ]
+    }}
     """
     
-    response = model.generate_content(prompt)
-    return json.loads(response.text)
\ No newline at end of file
+    return llm_client.generate_json(
+        prompt, _recovery_plan_fallback, required_keys=("challenges",), on_chunk=on_chunk, validate=_validate_recovery_plan
+    )
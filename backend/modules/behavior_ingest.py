@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import BEHAVIOR_MAX_LINE_BYTES
+from modules.gemini_analyzer import CONTENT_TYPES, classify_activity_url
+from modules.brainrot_scoring import BehaviorFeatures
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite mengembalikan datetime tanpa zona waktu; semua timestamp disimpan sebagai UTC
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def parse_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return as_utc(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+class BehaviorAccumulator:
+    """
+    Mengklasifikasi aktivitas NDJSON secara bertahap per potongan (chunk) upload. Yang disimpan
+    hanya penghitung per jenis konten, jadi memori tetap konstan berapa pun panjang riwayatnya.
+    Aktivitas dengan timestamp tidak lebih baru dari `since` dilewati agar upload yang tumpang
+    tindih dengan upload sebelumnya tidak dihitung dua kali. Fitur sesi dilanjutkan dari
+    `features` (state tersimpan dari upload sebelumnya) jika ada. Baris yang melebihi
+    `max_line_bytes` dibuang tanpa di-buffer sampai newline berikutnya dan dihitung invalid.
+    """
+
+    def __init__(self, since: Optional[datetime] = None, features: Optional[BehaviorFeatures] = None,
+                 max_line_bytes: int = BEHAVIOR_MAX_LINE_BYTES):
+        self.content_types = dict.fromkeys(CONTENT_TYPES, 0)
+        self.total_activities = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.since = as_utc(since)
+        self.last_timestamp = None
+        self.features = features or BehaviorFeatures()
+        self.max_line_bytes = max_line_bytes
+        self._buffer = b""
+        self._overflow = False
+
+    def feed(self, chunk: bytes):
+        *lines, rest = chunk.split(b"\n")
+        for line in lines:
+            self._append(line)
+            self._end_line()
+        self._append(rest)
+
+    def close(self):
+        self._end_line()
+
+    def _append(self, part: bytes):
+        if self._overflow or not part:
+            return
+        if len(self._buffer) + len(part) > self.max_line_bytes:
+            self._overflow = True
+            self._buffer = b""
+            return
+        self._buffer += part
+
+    def _end_line(self):
+        if self._overflow:
+            self.invalid += 1
+            self._overflow = False
+        elif self._buffer:
+            self._add_line(self._buffer)
+        self._buffer = b""
+
+    def _add_line(self, line: bytes):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            activity = json.loads(line)
+        except ValueError:
+            self.invalid += 1
+            return
+        if not isinstance(activity, dict):
+            self.invalid += 1
+            return
+        self.add_activity(activity)
+
+    def add_activity(self, activity: dict):
+        timestamp = parse_timestamp(activity.get("timestamp"))
+        if self.since is not None and timestamp is not None and timestamp <= self.since:
+            self.skipped += 1
+            return
+        category = classify_activity_url(activity.get("url") or "")
+        self.content_types[category] += 1
+        self.total_activities += 1
+        self.features.add(timestamp, category)
+        if timestamp is not None and (self.last_timestamp is None or timestamp > self.last_timestamp):
+            self.last_timestamp = timestamp
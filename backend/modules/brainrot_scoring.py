@@ -0,0 +1,102 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+# Jeda lebih lama dari ini di antara dua aktivitas dianggap sebagai sesi baru
+SESSION_GAP_SECONDS = 30 * 60
+
+INSTANT_TYPES = ("tiktok", "youtube_short")
+DEEP_TYPES = ("youtube_video", "article")
+
+
+class BehaviorFeatures:
+    """
+    Fitur berbasis waktu yang dihitung bertahap dari aktivitas berurutan: jumlah dan panjang sesi,
+    serta seberapa sering pengguna berpindah jenis konten di dalam satu sesi. State-nya kecil dan
+    bisa disimpan (to_state/from_state) agar upload berikutnya melanjutkan sesi yang sama.
+    """
+
+    def __init__(self):
+        self.timed_activities = 0
+        self.session_count = 0
+        self.closed_session_seconds = 0.0
+        self.switches = 0
+        self.session_started_at: Optional[datetime] = None
+        self.last_timestamp: Optional[datetime] = None
+        self.last_category: Optional[str] = None
+
+    def add(self, timestamp: Optional[datetime], category: str):
+        if timestamp is None:
+            return
+        self.timed_activities += 1
+        gap = (timestamp - self.last_timestamp).total_seconds() if self.last_timestamp else None
+        if gap is None or gap > SESSION_GAP_SECONDS:
+            if self.session_started_at is not None:
+                self.closed_session_seconds += (self.last_timestamp - self.session_started_at).total_seconds()
+            self.session_count += 1
+            self.session_started_at = timestamp
+        elif category != self.last_category:
+            self.switches += 1
+        # Aktivitas yang datang tidak berurutan tidak memundurkan akhir sesi
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+        self.last_category = category
+
+    def as_dict(self) -> Dict[str, float]:
+        open_session_seconds = 0.0
+        if self.session_started_at is not None:
+            open_session_seconds = (self.last_timestamp - self.session_started_at).total_seconds()
+        total_minutes = (self.closed_session_seconds + open_session_seconds) / 60
+        transitions = self.timed_activities - self.session_count
+        return {
+            "session_count": self.session_count,
+            "avg_session_minutes": round(total_minutes / self.session_count, 2) if self.session_count else 0.0,
+            "switch_rate": round(self.switches / transitions, 4) if transitions > 0 else 0.0,
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "timed_activities": self.timed_activities,
+            "session_count": self.session_count,
+            "closed_session_seconds": self.closed_session_seconds,
+            "switches": self.switches,
+            "session_started_at": self.session_started_at.isoformat() if self.session_started_at else None,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp else None,
+            "last_category": self.last_category,
+        }
+
+    @classmethod
+    def from_state(cls, state: Optional[dict]) -> "BehaviorFeatures":
+        features = cls()
+        if not state:
+            return features
+        features.timed_activities = state.get("timed_activities", 0)
+        features.session_count = state.get("session_count", 0)
+        features.closed_session_seconds = state.get("closed_session_seconds", 0.0)
+        features.switches = state.get("switches", 0)
+        if state.get("session_started_at"):
+            features.session_started_at = datetime.fromisoformat(state["session_started_at"])
+        if state.get("last_timestamp"):
+            features.last_timestamp = datetime.fromisoformat(state["last_timestamp"])
+        features.last_category = state.get("last_category")
+        return features
+
+
+def compute_brainrot_score(content_types: Dict[str, int], features: Optional[Dict[str, float]] = None) -> int:
+    """
+    Skor brain rot 0 (sangat sehat) - 100 (risiko tinggi) yang deterministik:
+    - 75% dari rasio konten instan terhadap konten instan + mendalam (video penuh/artikel),
+    - 25% dari porsi konten instan terhadap seluruh aktivitas,
+    - tambahan hingga 15 poin untuk perpindahan konten yang sering dalam satu sesi, dan
+      hingga 10 poin untuk sesi rata-rata yang panjang (jenuh di 60 menit).
+    """
+    total = sum(content_types.values())
+    if total == 0:
+        return 0
+    instant = sum(content_types.get(name, 0) for name in INSTANT_TYPES)
+    deep = sum(content_types.get(name, 0) for name in DEEP_TYPES)
+    instant_ratio = instant / (instant + deep) if instant + deep else 0.0
+    score = 75 * instant_ratio + 25 * (instant / total)
+    if features:
+        score += 15 * features.get("switch_rate", 0.0)
+        score += 10 * min(1.0, features.get("avg_session_minutes", 0.0) / 60) * instant_ratio
+    return int(round(min(100.0, max(0.0, score))))
@@ -1,93 +1,204 @@
+import numpy as np
 import pandas as pd
-from transformers import pipeline
-import re
+import threading
+from modules.inference_cache import inference_cache
+from modules.inference_engine import configure_torch_threads, run_batched
+from modules.text_metrics import TextMetrics
+from typing import Optional
+from config import EMOTION_MAX_SAMPLES, EMOTION_WEIGHTING, INFERENCE_SERVER_ADDRESS
 
-print("Memuat model AI, ini mungkin butuh beberapa saat...")
-sentiment_pipeline = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest")
-emotion_pipeline = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=None)
-print("Model AI selesai dimuat.")
+SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+def load_local_pipeline(name: str):
+    """Memuat pipeline transformer di proses ini. Import transformers sengaja ditunda sampai dibutuhkan."""
+    from transformers import pipeline
+
+    configure_torch_threads()
+    if name == "sentiment":
+        return pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+    if name == "emotion":
+        return pipeline("text-classification", model=EMOTION_MODEL, top_k=None)
+    raise ValueError(f"Pipeline tidak dikenal: {name}")
+
+def get_pipeline(name: str):
+    """
+    Mengembalikan pipeline yang dimuat sekali saat pertama kali dipakai (thread-safe).
+    Jika INFERENCE_SERVER_ADDRESS diisi, yang dikembalikan adalah proxy ke proses inferensi bersama.
+    """
+    pipe = _pipelines.get(name)
+    if pipe is not None:
+        return pipe
+    with _pipelines_lock:
+        pipe = _pipelines.get(name)
+        if pipe is None:
+            if INFERENCE_SERVER_ADDRESS:
+                from modules.inference_server import RemotePipeline
+                pipe = RemotePipeline(name)
+            else:
+                print(f"Memuat model AI '{name}', ini mungkin butuh beberapa saat...")
+                pipe = load_local_pipeline(name)
+                print(f"Model AI '{name}' selesai dimuat.")
+            _pipelines[name] = pipe
+    return pipe
+
+def warm_up_models():
+    get_pipeline("sentiment")
+    get_pipeline("emotion")
+
+EMOTION_LABELS = ['anger', 'disgust', 'fear', 'joy', 'sadness', 'surprise']
+EMOTION_INDEX = {label: i for i, label in enumerate(EMOTION_LABELS)}
 
 ENGAGEMENT_PHRASES = [
     'like if', 'subscribe', 'comment below', 'what do you think', 
     'setuju gak', 'klik link', 'cek bio', 'my reaction'
 ]
 
+def _run_inference(pipe, model_name: str, texts: list, **kwargs) -> list:
+    """
+    Menjalankan pipeline (dalam batch berdasarkan panjang token) hanya untuk teks yang
+    belum ada di cache inferensi, lalu mengembalikan hasil sesuai urutan `texts`.
+    """
+    if inference_cache is None:
+        return run_batched(pipe, texts, **kwargs)
+
+    known = inference_cache.get_many(model_name, texts)
+    unseen = list(dict.fromkeys(text for text in texts if text not in known))
+    if unseen:
+        fresh = dict(zip(unseen, run_batched(pipe, unseen, **kwargs)))
+        inference_cache.put_many(model_name, fresh)
+        known.update(fresh)
+    return [known[text] for text in texts]
+
+def get_inference_cache_stats() -> dict:
+    return inference_cache.stats() if inference_cache is not None else {}
+
 def add_sentiment_scores_to_df(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty or df['text'].dropna().empty:
         df['compound'] = 0.0
         df['sentiment_label'] = 'neutral'
         return df
     
-    sample_texts = df['text'].dropna().astype(str).tolist()
-    results = sentiment_pipeline(sample_texts, truncation=True, max_length=512)    
-    
-    scores = {}
-    labels = {}
-    for i, text in enumerate(sample_texts):
-        score = results[i]['score']
-        label = results[i]['label']
-        
-        if label == 'negative':
-            score = -score
-        elif label == 'neutral':
-            score = 0
-        
-        scores[text] = score
-        labels[text] = label
-        
-    df['compound'] = df['text'].map(scores).fillna(0.0)
-    df['sentiment_label'] = df['text'].map(labels).fillna('neutral')
+    # Inferensi sekali per teks unik, lalu hasilnya disebar kembali ke setiap baris lewat kode faktor
+    has_text = df['text'].notna().to_numpy()
+    codes, unique_texts = pd.factorize(df['text'][has_text].astype(str))
+    results = _run_inference(get_pipeline("sentiment"), SENTIMENT_MODEL, unique_texts.tolist(), max_length=512)
+
+    unique_labels = np.array([res['label'] for res in results], dtype=object)
+    unique_scores = np.fromiter((res['score'] for res in results), dtype=float, count=len(results))
+    unique_scores = np.where(unique_labels == 'negative', -unique_scores, np.where(unique_labels == 'neutral', 0.0, unique_scores))
+
+    compound = np.zeros(len(df), dtype=float)
+    compound[has_text] = unique_scores[codes]
+    sentiment_label = np.full(len(df), 'neutral', dtype=object)
+    sentiment_label[has_text] = unique_labels[codes]
+
+    df['compound'] = compound
+    df['sentiment_label'] = sentiment_label
     return df
 
-def analyze_emotions_hf(df: pd.DataFrame) -> dict:
-    full_text = " ".join(df['text'].dropna().astype(str))
-    if not full_text:
-        return {'anger': 0, 'disgust': 0, 'fear': 0, 'joy': 0, 'sadness': 0, 'surprise': 0}
-    
-    results = emotion_pipeline(full_text, truncation=True, max_length=512)    
-    emotion_scores = {'anger': 0, 'disgust': 0, 'fear': 0, 'joy': 0, 'sadness': 0, 'surprise': 0}
-    
-    for res in results[0]:
-        if res['label'] in emotion_scores:
-            emotion_scores[res['label']] = round(res['score'] * 100, 2)
-            
-    return emotion_scores
-
-def calculate_lexical_diversity(df: pd.DataFrame) -> float:
-    full_text = " ".join(df['text'].dropna().astype(str).str.lower())
-    words = full_text.split()
-    if not words: return 0.0
-    return round((len(set(words)) / len(words)) * 100, 2)
-
-def calculate_reinforcement_score(df: pd.DataFrame) -> float:
+def emotion_vectors(texts: list) -> np.ndarray:
+    """Distribusi emosi per teks sebagai array (len(texts), len(EMOTION_LABELS))."""
+    vectors = np.zeros((len(texts), len(EMOTION_LABELS)), dtype=float)
+    if not texts:
+        return vectors
+    results = _run_inference(get_pipeline("emotion"), EMOTION_MODEL, texts, max_length=512)
+    for row, scores in enumerate(results):
+        for res in scores:
+            column = EMOTION_INDEX.get(res['label'])
+            if column is not None:
+                vectors[row, column] = res['score']
+    return vectors
+
+def analyze_emotions_hf(df: pd.DataFrame, max_samples: int = EMOTION_MAX_SAMPLES, weighting: str = EMOTION_WEIGHTING) -> dict:
+    """
+    Mengklasifikasi emosi per komentar lalu merata-ratakan distribusinya. Jika komentar lebih
+    banyak dari max_samples, diambil sampel acak (dengan seed tetap) agar biaya tetap terbatas.
+    weighting="length" memberi bobot lebih pada komentar yang lebih panjang.
+    """
+    texts = df['text'].dropna().astype(str)
+    texts = texts[texts.str.strip() != ''].to_numpy()
+    if len(texts) == 0:
+        return {label: 0 for label in EMOTION_LABELS}
+
+    if max_samples and len(texts) > max_samples:
+        rng = np.random.default_rng(0)
+        texts = texts[np.sort(rng.choice(len(texts), size=max_samples, replace=False))]
+
+    codes, unique_texts = pd.factorize(texts)
+    weights = np.bincount(codes).astype(float)
+    if weighting == "length":
+        weights *= np.fromiter((len(text) for text in unique_texts), dtype=float, count=len(unique_texts))
+
+    vectors = emotion_vectors(list(unique_texts))
+    distribution = weights @ vectors / weights.sum()
+    return {label: round(float(score) * 100, 2) for label, score in zip(EMOTION_LABELS, distribution)}
+
+def emotion_vectors_for_comments(texts: list, max_samples: int = EMOTION_MAX_SAMPLES) -> tuple:
+    """
+    Vektor emosi per komentar untuk disimpan, beserta mask komentar yang benar-benar diklasifikasi
+    (teks kosong dilewati; di atas max_samples diambil sampel acak dengan seed tetap).
+    """
+    vectors = np.zeros((len(texts), len(EMOTION_LABELS)), dtype=float)
+    mask = np.array([bool(text and str(text).strip()) for text in texts], dtype=bool)
+    candidates = np.flatnonzero(mask)
+    if max_samples and len(candidates) > max_samples:
+        rng = np.random.default_rng(0)
+        candidates = np.sort(rng.choice(candidates, size=max_samples, replace=False))
+        mask[:] = False
+        mask[candidates] = True
+    if len(candidates) == 0:
+        return vectors, mask
+    codes, unique_texts = pd.factorize(np.array([str(texts[i]) for i in candidates], dtype=object))
+    vectors[candidates] = emotion_vectors(list(unique_texts))[codes]
+    return vectors, mask
+
+def build_text_metrics(df: pd.DataFrame) -> TextMetrics:
+    """Lowercase, tokenisasi, dan pencocokan frasa engagement dalam satu kali persiapan untuk semua metrik teks."""
+    return TextMetrics.from_df(df, {"engagement": ENGAGEMENT_PHRASES})
+
+def calculate_lexical_diversity(df: pd.DataFrame, metrics: Optional[TextMetrics] = None) -> float:
+    metrics = metrics or build_text_metrics(df)
+    if not metrics.word_count: return 0.0
+    return round((metrics.unique_word_count / metrics.word_count) * 100, 2)
+
+def calculate_reinforcement_score(df: pd.DataFrame, metrics: Optional[TextMetrics] = None) -> float:
     if df.empty: return 0.0
-    text_series = df['text'].dropna().astype(str)
-    if text_series.empty: return 0.0
-    engagement_count = sum(text_series.str.contains(phrase, case=False, na=False, regex=False).sum() for phrase in ENGAGEMENT_PHRASES)
+    metrics = metrics or build_text_metrics(df)
+    if not metrics.comment_count: return 0.0
+    engagement_count = metrics.total_hits("engagement")
     return round(min(100.0, (engagement_count / len(df)) * 200), 2)
 
-def calculate_archetype_scores_from_gemini(df: pd.DataFrame, gemini_analysis: dict) -> dict:
+# Persentase komentar yang cocok dengan kata kunci Joker/Thanos di atas ambang ini menentukan arketipe
+ARCHETYPE_THRESHOLD = 50
+
+def archetype_code(joker_score: float, thanos_score: float) -> str:
+    """Kode arketipe ("joker", "thanos", "neutral") dari skor; dipakai diagnosis pipeline dan kolom analyses."""
+    if joker_score > ARCHETYPE_THRESHOLD:
+        return "joker"
+    if thanos_score > ARCHETYPE_THRESHOLD:
+        return "thanos"
+    return "neutral"
+
+def calculate_archetype_scores_from_gemini(df: pd.DataFrame, gemini_analysis: dict, metrics: Optional[TextMetrics] = None) -> dict:
     joker_keywords = [k.lower() for k in gemini_analysis.get("joker_keywords", []) if k]
     thanos_keywords = [k.lower() for k in gemini_analysis.get("thanos_keywords", []) if k]
     
     if df.empty or df['text'].dropna().empty: 
         return {"joker_score": 0, "thanos_score": 0}
 
-    all_comments_lower = df['text'].dropna().astype(str).str.lower()
-    total_comments = len(all_comments_lower)
+    metrics = metrics or TextMetrics.from_df(df)
+    total_comments = metrics.comment_count
     if total_comments == 0:
         return {"joker_score": 0, "thanos_score": 0}
 
-    joker_count = 0
-    thanos_count = 0
-
-    if joker_keywords:
-        joker_pattern = '|'.join(re.escape(k) for k in joker_keywords)
-        joker_count = all_comments_lower.str.contains(joker_pattern, case=False, na=False, regex=True).sum()
-
-    if thanos_keywords:
-        thanos_pattern = '|'.join(re.escape(k) for k in thanos_keywords)
-        thanos_count = all_comments_lower.str.contains(thanos_pattern, case=False, na=False, regex=True).sum()
+    # Kata kunci Joker dan Thanos dicocokkan bersamaan dalam satu lintasan atas teks yang sudah di-lowercase
+    metrics.match({"joker": joker_keywords, "thanos": thanos_keywords})
+    joker_count = metrics.comments_matching_any("joker")
+    thanos_count = metrics.comments_matching_any("thanos")
 
     joker_score = round((joker_count / total_comments) * 100, 2)
     thanos_score = round((thanos_count / total_comments) * 100, 2)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+import models
+import database
+from modules.inference_cache import normalize_text
+
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# INSERT ... ON CONFLICT DO NOTHING per dialek, agar komentar yang sudah disimpan analisis lain dilewati
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def parse_published_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+def _format_watermark(value: datetime) -> str:
+    # SQLite mengembalikan datetime tanpa zona waktu; semua watermark disimpan sebagai UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime(WATERMARK_FORMAT)
+
+
+def load_fetch_cursors(video_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    (watermarks, page_tokens) per video: publishedAt yang semua komentar sampai saat itu sudah
+    tersimpan (dalam format YouTube API), dan token halaman untuk melanjutkan pengambilan yang terpotong.
+    """
+    VideoState = models.VideoState
+    db = database.SessionLocal()
+    try:
+        rows = db.query(VideoState.video_id, VideoState.watermark, VideoState.resume_page_token).filter(
+            VideoState.video_id.in_(video_ids)
+        ).all()
+    finally:
+        db.close()
+    watermarks = {video_id: _format_watermark(watermark) for video_id, watermark, _ in rows if watermark is not None}
+    page_tokens = {video_id: token for video_id, watermark, token in rows if watermark is not None and token}
+    return watermarks, page_tokens
+
+def _later(column, value):
+    """Ekspresi SQL untuk yang lebih baru dari kolom dan value (kolom lain atau datetime); NULL diabaikan."""
+    if value is None:
+        return column
+    return case((column > value, column), else_=func.coalesce(value, column))
+
+def _advance_cursors(db, progress: dict):
+    """
+    Watermark hanya maju setelah pengambilan mencapai watermark lama, karena komentar di antaranya
+    belum tersimpan. Pengambilan yang terpotong menyimpan token halaman berikutnya dan publishedAt
+    terbaru yang sudah dilihat; keduanya dipakai lagi sampai celahnya tertutup.
+    """
+    VideoState = models.VideoState
+    for video_id, state in progress.items():
+        newest = parse_published_at(state.get("newest"))
+        if state["complete"]:
+            values = {
+                "watermark": _later(_later(VideoState.watermark, VideoState.pending_watermark), newest),
+                "pending_watermark": None,
+                "resume_page_token": None,
+            }
+        else:
+            values = {
+                "pending_watermark": _later(VideoState.pending_watermark, newest),
+                "resume_page_token": state.get("next_page_token"),
+            }
+        db.query(VideoState).filter(VideoState.video_id == video_id).update(values, synchronize_session=False)
+
+def drop_known_comments(comments: List[dict]) -> List[dict]:
+    """
+    Membuang komentar yang sudah tersimpan (atau duplikat di batch yang sama) berdasarkan comment_id,
+    agar komentar lama tidak diinferensi ulang. Ini hanya optimasi: analisis yang berjalan bersamaan
+    bisa lolos pengecekan yang sama, dan save_scored_comments yang menyelesaikannya.
+    """
+    for comment in comments:
+        if not comment.get("comment_id"):
+            # Tanpa ID dari API, komentar diidentifikasi dari video, waktu, dan isinya
+            comment["comment_id"] = text_hash(f"{comment['video_id']}\0{comment.get('published_at')}\0{comment['text']}")
+    ids = list(dict.fromkeys(comment["comment_id"] for comment in comments))
+    db = database.SessionLocal()
+    try:
+        known = set()
+        # Batas jumlah parameter SQLite, jadi query dipecah per 500 ID
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            known.update(row[0] for row in db.query(models.CommentRecord.comment_id).filter(models.CommentRecord.comment_id.in_(chunk)))
+    finally:
+        db.close()
+    fresh = []
+    for comment in comments:
+        if comment["comment_id"] not in known:
+            known.add(comment["comment_id"])
+            fresh.append(comment)
+    return fresh
+
+def save_scored_comments(video_ids: List[str], df: pd.DataFrame, emotions: np.ndarray, emotion_mask: np.ndarray,
+                         engagement_hits: np.ndarray, progress: Dict[str, dict]):
+    """
+    Menyimpan komentar baru beserta skornya dan menambahkan kontribusinya ke jumlah parsial
+    VideoState dalam satu transaksi. Penghitung ditambah dengan UPDATE kolom = kolom + n.
+    Komentar disisipkan dengan ON CONFLICT(comment_id) DO NOTHING, dan hanya baris yang benar-benar
+    tersisipkan yang dihitung, sehingga dua analisis yang tumpang tindih (mis. target channel dan
+    salah satu videonya, atau dua worker) tidak gagal maupun menghitung komentar yang sama dua kali.
+    progress (dari get_comments_from_videos) menentukan watermark dan token lanjutan per video.
+    """
+    VideoState = models.VideoState
+    db = database.SessionLocal()
+    try:
+        insert = _DIALECT_INSERTS[db.get_bind().dialect.name]
+        db.execute(insert(VideoState).on_conflict_do_nothing(index_elements=["video_id"]), [{"video_id": video_id} for video_id in video_ids])
+        _advance_cursors(db, progress)
+        if df.empty:
+            db.commit()
+            return
+
+        published = [parse_published_at(value) for value in df['published_at']]
+        texts = df['text'].fillna('').astype(str).tolist()
+        stmt = insert(models.CommentRecord).on_conflict_do_nothing(index_elements=["comment_id"]).returning(models.CommentRecord.comment_id)
+        inserted_ids = {row[0] for row in db.execute(stmt, [
+            {
+                "comment_id": comment_id, "video_id": video_id, "text": text, "text_hash": text_hash(text),
+                "published_at": published_at, "sentiment_label": label, "compound": float(compound),
+                "emotion_json": json.dumps(emotions[row].round(6).tolist()) if emotion_mask[row] else None,
+                "engagement_hits": int(engagement_hits[row]),
+            }
+            for row, (comment_id, video_id, text, published_at, label, compound) in enumerate(zip(
+                df['comment_id'], df['video_id'], texts, published, df['sentiment_label'], df['compound']
+            ))
+        ])}
+        inserted = df['comment_id'].isin(inserted_ids).to_numpy()
+
+        lengths = np.fromiter((len(text) for text in texts), dtype=float, count=len(texts))
+        video_column = df['video_id'].to_numpy()
+        labels = df['sentiment_label'].to_numpy()
+        for video_id in dict.fromkeys(video_column):
+            rows = (video_column == video_id) & inserted
+            if not rows.any():
+                continue
+            scored = rows & emotion_mask
+            values = {
+                "comment_count": VideoState.comment_count + int(rows.sum()),
+                "positive_count": VideoState.positive_count + int((labels[rows] == 'positive').sum()),
+                "negative_count": VideoState.negative_count + int((labels[rows] == 'negative').sum()),
+                "neutral_count": VideoState.neutral_count + int((labels[rows] == 'neutral').sum()),
+                "engagement_hits": VideoState.engagement_hits + int(engagement_hits[rows].sum()),
+                "emotion_count": VideoState.emotion_count + int(scored.sum()),
+                "emotion_length": VideoState.emotion_length + float(lengths[scored].sum()),
+            }
+            db.query(VideoState).filter(VideoState.video_id == video_id).update(values, synchronize_session=False)
+
+            # Vektor jumlah emosi disimpan sebagai JSON; baris ini sudah terkunci oleh UPDATE di atas
+            if scored.any():
+                state = db.get(VideoState, video_id)
+                db.refresh(state)
+                sums = np.array(json.loads(state.emotion_sums)) if state.emotion_sums else 0.0
+                length_sums = np.array(json.loads(state.emotion_length_sums)) if state.emotion_length_sums else 0.0
+                state.emotion_sums = json.dumps((sums + emotions[scored].sum(axis=0)).tolist())
+                state.emotion_length_sums = json.dumps((length_sums + lengths[scored] @ emotions[scored]).tolist())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def load_aggregates(video_ids: List[str], emotion_dims: int) -> dict:
+    """Menjumlahkan jumlah parsial VideoState untuk video-video yang dianalisis."""
+    db = database.SessionLocal()
+    try:
+        states = db.query(models.VideoState).filter(models.VideoState.video_id.in_(video_ids)).all()
+    finally:
+        db.close()
+    totals = {
+        name: sum(getattr(state, name) or 0 for state in states)
+        for name in ("comment_count", "positive_count", "negative_count", "neutral_count",
+                     "engagement_hits", "emotion_count", "emotion_length")
+    }
+    totals["emotion_sums"] = np.zeros(emotion_dims)
+    totals["emotion_length_sums"] = np.zeros(emotion_dims)
+    for state in states:
+        if state.emotion_sums:
+            totals["emotion_sums"] += np.array(json.loads(state.emotion_sums))
+        if state.emotion_length_sums:
+            totals["emotion_length_sums"] += np.array(json.loads(state.emotion_length_sums))
+    return totals
+
+def load_recent_comments_df(video_ids: List[str], per_video: int) -> pd.DataFrame:
+    """
+    Teks dan skor sentimen dari `per_video` komentar tersimpan terbaru per video, untuk metrik teks
+    dan sampel komentar Gemini. Satu query berbatas per video (indeks video_id, published_at).
+    """
+    CommentRecord = models.CommentRecord
+    db = database.SessionLocal()
+    try:
+        rows = []
+        for video_id in video_ids:
+            rows.extend(
+                db.query(CommentRecord.text, CommentRecord.compound, CommentRecord.sentiment_label)
+                .filter(CommentRecord.video_id == video_id)
+                .order_by(CommentRecord.published_at.desc())
+                .limit(per_video)
+                .all()
+            )
+    finally:
+        db.close()
+    return pd.DataFrame(rows, columns=['text', 'compound', 'sentiment_label'])
@@ -0,0 +1,47 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable
+
+# Task produsen tetap berjalan sampai selesai walaupun klien SSE memutus koneksi,
+# agar hasilnya tetap masuk cache dan tersimpan; referensinya disimpan di sini.
+_producers = set()
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventChannel:
+    """
+    Jembatan dari callback (di event loop maupun di thread pool) ke respons server-sent events.
+    emit() aman dipanggil dari thread mana pun; stream() menghasilkan event dalam format SSE
+    sampai coroutine produsen selesai.
+    """
+
+    _DONE = object()
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def emit(self, event: str, data: Any):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    async def stream(self, producer: Awaitable) -> AsyncIterator[str]:
+        task = asyncio.ensure_future(self._run(producer))
+        _producers.add(task)
+        task.add_done_callback(_producers.discard)
+        while True:
+            item = await self._queue.get()
+            if item is self._DONE:
+                return
+            yield format_sse(*item)
+
+    async def _run(self, producer: Awaitable):
+        try:
+            await producer
+        except Exception as e:
+            print(f"Error pada stream event: {e}")
+            self.emit("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, self._DONE)
@@ -1,19 +1,21 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY
+from config import URL_RULES_PATH, BRAINROT_NARRATIVE_TTL
+from modules.url_classifier import URLClassifier
+from modules.llm_client import llm_client
 import pandas as pd
-import json
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from cachetools import TTLCache
 
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-except Exception as e:
-    print(f"Error saat konfigurasi Gemini: {e}")
-    model = None
+INTELLIGENT_ANALYSIS_KEYS = ("joker_keywords", "thanos_keywords", "analysis_summary", "community_vibe")
 
-def get_intelligent_analysis_from_gemini(df: pd.DataFrame):
-    if not model or df.empty:
-        return {"joker_keywords": [], "thanos_keywords": [], "analysis_summary": "Analisis Gemini tidak tersedia.", "community_vibe": "Tidak diketahui", "main_themes": []}
+def _intelligent_analysis_fallback(message: str) -> dict:
+    vibe = "Tidak diketahui" if message == "Analisis Gemini tidak tersedia." else "Error"
+    return {"joker_keywords": [], "thanos_keywords": [], "analysis_summary": message, "community_vibe": vibe, "main_themes": []}
+
+def get_intelligent_analysis_from_gemini(df: pd.DataFrame, on_chunk: Optional[Callable[[str], None]] = None):
+    if not llm_client.available or df.empty:
+        return _intelligent_analysis_fallback("Analisis Gemini tidak tersedia.")
 
     impactful_comments = df.sort_values(by='compound', ascending=True).head(50)
     sample_text = "\n".join(impactful_comments['text'].dropna().astype(str).tolist())
@@ -43,35 +45,29 @@ def get_intelligent_analysis_from_gemini(df: pd.DataFrame):
       "main_themes": ["Topik 1", "Topik 2", "Topik 3"]
     }}
     """
-    try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
-        return json.loads(cleaned_response)
-    except Exception as e:
-        print(f"Error saat memanggil Gemini API: {e}")
-        return {"joker_keywords": [], "thanos_keywords": [], "analysis_summary": f"Error: {e}", "community_vibe": "Error", "main_themes": []}
-
-def get_brainrot_analysis(activities: List[Dict[str, Any]]):
-    if not model:
-        return {"brainrot_score": -1, "analysis": "Analisis Gemini tidak tersedia."}
-
-    summary = []
-    content_types = {"tiktok": 0, "youtube_short": 0, "youtube_video": 0, "article": 0, "other": 0}
-    
-    for activity in activities:
-        url = activity.get("url", "")
-        if "tiktok.com" in url:
-            content_types["tiktok"] += 1
-        elif "youtube.com/shorts" in url:
-            content_types["youtube_short"] += 1
-        elif "youtube.com/watch" in url:
-            content_types["youtube_video"] += 1
-        elif "kompas.com" in url or "detik.com" in url or "bbc.com" in url:
-            content_types["article"] += 1
-        else:
-            content_types["other"] += 1
-            
-    total_activities = len(activities)
+    return llm_client.generate_json(prompt, _intelligent_analysis_fallback, required_keys=INTELLIGENT_ANALYSIS_KEYS, on_chunk=on_chunk)
+
+CONTENT_TYPES = ("tiktok", "youtube_short", "youtube_video", "article", "other")
+
+url_classifier = URLClassifier.from_file(URL_RULES_PATH, categories=CONTENT_TYPES)
+
+def classify_activity_url(url: str) -> str:
+    return url_classifier.classify(url)
+
+def count_content_types(activities: List[Dict[str, Any]]) -> Dict[str, int]:
+    content_types = dict.fromkeys(CONTENT_TYPES, 0)
+    content_types.update(url_classifier.count(activity.get("url") or "" for activity in activities))
+    return content_types
+
+# Narasi Gemini untuk analisis brain rot diisi di background dan di-cache per vektor penghitung,
+# sehingga endpoint tidak pernah menunggu LLM.
+_narrative_cache = TTLCache(maxsize=1024, ttl=BRAINROT_NARRATIVE_TTL)
+_narrative_pending = set()
+_narrative_lock = threading.Lock()
+_narrative_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="brainrot-narrative")
+
+def get_brainrot_narrative(content_types: Dict[str, int], total_activities: int) -> Optional[str]:
+    """Narasi 1-2 kalimat dari Gemini; skornya sendiri dihitung lokal oleh modules.brainrot_scoring."""
     analysis_summary = (
         f"Total aktivitas: {total_activities}\n"
         f"- Konten Instan (TikTok/Shorts): {content_types['tiktok'] + content_types['youtube_short']}\n"
@@ -88,20 +84,41 @@ def get_brainrot_analysis(activities: List[Dict[str, Any]]):
     {analysis_summary}
     ---
 
-    Tugas Anda:
-    1.  **Berikan Skor Brain Rot:** Berikan skor dari 0 (Sangat Sehat) hingga 100 (Risiko Brain Rot Tinggi) berdasarkan rasio konten instan (TikTok/Shorts) terhadap konten yang lebih mendalam (Video Penuh/Artikel).
-    2.  **Berikan Ringkasan Analisis:** Berikan 1-2 kalimat analisis yang menjelaskan skor tersebut dan apa indikasinya bagi pengguna, sesuai dengan konteks teoritis.
+    Berikan 1-2 kalimat analisis tentang pola konsumsi konten ini dan apa indikasinya bagi pengguna, sesuai dengan konteks teoritis.
 
     Berikan jawaban HANYA dalam format JSON yang valid seperti ini:
     {{
-      "brainrot_score": 85,
       "analysis": "Ringkasan analisis Anda di sini."
     }}
     """
+    result = llm_client.generate_json(prompt, lambda message: None, required_keys=("analysis",), ttl=BRAINROT_NARRATIVE_TTL)
+    return result["analysis"] if result else None
+
+def request_brainrot_narrative(content_types: Dict[str, int]) -> Tuple[str, Optional[str]]:
+    """
+    Mengembalikan (status, narasi). Status "ready" jika narasi untuk vektor penghitung ini sudah ada,
+    "pending" jika baru dijadwalkan/sedang dibuat, atau "unavailable" jika Gemini tidak tersedia.
+    """
+    if not llm_client.available:
+        return "unavailable", None
+    key = tuple(content_types[name] for name in CONTENT_TYPES)
+    with _narrative_lock:
+        if key in _narrative_cache:
+            return "ready", _narrative_cache[key]
+        if key in _narrative_pending:
+            return "pending", None
+        _narrative_pending.add(key)
+    _narrative_executor.submit(_fill_brainrot_narrative, key, dict(content_types))
+    return "pending", None
+
+def _fill_brainrot_narrative(key: tuple, content_types: Dict[str, int]):
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
-        return json.loads(cleaned_response)
+        narrative = get_brainrot_narrative(content_types, sum(content_types.values()))
+        if narrative is not None:
+            with _narrative_lock:
+                _narrative_cache[key] = narrative
     except Exception as e:
-        print(f"Error saat memanggil Gemini API: {e}")
-        return {"brainrot_score": -1, "analysis": f"Error: {e}"}
\ No newline at end of file
+        print(f"Error saat membuat narasi brain rot dari Gemini: {e}")
+    finally:
+        with _narrative_lock:
+            _narrative_pending.discard(key)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+from config import INFERENCE_CACHE_PATH, INFERENCE_CACHE_MAX_ENTRIES
+from modules import telemetry
+
+
+def normalize_text(text: str) -> str:
+    # Spasi berlebih tidak mengubah hasil model, jadi diseragamkan sebelum di-hash
+    return " ".join(str(text).split())
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class InferenceCache:
+    """
+    Cache hasil inferensi transformer di SQLite, dengan kunci hash (nama model, teks ternormalisasi).
+    Entri yang paling lama tidak diakses dibuang ketika jumlahnya melebihi max_entries.
+    Jumlah entri dilacak secara berjalan (satu COUNT saat dibuka, lalu dari rowcount penulisan),
+    sehingga put_many tidak memindai tabel; COUNT ulang hanya dilakukan saat eviksi tampak perlu,
+    karena worker lain yang memakai file yang sama juga bisa menambah entri.
+    """
+
+    def __init__(self, path: str = INFERENCE_CACHE_PATH, max_entries: int = INFERENCE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS inference_cache ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, value TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_inference_cache_last_access ON inference_cache (last_access)")
+        self._conn.commit()
+        (self._entries,) = self._conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[str, Any]:
+        """Mengembalikan {teks: hasil} untuk teks yang sudah pernah diinferensi."""
+        keys = {}
+        for text in texts:
+            keys.setdefault(cache_key(model_name, text), []).append(text)
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            found_keys = []
+            # Batas jumlah parameter SQLite, jadi query dipecah per 500 kunci
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM inference_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value in rows:
+                    found_keys.append(key)
+                    result = json.loads(value)
+                    for text in keys[key]:
+                        found[text] = result
+            if found_keys:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE inference_cache SET last_access = ? WHERE key = ?", [(now, key) for key in found_keys]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        telemetry.count("psychemap_cache_requests_total", len(found), cache="inference", result="hit")
+        telemetry.count("psychemap_cache_requests_total", len(texts) - len(found), cache="inference", result="miss")
+        return found
+
+    def put_many(self, model_name: str, results: Dict[str, Any]):
+        if not results:
+            return
+        now = time.time()
+        rows = [(cache_key(model_name, text), model_name, json.dumps(value), now) for text, value in results.items()]
+        with self._lock:
+            # INSERT OR IGNORE agar rowcount hanya menghitung kunci baru; kunci yang sudah ada
+            # (mis. diisi worker lain bersamaan) diperbarui terpisah, yang jarang terjadi
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO inference_cache (key, model, value, last_access) VALUES (?, ?, ?, ?)", rows
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE inference_cache SET model = ?, value = ?, last_access = ? WHERE key = ?",
+                    [(model, value, last_access, key) for key, model, value, last_access in rows],
+                )
+            self._entries += inserted
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (self._entries,) = self._conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()
+        if self._entries <= self.max_entries:
+            return
+        # Buang sedikit lebih banyak dari kelebihannya agar eviksi tidak terjadi di setiap penulisan
+        excess = self._entries - int(self.max_entries * 0.9)
+        deleted = self._conn.execute(
+            "DELETE FROM inference_cache WHERE key IN "
+            "(SELECT key FROM inference_cache ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._entries -= deleted
+        self.evictions += deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+try:
+    inference_cache = InferenceCache()
+except sqlite3.Error as e:
+    print(f"Error saat membuka cache inferensi: {e}")
+    inference_cache = None
@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from config import INFERENCE_BATCH_SIZE, TORCH_NUM_THREADS, TORCH_INTEROP_THREADS
+from modules import telemetry
+
+
+def configure_torch_threads(num_threads: int = TORCH_NUM_THREADS, interop_threads: int = TORCH_INTEROP_THREADS):
+    """Mengatur jumlah thread intra-op/inter-op torch. Nilai 0 berarti memakai default torch."""
+    try:
+        import torch
+    except ImportError:
+        return
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Hanya bisa diatur sebelum operasi paralel pertama dijalankan
+            print(f"Tidak bisa mengatur interop threads torch: {e}")
+
+def token_lengths(pipe, texts: List[str], max_length: int = 512) -> List[int]:
+    """Panjang token tiap teks; jatuh ke panjang karakter jika pipeline tidak punya tokenizer."""
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        return [len(text) for text in texts]
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+    return [len(ids) for ids in encoded]
+
+def run_batched(pipe, texts: List[str], batch_size: Optional[int] = None, max_length: int = 512, **kwargs) -> list:
+    """
+    Menjalankan pipeline dalam batch yang dikelompokkan berdasarkan panjang token, sehingga
+    komentar pendek tidak di-padding sampai sepanjang komentar terpanjang.
+    Hasil dikembalikan sesuai urutan `texts`.
+    """
+    if not texts:
+        return []
+    batch_size = batch_size or INFERENCE_BATCH_SIZE
+    lengths = token_lengths(pipe, texts, max_length=max_length)
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    results = [None] * len(texts)
+    model = getattr(pipe, "task", None) or type(pipe).__name__
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = [texts[i] for i in indices]
+        telemetry.observe("psychemap_model_batch_size", len(batch), model=model)
+        outputs = pipe(batch, batch_size=len(batch), truncation=True, max_length=max_length, **kwargs)
+        for i, output in zip(indices, outputs):
+            results[i] = output
+    return results
@@ -0,0 +1,93 @@
+"""
+Proses inferensi bersama: model transformer dimuat sekali di sini, lalu setiap worker uvicorn
+memanggilnya lewat multiprocessing.managers, sehingga N worker tidak menyimpan N salinan bobot model.
+
+Menjalankan server (dari direktori backend):
+    INFERENCE_SERVER_ADDRESS=127.0.0.1:50051 INFERENCE_SERVER_AUTHKEY=<rahasia> python -m modules.inference_server
+Worker web memakai server ini jika INFERENCE_SERVER_ADDRESS dan INFERENCE_SERVER_AUTHKEY yang sama diset.
+
+multiprocessing.managers memakai pickle, jadi koneksi dengan authkey yang benar sama dengan eksekusi
+kode di proses server. Karena itu server maupun klien menolak berjalan tanpa authkey eksplisit, dan
+server hanya listen di INFERENCE_SERVER_BIND_HOST (default 127.0.0.1).
+"""
+import threading
+from multiprocessing.managers import BaseManager
+
+from config import INFERENCE_SERVER_ADDRESS, INFERENCE_SERVER_AUTHKEY, INFERENCE_SERVER_BIND_HOST
+
+
+class InferenceManager(BaseManager):
+    pass
+
+
+def _parse_address(address: str) -> tuple:
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+def _require_authkey(authkey: str) -> bytes:
+    if not authkey:
+        raise RuntimeError("INFERENCE_SERVER_AUTHKEY harus diisi nilai rahasia sendiri untuk memakai server inferensi.")
+    return authkey.encode("utf-8")
+
+
+class PipelineService:
+    """Objek yang hidup di proses server; satu lock agar model tidak dijalankan bersamaan."""
+
+    def __init__(self):
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def run(self, name: str, texts: list, kwargs: dict) -> list:
+        from modules.comment_analyzer import load_local_pipeline
+
+        with self._lock:
+            pipe = self._pipelines.get(name)
+            if pipe is None:
+                pipe = self._pipelines[name] = load_local_pipeline(name)
+            return pipe(texts, **kwargs)
+
+    def warm_up(self):
+        for name in ("sentiment", "emotion"):
+            self.run(name, ["warm up"], {})
+
+
+class RemotePipeline:
+    """Pengganti pipeline lokal yang meneruskan pemanggilan ke proses inferensi bersama."""
+
+    def __init__(self, name: str, address: str = INFERENCE_SERVER_ADDRESS, authkey: str = INFERENCE_SERVER_AUTHKEY):
+        self.name = name
+        self.address = _parse_address(address)
+        self.authkey = _require_authkey(authkey)
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _get_service(self):
+        with self._lock:
+            if self._service is None:
+                InferenceManager.register("inference")
+                manager = InferenceManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._service = manager.inference()
+            return self._service
+
+    def __call__(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        results = self._get_service().run(self.name, [texts] if single else list(texts), kwargs)
+        return results[0] if single else results
+
+
+def serve(address: str = INFERENCE_SERVER_ADDRESS, authkey: str = INFERENCE_SERVER_AUTHKEY, bind_host: str = INFERENCE_SERVER_BIND_HOST):
+    authkey_bytes = _require_authkey(authkey)
+    _, port = _parse_address(address or "127.0.0.1:50051")
+    service = PipelineService()
+    print("Memuat model AI untuk proses inferensi bersama...")
+    service.warm_up()
+    InferenceManager.register("inference", callable=lambda: service)
+    manager = InferenceManager(address=(bind_host, port), authkey=authkey_bytes)
+    server = manager.get_server()
+    print(f"Server inferensi berjalan di {server.address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
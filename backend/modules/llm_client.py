@@ -0,0 +1,366 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterable, Optional
+
+import google.generativeai as genai
+
+from config import (
+    GEMINI_API_KEY, LLM_MODEL, LLM_FAKE_LATENCY, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_MAX_CONCURRENCY,
+    LLM_RATE_PER_MINUTE, LLM_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BACKOFF,
+)
+from modules import telemetry
+
+
+class LLMTimeout(Exception):
+    pass
+
+class LLMResponseError(Exception):
+    """Respons model tidak bisa di-parse atau tidak berisi kunci yang diharapkan."""
+
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+def parse_json_response(text: str, required_keys: Iterable[str] = ()) -> Any:
+    cleaned = text.strip().replace("```json", "").replace("```", "")
+    try:
+        value = json.loads(cleaned)
+    except ValueError as e:
+        raise LLMResponseError(f"Respons bukan JSON yang valid: {e}")
+    missing = [key for key in required_keys if not isinstance(value, dict) or key not in value]
+    if missing:
+        raise LLMResponseError(f"Respons tidak memiliki kunci: {', '.join(missing)}")
+    return value
+
+
+class StreamedResponse:
+    """Gabungan potongan respons streaming, dengan atribut yang sama seperti respons biasa."""
+
+    def __init__(self, text: str, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeModel:
+    """
+    Pengganti GenerativeModel untuk pengujian dan benchmark lokal (LLM_MODEL=fake): tidak memanggil
+    jaringan, hanya menunggu `latency` detik lalu mengembalikan JSON yang memuat kunci semua prompt.
+    """
+
+    RESPONSE = {
+        "joker_keywords": ["bodo amat", "semua sama saja"],
+        "thanos_keywords": ["harus dihapus"],
+        "analysis_summary": "Respons dari model palsu.",
+        "community_vibe": "Netral",
+        "main_themes": ["Topik 1", "Topik 2", "Topik 3"],
+        "analysis": "Respons dari model palsu.",
+        "challenges": [
+            {"type": "membaca", "title": "Baca satu bab buku", "description": "Respons dari model palsu."},
+            {"type": "menulis", "title": "Tulis satu halaman jurnal", "description": "Respons dari model palsu."},
+            {"type": "interaksi", "title": "Makan siang bersama teman", "description": "Respons dari model palsu."},
+        ],
+    }
+
+    def __init__(self, latency: float = LLM_FAKE_LATENCY, response: Optional[dict] = None):
+        self.latency = latency
+        self.response = response or self.RESPONSE
+        self.calls = 0
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = json.dumps(self.response)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency)
+        return StreamedResponse(text)
+
+    def _stream(self, text: str, parts: int = 5):
+        size = -(-len(text) // parts)
+        for start in range(0, len(text), size):
+            time.sleep(self.latency / parts)
+            yield StreamedResponse(text[start:start + size])
+
+
+class LLMCache:
+    """Cache respons yang sudah di-parse di SQLite, dengan kunci hash (model, prompt) dan TTL per entri."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + (ttl or self.ttl)),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {"entries": entries}
+
+
+class TokenBucket:
+    """Pembatas laju sederhana: `rate` token per detik dengan kapasitas `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LLMClient:
+    """
+    Satu-satunya jalur pemanggilan LLM di aplikasi. Setiap prompt melewati: cache persisten
+    (hash prompt), penggabungan prompt identik yang sedang berjalan, pembatas konkurensi dan laju,
+    timeout dengan retry/backoff, lalu parse JSON. Jika semuanya gagal, `fallback(pesan_error)`
+    dikembalikan sehingga pemanggil selalu menerima struktur yang sama.
+    """
+
+    def __init__(self, model, model_name: str = LLM_MODEL, cache: Optional[LLMCache] = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, rate_per_minute: float = LLM_RATE_PER_MINUTE,
+                 timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES, backoff: float = LLM_RETRY_BACKOFF):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_minute / 60, max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = dict.fromkeys(
+            ("requests", "cache_hits", "coalesced", "calls", "errors", "timeouts", "retries", "fallbacks",
+             "prompt_tokens", "output_tokens", "latency_ms_total", "latency_ms_max"), 0
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    def generate_json(self, prompt: str, fallback: Callable[[str], Any], required_keys: Iterable[str] = (),
+                      ttl: Optional[int] = None, on_chunk: Optional[Callable[[str], None]] = None,
+                      validate: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Jika on_chunk diberikan, respons diminta secara streaming dan setiap potongan teks diteruskan
+        ke on_chunk begitu tiba (dari thread pemanggil LLM). Hasil dari cache atau dari prompt identik
+        yang sedang berjalan dikembalikan utuh tanpa potongan. validate(value) boleh melempar
+        LLMResponseError untuk menolak respons yang strukturnya salah sebelum masuk cache.
+        """
+        self._count("requests")
+        key = prompt_key(self.model_name, prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+        if self.model is None:
+            self._count("fallbacks")
+            return fallback("Analisis Gemini tidak tersedia.")
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = future = Future()
+        if pending is not None:
+            self._count("coalesced")
+            try:
+                return pending.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                self._count("timeouts")
+                self._count("fallbacks")
+                return fallback(f"Error: menunggu pemanggilan LLM yang sama melebihi {self.timeout} detik.")
+            except Exception as e:
+                self._count("fallbacks")
+                return fallback(f"Error: {e}")
+
+        try:
+            value = self._generate_or_fallback(key, prompt, fallback, tuple(required_keys), ttl, on_chunk, validate)
+        except BaseException as e:
+            # Mis. KeyboardInterrupt atau pembatalan: penunggu yang tergabung tetap dibangunkan dan memakai fallback
+            future.set_exception(LLMResponseError(f"Pemanggilan LLM dibatalkan: {type(e).__name__}"))
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return value
+
+    def _generate_or_fallback(self, key: str, prompt: str, fallback: Callable[[str], Any], required_keys: tuple,
+                              ttl: Optional[int], on_chunk: Optional[Callable[[str], None]],
+                              validate: Optional[Callable[[Any], None]]) -> Any:
+        try:
+            value = self._generate_with_retry(prompt, required_keys, on_chunk, validate)
+        except Exception as e:
+            print(f"Error saat memanggil LLM: {e}")
+            self._count("fallbacks")
+            return fallback(f"Error: {e}")
+        # Hanya respons yang valid yang di-cache; fallback dicoba ulang pada permintaan berikutnya
+        self._store(key, value, ttl)
+        return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[int]):
+        if self.cache is None:
+            return
+        try:
+            self.cache.set(key, value, ttl)
+        except sqlite3.Error as e:
+            print(f"Error saat menyimpan cache LLM: {e}")
+
+    def _generate_with_retry(self, prompt: str, required_keys: tuple, on_chunk: Optional[Callable[[str], None]] = None,
+                             validate: Optional[Callable[[Any], None]] = None) -> Any:
+        attempt = 0
+        delivered = []
+
+        def forward(text: str):
+            delivered.append(len(text))
+            on_chunk(text)
+
+        while True:
+            try:
+                response = self._call(prompt, forward if on_chunk else None)
+                value = parse_json_response(response.text, required_keys)
+                if validate is not None:
+                    validate(value)
+                return value
+            except LLMResponseError:
+                # Respons yang salah format tidak diulang agar kuota tidak habis untuk prompt yang sama
+                self._count("errors")
+                raise
+            except Exception:
+                self._count("errors")
+                # Potongan yang sudah terkirim ke klien tidak bisa ditarik, jadi streaming tidak diulang
+                if attempt >= self.max_retries or delivered:
+                    raise
+            attempt += 1
+            self._count("retries")
+            time.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    def _call(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None):
+        deadline = time.monotonic() + self.timeout
+        if not self._semaphore.acquire(timeout=self.timeout) or not self._bucket.acquire(deadline - time.monotonic()):
+            self._count("timeouts")
+            raise LLMTimeout("Antrean pemanggilan LLM penuh.")
+        # Slot konkurensi baru dilepas saat pemanggilan benar-benar selesai, termasuk yang sudah timeout
+        future = self._executor.submit(self._invoke, prompt, on_chunk)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            self._count("timeouts")
+            raise LLMTimeout(f"Pemanggilan LLM melebihi {self.timeout} detik.")
+
+    def _invoke(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None):
+        started = time.perf_counter()
+        kwargs = {"request_options": {"timeout": self.timeout}} if isinstance(self.model, genai.GenerativeModel) else {}
+        try:
+            if on_chunk is None:
+                response = self.model.generate_content(prompt, **kwargs)
+            else:
+                response = self._consume_stream(self.model.generate_content(prompt, stream=True, **kwargs), on_chunk)
+        finally:
+            self._semaphore.release()
+        latency_ms = (time.perf_counter() - started) * 1000
+        telemetry.observe("psychemap_llm_call_duration_seconds", latency_ms / 1000)
+        telemetry.count("psychemap_llm_events_total", event="calls")
+        usage = getattr(response, "usage_metadata", None)
+        with self._metrics_lock:
+            self._metrics["calls"] += 1
+            self._metrics["latency_ms_total"] += latency_ms
+            self._metrics["latency_ms_max"] = max(self._metrics["latency_ms_max"], latency_ms)
+            # Tanpa usage_metadata (mis. model palsu), jumlah token diperkirakan ~4 karakter per token
+            self._metrics["prompt_tokens"] += getattr(usage, "prompt_token_count", None) or len(prompt) // 4
+            self._metrics["output_tokens"] += getattr(usage, "candidates_token_count", None) or len(response.text) // 4
+        return response
+
+    @staticmethod
+    def _consume_stream(chunks, on_chunk: Callable[[str], None]) -> "StreamedResponse":
+        parts = []
+        usage = None
+        for chunk in chunks:
+            if chunk.text:
+                parts.append(chunk.text)
+                on_chunk(chunk.text)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+        return StreamedResponse("".join(parts), usage)
+
+    def _count(self, name: str):
+        telemetry.count("psychemap_llm_events_total", event=name)
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["latency_ms_avg"] = round(metrics["latency_ms_total"] / metrics["calls"], 2) if metrics["calls"] else 0.0
+        metrics["latency_ms_total"] = round(metrics["latency_ms_total"], 2)
+        metrics["latency_ms_max"] = round(metrics["latency_ms_max"], 2)
+        metrics["model"] = self.model_name
+        if self.cache is not None:
+            metrics["cache"] = self.cache.stats()
+        return metrics
+
+
+def create_model():
+    if LLM_MODEL == "fake":
+        return FakeModel()
+    try:
+        genai.configure(api_key=GEMINI_API_KEY)
+        return genai.GenerativeModel(LLM_MODEL)
+    except Exception as e:
+        print(f"Error saat konfigurasi Gemini: {e}")
+        return None
+
+def create_llm_cache() -> Optional[LLMCache]:
+    try:
+        return LLMCache()
+    except sqlite3.Error as e:
+        print(f"Error saat membuka cache LLM: {e}")
+        return None
+
+llm_client = LLMClient(create_model(), cache=create_llm_cache())
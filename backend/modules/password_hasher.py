@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+_context: Optional[CryptContext] = None
+
+
+def get_context() -> CryptContext:
+    # Dibuat sekali per proses (proses utama maupun setiap worker di pool)
+    global _context
+    if _context is None:
+        _context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _context
+
+def hash_password_sync(password: str) -> str:
+    return get_context().hash(password)
+
+def verify_and_update_sync(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Memverifikasi password dan, jika hash lama dibuat dengan cost berbeda dari BCRYPT_ROUNDS,
+    mengembalikan hash baru untuk disimpan. Tanpa hash (username tidak ada) tetap dijalankan
+    verifikasi palsu agar waktu respons tidak membocorkan keberadaan username.
+    """
+    context = get_context()
+    if not hashed_password:
+        context.dummy_verify()
+        return False, None
+    return context.verify_and_update(password, hashed_password)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending: Optional[asyncio.Semaphore] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # "spawn" agar worker tidak mewarisi thread dan koneksi database dari proses server
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+async def _run(fn, *args):
+    """
+    Menjalankan bcrypt di process pool khusus dan menunggunya secara async, sehingga login beruntun
+    tidak menahan thread di threadpool FastAPI yang juga dipakai endpoint analisis. Jumlah pekerjaan
+    yang menunggu dibatasi PASSWORD_HASH_MAX_PENDING; sisanya antre di sini, bukan di memori pool.
+    PASSWORD_HASH_WORKERS=0 kembali ke threadpool (perilaku lama).
+    """
+    global _pending
+    if PASSWORD_HASH_WORKERS <= 0:
+        return await run_in_threadpool(fn, *args)
+    if _pending is None:
+        _pending = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _pending:
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_password_sync, password)
+
+async def verify_and_update(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await _run(verify_and_update_sync, password, hashed_password)
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
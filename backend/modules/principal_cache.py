@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from cachetools import TTLCache
+
+from config import AUTH_CACHE_TTL, AUTH_CACHE_MAXSIZE
+
+
+class PrincipalCache:
+    """
+    Cache token yang sudah diverifikasi -> principal (pengguna), dibatasi ukuran dan TTL. Setiap entri
+    juga membawa waktu kedaluwarsanya sendiri (klaim exp token), sehingga token tidak pernah dianggap
+    valid lebih lama dari exp walaupun TTL cache belum habis. Kunci berupa hash token, bukan token asli.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAXSIZE, ttl: int = AUTH_CACHE_TTL):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._keys_by_subject: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Any]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, subject: str, principal: Any, expires_at: float):
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (principal, expires_at)
+            # Indeks balik untuk invalidasi per pengguna; kunci yang sudah dibuang TTLCache ikut dirapikan
+            keys = {k for k in self._keys_by_subject.get(subject, ()) if k in self._entries}
+            keys.add(key)
+            self._keys_by_subject[subject] = keys
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            if self._entries.pop(self._key(token), None) is not None:
+                self.invalidations += 1
+
+    def invalidate_subject(self, subject: str):
+        """Membuang semua token milik satu pengguna, misalnya setelah password diganti atau akun dihapus."""
+        with self._lock:
+            for key in self._keys_by_subject.pop(subject, ()):
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_subject.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# AUTH_CACHE_TTL=0 mematikan cache: setiap request kembali memverifikasi token dan membaca pengguna dari database
+principal_cache = PrincipalCache() if AUTH_CACHE_TTL > 0 else None
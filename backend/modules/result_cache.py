@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+
+from config import RESULT_CACHE_BACKEND, RESULT_CACHE_PATH, RESULT_CACHE_TTL, RESULT_CACHE_MAXSIZE
+from modules import telemetry
+
+
+def key_for(parsed_input: dict) -> str:
+    """Kunci cache dari hasil parse_youtube_input, sehingga youtu.be/X dan watch?v=X berbagi entri."""
+    return f"{parsed_input['type']}:{parsed_input['id']}"
+
+def parsed_from_key(key: str) -> dict:
+    input_type, _, input_id = key.partition(":")
+    return {"type": input_type, "id": input_id}
+
+
+# Field hasil yang hanya berlaku untuk permintaan yang benar-benar menjalankan pipeline
+PER_REQUEST_FIELDS = ("api_usage", "stage_timings_ms")
+
+def _without_request_fields(result: dict) -> dict:
+    return {name: value for name, value in result.items() if name not in PER_REQUEST_FIELDS}
+
+
+class _CountingTTLCache(TTLCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        self.evictions += 1
+        return super().popitem()
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired or ())
+        return expired
+
+
+class MemoryBackend:
+    """Cache TTL di memori proses ini (perilaku lama), dengan lock agar aman di threadpool."""
+
+    def __init__(self, maxsize: int = RESULT_CACHE_MAXSIZE, ttl: int = RESULT_CACHE_TTL):
+        self._cache = _CountingTTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._cache[key] = value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "evictions": self._cache.evictions, "expirations": self._cache.expirations}
+
+
+class SQLiteBackend:
+    """Cache di file SQLite yang bisa dipakai bersama oleh beberapa worker dan bertahan saat restart."""
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, maxsize: int = RESULT_CACHE_MAXSIZE, ttl: int = RESULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM result_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now + self.ttl),
+            )
+            self.expirations += self._conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,)).rowcount
+            self.evictions += self._conn.execute(
+                "DELETE FROM result_cache WHERE key IN (SELECT key FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        return {"entries": entries, "evictions": self.evictions, "expirations": self.expirations}
+
+
+class ResultCache:
+    """
+    Lapisan cache hasil analisis dengan single-flight: permintaan bersamaan untuk kunci yang sama
+    menunggu satu komputasi yang sedang berjalan alih-alih menjalankan pipeline berulang kali.
+    Single-flight berlaku per proses; backend SQLite membagikan hasil yang sudah jadi antar worker.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight = {}  # key -> asyncio.Task komputasi, hanya diakses dari event loop
+        # Target mentah -> kunci ternormalisasi, agar handle channel tidak di-resolve ulang lewat search API
+        self._aliases = TTLCache(maxsize=1000, ttl=RESULT_CACHE_TTL)
+        self._aliases_lock = threading.Lock()
+
+    def resolve_target(self, target: str, parse_fn: Callable[[str], dict]) -> Optional[str]:
+        with self._aliases_lock:
+            key = self._aliases.get(target)
+        if key is not None:
+            return key
+        parsed_input = parse_fn(target)
+        if parsed_input["type"] == "unknown":
+            return None
+        key = key_for(parsed_input)
+        with self._aliases_lock:
+            self._aliases[target] = key
+        return key
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> Tuple[dict, str]:
+        """
+        Mengembalikan (hasil, sumber) dengan sumber "cache", "coalesced", atau "computed".
+        Komputasi berjalan sebagai task terpisah yang ditunggu lewat shield, sehingga klien yang
+        terputus hanya membatalkan penantiannya sendiri; penunggu lain tetap menerima hasilnya.
+        Pada sumber "cache" dan "coalesced", field per permintaan (PER_REQUEST_FIELDS) dibuang
+        karena kuota dan waktu itu dipakai oleh permintaan lain.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            telemetry.count("psychemap_cache_requests_total", cache="result", result="coalesced")
+            result, _ = await asyncio.shield(task)
+            return _without_request_fields(result), "coalesced"
+
+        task = asyncio.ensure_future(self._lookup_or_compute(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        result, source = await asyncio.shield(task)
+        if source == "cache":
+            return _without_request_fields(result), source
+        return result, source
+
+    async def _lookup_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> Tuple[dict, str]:
+        cached = await run_in_threadpool(self.backend.get, key)
+        if cached is not None:
+            self.hits += 1
+            telemetry.count("psychemap_cache_requests_total", cache="result", result="hit")
+            return cached, "cache"
+
+        self.misses += 1
+        telemetry.count("psychemap_cache_requests_total", cache="result", result="miss")
+        result = await compute()
+        await run_in_threadpool(self.backend.set, key, result)
+        return result, "computed"
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Hindari peringatan "exception was never retrieved" jika semua penunggu sudah terputus
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._inflight),
+            **self.backend.stats(),
+        }
+
+
+def create_result_cache() -> ResultCache:
+    if RESULT_CACHE_BACKEND == "sqlite":
+        return ResultCache(SQLiteBackend())
+    return ResultCache(MemoryBackend())
+
+result_cache = create_result_cache()
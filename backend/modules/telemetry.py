@@ -0,0 +1,183 @@
+import bisect
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import TELEMETRY_ENABLED, SERVER_TIMING_ENABLED
+
+# Instrumentasi ringan tanpa dependensi: counter dan histogram di memori proses, dirender dalam
+# format teks Prometheus oleh /metrics. Jika TELEMETRY_ENABLED mati, setiap fungsi pencatat langsung
+# kembali dan span() mengembalikan context manager kosong yang sama, jadi biayanya hampir nol.
+# Catatan: dengan beberapa worker uvicorn, setiap proses punya metriknya sendiri.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+METRICS = {
+    "psychemap_stage_duration_seconds": ("histogram", "Durasi tahap pipeline dan span lain", DURATION_BUCKETS),
+    "psychemap_http_requests_total": ("counter", "Jumlah request HTTP per route dan status", None),
+    "psychemap_http_request_duration_seconds": ("histogram", "Durasi request HTTP per route", DURATION_BUCKETS),
+    "psychemap_cache_requests_total": ("counter", "Lookup cache per cache dan hasil (hit/miss)", None),
+    "psychemap_youtube_api_calls_total": ("counter", "Pemanggilan YouTube Data API per endpoint", None),
+    "psychemap_llm_events_total": ("counter", "Kejadian klien LLM (requests, calls, cache_hits, errors, ...)", None),
+    "psychemap_llm_call_duration_seconds": ("histogram", "Durasi pemanggilan model LLM", DURATION_BUCKETS),
+    "psychemap_comments_processed_total": ("counter", "Komentar yang diproses pipeline analisis", None),
+    "psychemap_model_batch_size": ("histogram", "Ukuran batch yang dikirim ke pipeline model", BATCH_SIZE_BUCKETS),
+}
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Tuple, float]] = {name: {} for name, (kind, _, _) in METRICS.items() if kind == "counter"}
+_histograms: Dict[str, Dict[Tuple, list]] = {name: {} for name, (kind, _, _) in METRICS.items() if kind == "histogram"}
+
+# Span yang selesai selama request ini, untuk header Server-Timing; None di luar request
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("request_spans", default=None)
+
+
+def count(name: str, amount: float = 1, **labels):
+    if not TELEMETRY_ENABLED or not amount:
+        return
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        series = _counters[name]
+        series[key] = series.get(key, 0) + amount
+
+def observe(name: str, value: float, **labels):
+    if not TELEMETRY_ENABLED:
+        return
+    buckets = METRICS[name][2]
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        state = _histograms[name].get(key)
+        if state is None:
+            # [jumlah per bucket (non-kumulatif, +Inf di akhir), sum, count]
+            state = _histograms[name][key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+def record_span(name: str, seconds: float):
+    """Mencatat durasi yang sudah diukur pemanggil (mis. StageTimer) sebagai span."""
+    if not TELEMETRY_ENABLED:
+        return
+    observe("psychemap_stage_duration_seconds", seconds, stage=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name: str):
+    """with telemetry.span("db_commit"): ... mencatat durasi blok sebagai histogram dan Server-Timing."""
+    return _Span(name) if TELEMETRY_ENABLED else _NOOP_SPAN
+
+
+def _format_labels(labels: Tuple, extra: Optional[Tuple] = None) -> str:
+    items = list(labels) + list(extra or ())
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def render_prometheus() -> str:
+    """Semua metrik dalam format eksposisi teks Prometheus 0.0.4."""
+    lines = []
+    with _lock:
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(_counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                continue
+            for labels, (bucket_counts, total, observations) in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ["+Inf"], bucket_counts):
+                    cumulative += bucket_count
+                    le = bound if bound == "+Inf" else _format_number(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {observations}")
+    return "\n".join(lines) + "\n"
+
+def reset():
+    with _lock:
+        for series in list(_counters.values()) + list(_histograms.values()):
+            series.clear()
+
+
+def _server_timing_header(spans: List[Tuple[str, float]], total: float) -> bytes:
+    # Span dengan nama sama (mis. beberapa commit) dijumlahkan; urutan mengikuti span pertama selesai
+    durations: Dict[str, float] = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()).encode("latin-1")
+
+
+class TelemetryMiddleware:
+    """
+    Middleware ASGI murni (tanpa BaseHTTPMiddleware, sehingga streaming SSE tidak terganggu) yang
+    mencatat jumlah dan durasi request per route, dan jika SERVER_TIMING_ENABLED menambahkan header
+    Server-Timing berisi span yang selesai sebelum header respons dikirim.
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if self.server_timing:
+                    header = _server_timing_header(spans, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            # Template route (mis. /api/jobs/{job_id}), bukan path mentah, agar jumlah seri tetap terbatas
+            route = getattr(scope.get("route"), "path", "unmatched")
+            count("psychemap_http_requests_total", method=scope["method"], route=route, status=str(status["code"]))
+            observe("psychemap_http_request_duration_seconds", time.perf_counter() - started, method=scope["method"], route=route)
@@ -0,0 +1,88 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# pyahocorasick (requirements.txt) mencocokkan semua frasa dalam satu lintasan automaton per komentar.
+# Jika tidak terpasang, setiap frasa dicek dengan `in` pada teks yang sudah di-lowercase, yang jauh lebih lambat.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+    print("Peringatan: pyahocorasick tidak terpasang, pencocokan frasa memakai pencarian per frasa yang lebih lambat.")
+
+
+class PhraseMatcher:
+    """Mencocokkan banyak frasa sekaligus dan mengembalikan matriks hit (komentar x frasa)."""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(dict.fromkeys(p.lower() for p in phrases if p))
+        self._automaton = None
+        if ahocorasick is not None and self.phrases:
+            self._automaton = ahocorasick.Automaton()
+            for index, phrase in enumerate(self.phrases):
+                self._automaton.add_word(phrase, index)
+            self._automaton.make_automaton()
+
+    def hits(self, lowered_texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(lowered_texts), len(self.phrases)), dtype=bool)
+        if not self.phrases or not lowered_texts:
+            return matrix
+        if self._automaton is None:
+            for index, phrase in enumerate(self.phrases):
+                matrix[:, index] = np.fromiter((phrase in text for text in lowered_texts), dtype=bool, count=len(lowered_texts))
+            return matrix
+        rows, cols = [], []
+        for row, text in enumerate(lowered_texts):
+            for _, index in self._automaton.iter(text):
+                rows.append(row)
+                cols.append(index)
+        matrix[rows, cols] = True
+        return matrix
+
+
+class TextMetrics:
+    """
+    Representasi teks komentar yang dibagi oleh semua metrik: setiap komentar di-lowercase dan
+    di-tokenisasi sekali, dan setiap kumpulan frasa disimpan sebagai matriks hit per komentar
+    sehingga metrik berikutnya tinggal menjumlahkan kolom alih-alih memindai ulang korpus.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        self.lowered = [str(text).lower() for text in texts]
+        self.comment_count = len(self.lowered)
+        self.word_count = 0
+        vocabulary = set()
+        for text in self.lowered:
+            words = text.split()
+            self.word_count += len(words)
+            vocabulary.update(words)
+        self.unique_word_count = len(vocabulary)
+        self._hits: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, phrase_sets: Optional[Dict[str, Iterable[str]]] = None) -> "TextMetrics":
+        texts = df['text'].dropna().astype(str) if 'text' in df else pd.Series(dtype=str)
+        metrics = cls(texts.tolist())
+        if phrase_sets:
+            metrics.match(phrase_sets)
+        return metrics
+
+    def match(self, phrase_sets: Dict[str, Iterable[str]]):
+        """Mencocokkan beberapa kumpulan frasa dalam satu lintasan, lalu memotong matriksnya per kumpulan."""
+        phrase_sets = {name: [p.lower() for p in phrases if p] for name, phrases in phrase_sets.items()}
+        matcher = PhraseMatcher(p for phrases in phrase_sets.values() for p in phrases)
+        hits = matcher.hits(self.lowered)
+        column = {phrase: index for index, phrase in enumerate(matcher.phrases)}
+        for name, phrases in phrase_sets.items():
+            self._hits[name] = hits[:, [column[p] for p in dict.fromkeys(phrases)]]
+
+    def hits(self, name: str) -> np.ndarray:
+        return self._hits[name]
+
+    def total_hits(self, name: str) -> int:
+        """Jumlah pasangan (komentar, frasa) yang cocok: satu komentar bisa menyumbang beberapa frasa."""
+        return int(self._hits[name].sum())
+
+    def comments_matching_any(self, name: str) -> int:
+        return int(self._hits[name].any(axis=1).sum())
@@ -0,0 +1,98 @@
+import json
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "url_rules.json")
+HOST_CACHE_SIZE = 65536
+
+
+def normalize_host(raw_host: str) -> str:
+    """Host huruf kecil tanpa userinfo, port, query, atau titik di akhir."""
+    for delimiter in "?#":
+        raw_host = raw_host.partition(delimiter)[0]
+    return raw_host.rpartition("@")[2].partition(":")[0].lower().rstrip(".")
+
+def split_url(url: str) -> Tuple[str, str]:
+    """Memisahkan bagian host (mentah) dan path tanpa "/" di depan, dengan satu kali str.split."""
+    parts = url.split("/", 3)
+    if len(parts) > 2 and parts[1] == "" and (parts[0] == "" or parts[0][-1:] == ":"):
+        return parts[2], parts[3] if len(parts) > 3 else ""
+    return parts[0], "/".join(parts[1:])
+
+
+class URLClassifier:
+    """
+    Mengklasifikasi URL ke kategori konten berdasarkan tabel aturan domain. Host diurai sekali,
+    lalu akhiran domain (www.youtube.com -> youtube.com -> com) dicari di indeks hash; aturan
+    path-prefix milik domain yang cocok diperiksa sebelum kategori domain itu sendiri.
+    """
+
+    def __init__(self, rules: dict, categories: Optional[Iterable[str]] = None):
+        self.default = rules.get("default", "other")
+        self._index: Dict[str, Tuple[Optional[str], Tuple[Tuple[str, str], ...]]] = {}
+        for domain, category in rules.get("domains", {}).items():
+            self._index[domain.lower()] = (category, ())
+        for domain, path_rules in rules.get("paths", {}).items():
+            category, _ = self._index.get(domain.lower(), (None, ()))
+            # Prefix terpanjang diperiksa lebih dulu agar aturan yang lebih spesifik menang
+            ordered = tuple(sorted(((prefix.lstrip("/"), cat) for prefix, cat in path_rules), key=lambda rule: -len(rule[0])))
+            self._index[domain.lower()] = (category, ordered)
+
+        if categories is not None:
+            allowed = set(categories)
+            used = {self.default} | {cat for cat, _ in self._index.values() if cat} | {
+                cat for _, path_rules in self._index.values() for _, cat in path_rules
+            }
+            unknown = used - allowed
+            if unknown:
+                raise ValueError(f"Kategori tidak dikenal di aturan URL: {sorted(unknown)}")
+
+        # Cache host mentah -> entri indeks; jumlah host unik pada riwayat browsing relatif kecil
+        self._host_cache: Dict[str, Optional[tuple]] = {}
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, categories: Optional[Iterable[str]] = None) -> "URLClassifier":
+        with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as f:
+            return cls(json.load(f), categories=categories)
+
+    def _lookup_host(self, raw_host: str):
+        try:
+            return self._host_cache[raw_host]
+        except KeyError:
+            pass
+        if len(self._host_cache) >= HOST_CACHE_SIZE:
+            self._host_cache.clear()
+        entry = self._host_cache[raw_host] = self._find_domain(normalize_host(raw_host))
+        return entry
+
+    def _find_domain(self, host: str):
+        while host:
+            entry = self._index.get(host)
+            if entry is not None:
+                return entry
+            dot = host.find(".")
+            if dot < 0:
+                break
+            host = host[dot + 1:]
+        return None
+
+    def classify(self, url: str) -> str:
+        if not url:
+            return self.default
+        raw_host, path = split_url(url)
+        entry = self._lookup_host(raw_host)
+        if entry is None:
+            return self.default
+        category, path_rules = entry
+        for prefix, path_category in path_rules:
+            if path.startswith(prefix):
+                return path_category
+        return category or self.default
+
+    def classify_many(self, urls: Iterable[str]) -> List[str]:
+        classify = self.classify
+        return [classify(url) for url in urls]
+
+    def count(self, urls: Iterable[str]) -> Dict[str, int]:
+        return dict(Counter(map(self.classify, urls)))
@@ -0,0 +1,221 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case, event, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+import database
+from config import DASHBOARD_TREND_DAYS
+
+# Upsert atomik per dialek; keduanya punya on_conflict_do_update dengan tanda tangan yang sama
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Kolom yang ditimpa nilai terbaru atau diambil maksimumnya, bukan dijumlahkan
+_LATEST_COLUMNS = ("latest_archetype", "latest_brainrot_score")
+_MAX_COLUMNS = ("last_community_at", "last_behavior_at", "last_journal_at")
+
+ARCHETYPE_NAMES = {"joker": "Joker", "thanos": "Thanos", "neutral": "Netral"}
+LOW_FOCUS_BRAINROT_SCORE = 50
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class RollupDeltas:
+    """
+    Perubahan rollup dari sekumpulan baris Analysis/JournalEntry, dikelompokkan per pengguna dan
+    per (pengguna, hari), sehingga satu flush cukup menjalankan satu upsert per baris rollup.
+    """
+
+    def __init__(self):
+        self.users = defaultdict(dict)
+        self.days = defaultdict(dict)
+
+    @staticmethod
+    def _bump(values: dict, name: str, amount=1):
+        values[name] = values.get(name, 0) + amount
+
+    def add_analysis(self, row, timestamp: Optional[datetime]):
+        at = _utc(timestamp)
+        user = self.users[row.owner_id]
+        day = self.days[(row.owner_id, at.date())]
+        if row.analysis_type == "community":
+            for values in (user, day):
+                self._bump(values, "community_count")
+                if row.predicted_archetype:
+                    self._bump(values, f"{row.predicted_archetype}_count")
+            for name in ("joker_score", "thanos_score", "positive_percent", "negative_percent", "neutral_percent"):
+                self._bump(user, f"{name}_sum", getattr(row, name) or 0.0)
+            if row.predicted_archetype:
+                user["latest_archetype"] = row.predicted_archetype
+            user["last_community_at"] = max(user.get("last_community_at", at), at)
+        elif row.analysis_type == "behavior":
+            for values in (user, day):
+                self._bump(values, "behavior_count")
+                if row.brainrot_score is not None:
+                    self._bump(values, "brainrot_count")
+                    self._bump(values, "brainrot_score_sum", float(row.brainrot_score))
+            if row.brainrot_score is not None:
+                user["latest_brainrot_score"] = row.brainrot_score
+            user["last_behavior_at"] = max(user.get("last_behavior_at", at), at)
+
+    def add_journal(self, owner_id: int, timestamp: Optional[datetime]):
+        at = _utc(timestamp)
+        user = self.users[owner_id]
+        self._bump(user, "journal_count")
+        self._bump(self.days[(owner_id, at.date())], "journal_count")
+        user["last_journal_at"] = max(user.get("last_journal_at", at), at)
+
+    def apply(self, connection):
+        insert = _DIALECT_INSERTS[connection.dialect.name]
+        for owner_id, values in self.users.items():
+            _upsert(connection, insert, models.UserRollup.__table__, {"owner_id": owner_id}, values)
+        for (owner_id, day), values in self.days.items():
+            _upsert(connection, insert, models.UserDailyRollup.__table__, {"owner_id": owner_id, "day": day}, values)
+
+
+def _upsert(connection, insert, table, keys: dict, values: dict):
+    stmt = insert(table).values(**keys, **values)
+    if not values:
+        connection.execute(stmt.on_conflict_do_nothing(index_elements=list(keys)))
+        return
+    updates = {}
+    for name in values:
+        column, incoming = table.c[name], stmt.excluded[name]
+        if name in _LATEST_COLUMNS:
+            updates[name] = incoming
+        elif name in _MAX_COLUMNS:
+            updates[name] = case((column > incoming, column), else_=incoming)
+        else:
+            updates[name] = column + incoming
+    connection.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=updates))
+
+
+@event.listens_for(database.AppSession, "after_flush")
+def _apply_rollups(session: Session, flush_context):
+    """
+    Setiap Analysis/JournalEntry baru ikut memperbarui rollup dalam transaksi yang sama, jadi
+    rollup ikut di-rollback bersama barisnya. timestamp berasal dari server_default dan sudah
+    kedaluwarsa setelah flush, jadi waktunya dibaca dari state objek tanpa memicu query.
+    """
+    written = [obj for obj in session.new if isinstance(obj, (models.Analysis, models.JournalEntry))]
+    if not written:
+        return
+    deltas = RollupDeltas()
+    for obj in sorted(written, key=lambda o: o.id or 0):
+        if isinstance(obj, models.Analysis):
+            deltas.add_analysis(obj, sa_inspect(obj).dict.get("timestamp"))
+        elif isinstance(obj, models.JournalEntry):
+            deltas.add_journal(obj.owner_id, sa_inspect(obj).dict.get("timestamp"))
+    deltas.apply(session.connection())
+
+
+def rebuild_missing_rollups(db: Session, batch_size: int = 100) -> int:
+    """Membangun rollup dari riwayat untuk pengguna yang datanya sudah ada sebelum rollup diperkenalkan."""
+    Analysis, JournalEntry = models.Analysis, models.JournalEntry
+    owners = {row[0] for row in db.query(Analysis.owner_id).distinct()}
+    owners.update(row[0] for row in db.query(JournalEntry.owner_id).distinct())
+    owners -= {row[0] for row in db.query(models.UserRollup.owner_id)}
+    owners = sorted(owner for owner in owners if owner is not None)
+
+    for start in range(0, len(owners), batch_size):
+        chunk = owners[start:start + batch_size]
+        deltas = RollupDeltas()
+        analyses = db.query(
+            Analysis.owner_id, Analysis.analysis_type, Analysis.timestamp, Analysis.predicted_archetype,
+            Analysis.joker_score, Analysis.thanos_score, Analysis.positive_percent, Analysis.negative_percent,
+            Analysis.neutral_percent, Analysis.brainrot_score,
+        ).filter(Analysis.owner_id.in_(chunk)).order_by(Analysis.id)
+        for row in analyses.yield_per(1000):
+            deltas.add_analysis(row, row.timestamp)
+        journals = db.query(JournalEntry.owner_id, JournalEntry.timestamp).filter(JournalEntry.owner_id.in_(chunk))
+        for owner_id, timestamp in journals.yield_per(1000):
+            deltas.add_journal(owner_id, timestamp)
+        # Pengguna tanpa riwayat yang valid tetap mendapat baris agar tidak dibangun ulang di startup berikutnya
+        for owner_id in chunk:
+            deltas.users[owner_id]
+        deltas.apply(db.connection())
+        db.commit()
+    return len(owners)
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+def dashboard_summary(db: Session, owner_id: int, trend_days: int = DASHBOARD_TREND_DAYS) -> dict:
+    """Ringkasan dasbor dari satu baris rollup ditambah bucket harian dalam rentang trend_days."""
+    rollup = db.get(models.UserRollup, owner_id) or models.UserRollup(owner_id=owner_id)
+    since = datetime.now(timezone.utc).date() - timedelta(days=trend_days - 1)
+    buckets = db.query(models.UserDailyRollup).filter(
+        models.UserDailyRollup.owner_id == owner_id, models.UserDailyRollup.day >= since
+    ).order_by(models.UserDailyRollup.day).all()
+
+    community_count = rollup.community_count or 0
+    return {
+        "analysis_counts": {"community": community_count, "behavior": rollup.behavior_count or 0},
+        "last_analysis_at": {"community": rollup.last_community_at, "behavior": rollup.last_behavior_at},
+        "community": {
+            f"avg_{name}": _average(getattr(rollup, f"{name}_sum") or 0.0, community_count)
+            for name in ("joker_score", "thanos_score", "positive_percent", "negative_percent", "neutral_percent")
+        },
+        "behavior": {
+            "avg_brainrot_score": _average(rollup.brainrot_score_sum or 0.0, rollup.brainrot_count or 0),
+            "latest_brainrot_score": rollup.latest_brainrot_score,
+        },
+        "archetype_counts": {code: getattr(rollup, f"{code}_count") or 0 for code in ARCHETYPE_NAMES},
+        "latest_archetype": rollup.latest_archetype,
+        "journal_habit": _journal_habit(rollup.journal_count or 0),
+        "last_journal_at": rollup.last_journal_at,
+        "trend": [
+            {
+                "day": bucket.day,
+                "community_count": bucket.community_count,
+                "behavior_count": bucket.behavior_count,
+                "journal_count": bucket.journal_count,
+                "archetype_counts": {code: getattr(bucket, f"{code}_count") for code in ARCHETYPE_NAMES},
+                "avg_brainrot_score": _average(bucket.brainrot_score_sum, bucket.brainrot_count),
+            }
+            for bucket in buckets
+        ],
+    }
+
+def journal_version(db: Session, owner_id: int) -> tuple:
+    """(journal_count, last_journal_at) sebagai penanda versi daftar jurnal, untuk ETag."""
+    row = db.query(models.UserRollup.journal_count, models.UserRollup.last_journal_at).filter(
+        models.UserRollup.owner_id == owner_id
+    ).first()
+    return (row.journal_count or 0, row.last_journal_at) if row else (0, None)
+
+def _journal_habit(journal_count: int) -> str:
+    if journal_count <= 0:
+        return "belum pernah"
+    return "sesekali" if journal_count <= 5 else "rutin"
+
+def recovery_profile(db: Session, owner_id: int) -> dict:
+    """
+    Profil untuk generate_recovery_plan dari baris rollup. Skor dibulatkan dan jumlah jurnal
+    dikelompokkan (0 / 1-5 / 6+) agar profil (dan prompt yang di-cache LLM) tidak berubah
+    hanya karena selisih kecil rata-rata atau satu entri jurnal baru.
+    """
+    rollup = db.get(models.UserRollup, owner_id)
+    if rollup is None:
+        return {"dominant_archetype": ARCHETYPE_NAMES["neutral"], "low_focus_score": False, "journal_habit": _journal_habit(0)}
+    counts = {code: getattr(rollup, f"{code}_count") or 0 for code in ARCHETYPE_NAMES}
+    dominant = max(counts, key=lambda code: (counts[code], code == rollup.latest_archetype))
+    avg_brainrot = _average(rollup.brainrot_score_sum or 0.0, rollup.brainrot_count or 0)
+    profile = {
+        "dominant_archetype": ARCHETYPE_NAMES[dominant],
+        "low_focus_score": avg_brainrot is not None and avg_brainrot >= LOW_FOCUS_BRAINROT_SCORE,
+        "journal_habit": _journal_habit(rollup.journal_count or 0),
+    }
+    if avg_brainrot is not None:
+        profile["avg_brainrot_score"] = round(avg_brainrot)
+    return profile
@@ -1,7 +1,12 @@
 import re
-from googleapiclient.discovery import build
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+from googleapiclient.discovery import build, Resource
 from googleapiclient.errors import HttpError
-from config import YOUTUBE_API_KEY
+from config import YOUTUBE_API_KEY, YOUTUBE_MAX_CONCURRENCY
+from modules import telemetry
 
 try:
     youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
@@ -9,59 +14,201 @@ except Exception as e:
     youtube = None
     print(f"Error saat inisialisasi YouTube service: {e}")
 
-def get_video_ids_from_channel(channel_id: str) -> list[str]:
-    if not youtube: return []
+_thread_local = threading.local()
+
+# Biaya kuota YouTube Data API v3 per pemanggilan endpoint
+QUOTA_COSTS = {
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'commentThreads.list': 1,
+    'search.list': 100,
+}
+
+class QuotaUsage:
+    """Mencatat jumlah pemanggilan API dan unit kuota yang terpakai untuk satu analisis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def record(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            calls = dict(self.calls)
+        return {
+            "api_calls": sum(calls.values()),
+            "quota_units": sum(QUOTA_COSTS.get(endpoint, 1) * count for endpoint, count in calls.items()),
+            "calls_by_endpoint": calls,
+        }
+
+def _record(usage: Optional[QuotaUsage], endpoint: str):
+    # Dipanggil sebelum execute(): permintaan yang gagal dengan HttpError tetap memakai kuota
+    telemetry.count("psychemap_youtube_api_calls_total", endpoint=endpoint)
+    if usage is not None:
+        usage.record(endpoint)
+
+def iter_video_ids_from_channel(
+    channel_id: str, limit: Optional[int] = None, client=None, usage: Optional[QuotaUsage] = None
+) -> Iterator[str]:
+    """
+    Menghasilkan ID video dari playlist uploads secara lazy. Halaman berikutnya hanya
+    diminta ketika konsumen masih membutuhkan ID, dan berhenti setelah `limit` ID.
+    """
+    client = _get_client(client)
+    if not client: return
+    if limit is not None and limit <= 0: return
     try:
-        res = youtube.channels().list(id=channel_id, part='contentDetails').execute()
-        if not res.get('items'): return []
+        _record(usage, 'channels.list')
+        res = client.channels().list(id=channel_id, part='contentDetails').execute()
+        if not res.get('items'): return
         playlist_id = res['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        
-        video_ids = []
+
+        yielded = 0
         next_page_token = None
         while True:
-            res = youtube.playlistItems().list(
+            page_size = 50 if limit is None else min(50, limit - yielded)
+            _record(usage, 'playlistItems.list')
+            res = client.playlistItems().list(
                 playlistId=playlist_id, part='contentDetails',
-                maxResults=50, pageToken=next_page_token
+                maxResults=page_size, pageToken=next_page_token
             ).execute()
-            video_ids.extend([item['contentDetails']['videoId'] for item in res.get('items', [])])
+            for item in res.get('items', []):
+                yield item['contentDetails']['videoId']
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
             next_page_token = res.get('nextPageToken')
             if next_page_token is None:
-                break
-        return video_ids
+                return
     except HttpError as e:
         print(f"Error HTTP saat mengambil video dari channel: {e}")
-        return []
 
-def get_comments_from_videos(video_ids: list[str], max_videos: int = 10, max_comments_per_video: int = 50) -> list[dict]:
-    if not youtube: return []
-    all_comments = []
-    for video_id in video_ids[:max_videos]:
-        try:
-            next_page_token = None
-            comment_count = 0
-            while comment_count < max_comments_per_video:
-                res = youtube.commentThreads().list(
-                    part='snippet', videoId=video_id, maxResults=100,
-                    pageToken=next_page_token, textFormat='plainText'
-                ).execute()
-                
-                for item in res.get('items', []):
-                    comment = item['snippet']['topLevelComment']['snippet']
-                    all_comments.append({
-                        'video_id': video_id,
-                        'text': comment.get('textDisplay', ''),
-                    })
-                    comment_count += 1
-                
-                next_page_token = res.get('nextPageToken')
-                if next_page_token is None:
+def get_video_ids_from_channel(
+    channel_id: str, limit: Optional[int] = None, client=None, usage: Optional[QuotaUsage] = None
+) -> list[str]:
+    return list(iter_video_ids_from_channel(channel_id, limit=limit, client=client, usage=usage))
+
+def _get_client(client=None):
+    """Klien yang diberikan (mis. klien palsu untuk pengujian) atau service milik thread ini."""
+    if client is not None:
+        return client
+    if youtube is None:
+        return None
+    # httplib2 tidak thread-safe, jadi setiap worker memakai service discovery sendiri
+    if threading.current_thread() is threading.main_thread() or not isinstance(youtube, Resource):
+        return youtube
+    service = getattr(_thread_local, "youtube", None)
+    if service is None:
+        service = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+        _thread_local.youtube = service
+    return service
+
+def _fetch_comments_for_video(
+    client, video_id: str, max_comments: int, max_pages: Optional[int], usage: Optional[QuotaUsage] = None,
+    since: Optional[str] = None, page_token: Optional[str] = None, progress: Optional[dict] = None
+) -> list[dict]:
+    """
+    Komentar diminta berurutan dari yang terbaru (order='time'). Jika `since` (publishedAt ISO 8601)
+    diberikan, pengambilan berhenti di komentar pertama yang lebih lama dari watermark tersebut.
+    Komentar dengan publishedAt sama persis dengan watermark tetap diambil; duplikatnya disaring
+    berdasarkan comment_id oleh pemanggil. page_token melanjutkan pengambilan sebelumnya yang terpotong.
+
+    progress[video_id] diisi {"complete", "next_page_token", "newest"}: complete berarti pengambilan
+    mencapai `since` (atau komentar habis), sehingga watermark boleh dimajukan ke `newest`. Tanpa
+    `since` (pengambilan pertama) hanya komentar terbaru yang diinginkan, jadi selalu complete.
+    """
+    client = _get_client(client)
+    comments = []
+    next_page_token = page_token if since is not None else None
+    complete = False
+    newest = None
+    try:
+        page_count = 0
+        reached_watermark = False
+        while len(comments) < max_comments and not reached_watermark:
+            if max_pages is not None and page_count >= max_pages:
+                break
+            _record(usage, 'commentThreads.list')
+            res = client.commentThreads().list(
+                part='snippet', videoId=video_id, maxResults=100, order='time',
+                pageToken=next_page_token, textFormat='plainText'
+            ).execute()
+            page_count += 1
+
+            for item in res.get('items', []):
+                comment = item['snippet']['topLevelComment']['snippet']
+                published_at = comment.get('publishedAt')
+                # Format publishedAt seragam (RFC 3339 UTC), jadi perbandingan string sudah urut waktu
+                if since is not None and published_at is not None and published_at < since:
+                    reached_watermark = True
                     break
-        except HttpError as e:
-            print(f"Tidak bisa mengambil komentar untuk video {video_id}: {e}")
-            continue
-    return all_comments
+                if published_at is not None and (newest is None or published_at > newest):
+                    newest = published_at
+                comments.append({
+                    'video_id': video_id,
+                    'comment_id': item.get('id'),
+                    'published_at': published_at,
+                    'text': comment.get('textDisplay', ''),
+                })
+
+            next_page_token = res.get('nextPageToken')
+            if next_page_token is None:
+                complete = True
+                break
+        complete = complete or reached_watermark or since is None
+    except HttpError as e:
+        # Token lanjutan bisa kedaluwarsa; pengambilan berikutnya mulai lagi dari komentar terbaru
+        print(f"Tidak bisa mengambil komentar untuk video {video_id}: {e}")
+        complete = False
+        next_page_token = None
+    if progress is not None:
+        progress[video_id] = {"complete": complete, "next_page_token": None if complete else next_page_token, "newest": newest}
+    return comments
+
+def get_comments_from_videos(
+    video_ids: Iterable[str],
+    max_videos: int = 10,
+    max_comments_per_video: int = 50,
+    max_pages_per_video: Optional[int] = None,
+    max_concurrency: int = YOUTUBE_MAX_CONCURRENCY,
+    client=None,
+    usage: Optional[QuotaUsage] = None,
+    watermarks: Optional[dict] = None,
+    page_tokens: Optional[dict] = None,
+    progress: Optional[dict] = None,
+) -> list[dict]:
+    """
+    Mengambil komentar dari beberapa video. Jika max_concurrency > 1, halaman komentar
+    untuk video yang berbeda diambil secara paralel. Urutan hasil tetap mengikuti
+    urutan video_ids, dan HttpError pada satu video tidak menggagalkan video lainnya.
+    watermarks ({video_id: publishedAt}) membatasi pengambilan ke komentar baru saja, page_tokens
+    ({video_id: token}) melanjutkan pengambilan yang terpotong, dan progress diisi per video
+    (lihat _fetch_comments_for_video).
+    """
+    watermarks = watermarks or {}
+    page_tokens = page_tokens or {}
+    if client is None and not youtube: return []
+    # islice agar generator dari iter_video_ids_from_channel berhenti setelah max_videos
+    targets = list(islice(video_ids, max_videos))
+
+    def fetch(video_id: str) -> list[dict]:
+        return _fetch_comments_for_video(
+            client, video_id, max_comments_per_video, max_pages_per_video, usage,
+            since=watermarks.get(video_id), page_token=page_tokens.get(video_id), progress=progress,
+        )
+
+    if max_concurrency <= 1 or len(targets) <= 1:
+        per_video = [fetch(video_id) for video_id in targets]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(targets))) as executor:
+            per_video = list(executor.map(fetch, targets))
+
+    return [comment for comments in per_video for comment in comments]
 
-def parse_youtube_input(youtube_input: str) -> dict:
+def parse_youtube_input(youtube_input: str, client=None, usage: Optional[QuotaUsage] = None) -> dict:
     video_id_pattern = r'(?:v=|\/)([0-9A-Za-z_-]{11})'
     channel_id_pattern = r'(?:channel\/|c\/|@)([^\/\?&]+)'
 
@@ -72,7 +219,8 @@ def parse_youtube_input(youtube_input: str) -> dict:
     channel_match = re.search(channel_id_pattern, youtube_input)
     if channel_match:
         try:
-            search_response = youtube.search().list(
+            _record(usage, 'search.list')
+            search_response = _get_client(client).search().list(
                 q=channel_match.group(1), part='id', type='channel', maxResults=1
             ).execute()
             if search_response.get("items"):
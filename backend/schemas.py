@@ -32,4 +32,50 @@ class JournalEntry(JournalEntryBase):
     analysis_json: str
     owner_id: int
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class JournalEntrySummary(BaseModel):
+    id: int
+    timestamp: datetime
+    owner_id: int
+    preview: str
+    class Config:
+        orm_mode = True
+
+class AnalysisSummary(BaseModel):
+    id: int
+    timestamp: Optional[datetime] = None
+    analysis_type: str
+    predicted_archetype: Optional[str] = None
+    joker_score: Optional[float] = None
+    thanos_score: Optional[float] = None
+    positive_percent: Optional[float] = None
+    negative_percent: Optional[float] = None
+    neutral_percent: Optional[float] = None
+    brainrot_score: Optional[int] = None
+    result: Optional[dict] = None
+    class Config:
+        orm_mode = True
+
+class AnalysisPage(BaseModel):
+    items: List[AnalysisSummary]
+    next_before_id: Optional[int] = None
+
+class BehaviorNarrative(BaseModel):
+    analysis_id: int
+    analysis_status: str
+    analysis: Optional[str] = None
+
+class UserActivity(BaseModel):
+    timestamp: Optional[datetime] = None
+    url: str
+
+class AnalysisJob(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    progress: float = 0.0
+    error: Optional[str] = None
+    shared: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,11 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import fakes
+
+# config membaca environment saat import, jadi direktori data sementara dan LLM palsu diatur sebelum modul aplikasi dimuat
+fakes.configure_offline_environment()
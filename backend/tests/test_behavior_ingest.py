@@ -0,0 +1,43 @@
+import json
+
+from modules.behavior_ingest import BehaviorAccumulator
+
+
+def ndjson_line(minute, url="https://www.tiktok.com/@x/video/1"):
+    return (json.dumps({"timestamp": f"2026-01-01T00:{minute:02d}:00Z", "url": url}) + "\n").encode()
+
+
+def test_lines_split_across_chunks_are_joined():
+    accumulator = BehaviorAccumulator()
+    data = b"".join(ndjson_line(minute) for minute in range(5))
+
+    for start in range(0, len(data), 7):
+        accumulator.feed(data[start:start + 7])
+    accumulator.close()
+
+    assert accumulator.total_activities == 5
+    assert accumulator.invalid == 0
+
+
+def test_overlong_line_is_counted_invalid_without_buffering():
+    accumulator = BehaviorAccumulator(max_line_bytes=256)
+
+    accumulator.feed(ndjson_line(0))
+    for _ in range(100):
+        accumulator.feed(b"x" * 1000)
+        assert len(accumulator._buffer) <= 256
+    accumulator.feed(b"\n" + ndjson_line(1))
+    accumulator.close()
+
+    assert accumulator.total_activities == 2
+    assert accumulator.invalid == 1
+
+
+def test_overlong_last_line_without_newline_is_invalid():
+    accumulator = BehaviorAccumulator(max_line_bytes=64)
+
+    accumulator.feed(b"y" * 100)
+    accumulator.close()
+
+    assert accumulator.invalid == 1
+    assert accumulator.total_activities == 0
@@ -0,0 +1,115 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import database
+import jobs
+import models
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=database.engine)
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def users(db):
+    created = [models.User(username=f"user-{uuid.uuid4().hex[:8]}", hashed_password="x") for _ in range(3)]
+    db.add_all(created)
+    db.commit()
+    return [user.id for user in created]
+
+
+def target_key():
+    return f"video:{uuid.uuid4().hex[:11]}"
+
+
+def add_job(db, key, owner_id, heartbeat_age=0.0, status="running"):
+    # Job aktif milik worker lain, dengan heartbeat terakhir `heartbeat_age` detik yang lalu
+    job = models.AnalysisJob(
+        id=uuid.uuid4().hex, target=key, target_key=key, status=status, progress=0.5, stage="sentiment",
+        owner_id=owner_id, worker_id="worker-lain", heartbeat_at=datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age),
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def job_status(db, job_id):
+    db.expire_all()
+    return db.get(models.AnalysisJob, job_id).status
+
+
+def test_second_submit_joins_the_active_job(users):
+    key = target_key()
+    first_id, first_created, _ = jobs._join_or_create_job_row(key, key, users[0])
+    second_id, second_created, status = jobs._join_or_create_job_row(key, key, users[1])
+
+    assert first_created and not second_created
+    assert second_id == first_id
+    assert status["status"] == "queued"
+
+
+def test_job_of_another_worker_is_joined_with_its_progress(db, users):
+    key = target_key()
+    other_id = add_job(db, key, users[0])
+
+    job_id, created, status = jobs._join_or_create_job_row(key, key, users[1])
+
+    assert (job_id, created) == (other_id, False)
+    assert status == {"status": "running", "stage": "sentiment", "progress": 0.5}
+    assert db.get(models.AnalysisJobSubscriber, (other_id, users[1])) is not None
+
+
+def test_recovery_only_fails_jobs_without_a_recent_heartbeat(db, users):
+    fresh_id = add_job(db, target_key(), users[0])
+    stale_id = add_job(db, target_key(), users[0], heartbeat_age=jobs.JOB_STALE_AFTER + 5)
+
+    jobs.recover_interrupted_jobs()
+
+    assert job_status(db, fresh_id) == "running"
+    assert job_status(db, stale_id) == "failed"
+
+
+def test_stale_job_is_replaced_on_submit(db, users):
+    key = target_key()
+    stale_id = add_job(db, key, users[0], heartbeat_age=jobs.JOB_STALE_AFTER + 5)
+
+    job_id, created, _ = jobs._join_or_create_job_row(key, key, users[1])
+
+    assert created and job_id != stale_id
+    assert job_status(db, stale_id) == "failed"
+
+
+def test_finished_job_creates_analysis_for_owner_and_subscribers(db, users):
+    key = target_key()
+    job_id, _, _ = jobs._join_or_create_job_row(key, key, users[0])
+    jobs._join_or_create_job_row(key, key, users[1])
+
+    jobs._finish_job_row(job_id, {"quantitative_metrics": {"joker_score": 10, "thanos_score": 70}})
+
+    db.expire_all()
+    job = db.get(models.AnalysisJob, job_id)
+    owners = [owner_id for (owner_id,) in db.query(models.Analysis.owner_id).filter(models.Analysis.owner_id.in_(users))]
+    assert job.status == "done"
+    assert db.get(models.Analysis, job.analysis_id).owner_id == users[0]
+    assert sorted(owners) == [users[0], users[1]]
+    # Setelah selesai tidak ada yang bisa bergabung lagi: pengirim berikutnya mendapat job baru
+    next_id, created, _ = jobs._join_or_create_job_row(key, key, users[2])
+    assert created and next_id != job_id
+
+
+def test_heartbeat_does_not_overwrite_finished_job(db, users):
+    key = target_key()
+    job_id, _, _ = jobs._join_or_create_job_row(key, key, users[0])
+    jobs._finish_job_row(job_id, {})
+
+    jobs._write_heartbeats({job_id: {"status": "running", "stage": "gemini", "progress": 0.8}})
+
+    db.expire_all()
+    job = db.get(models.AnalysisJob, job_id)
+    assert (job.status, job.stage, job.progress) == ("done", None, 1.0)
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from modules.llm_client import FakeModel, LLMCache, LLMClient, LLMResponseError, prompt_key
+
+
+def fallback(message):
+    return {"fallback": True, "error": message}
+
+
+class FailingModel(FakeModel):
+    """Model yang selalu melempar error saat generate_content."""
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        raise RuntimeError("layanan tidak tersedia")
+
+
+class InterruptedModel(FakeModel):
+    """Model yang menunggu `latency` detik lalu melempar KeyboardInterrupt (BaseException)."""
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        raise KeyboardInterrupt
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm_cache.db"))
+
+
+def make_client(model, cache=None, **kwargs):
+    kwargs.setdefault("timeout", 5.0)
+    kwargs.setdefault("max_retries", 0)
+    kwargs.setdefault("backoff", 0.0)
+    kwargs.setdefault("rate_per_minute", 6000)
+    return LLMClient(model, model_name="fake", cache=cache, **kwargs)
+
+
+def test_second_request_is_served_from_cache(cache):
+    model = FakeModel(latency=0.0)
+    client = make_client(model, cache)
+
+    first = client.generate_json("prompt", fallback, required_keys=("analysis",))
+    second = client.generate_json("prompt", fallback, required_keys=("analysis",))
+
+    assert first == second == FakeModel.RESPONSE
+    assert model.calls == 1
+    assert client.stats()["cache_hits"] == 1
+
+
+def test_cache_is_shared_across_clients(cache):
+    make_client(FakeModel(latency=0.0), cache).generate_json("prompt", fallback)
+    model = FakeModel(latency=0.0)
+
+    assert make_client(model, cache).generate_json("prompt", fallback) == FakeModel.RESPONSE
+    assert model.calls == 0
+
+
+def test_model_error_returns_fallback_and_is_not_cached(cache):
+    model = FailingModel(latency=0.0)
+    client = make_client(model, cache, max_retries=1)
+
+    result = client.generate_json("prompt", fallback)
+
+    assert result["fallback"] is True
+    assert "layanan tidak tersedia" in result["error"]
+    # Satu percobaan awal ditambah satu retry
+    assert model.calls == 2
+    assert client.stats()["retries"] == 1
+    # Fallback tidak di-cache, jadi permintaan berikutnya memanggil model lagi
+    client.generate_json("prompt", fallback)
+    assert model.calls == 4
+    assert client.stats()["fallbacks"] == 2
+
+
+def test_missing_required_keys_returns_fallback_without_retry(cache):
+    model = FakeModel(latency=0.0, response={"analysis": "ok"})
+    client = make_client(model, cache, max_retries=2)
+
+    result = client.generate_json("prompt", fallback, required_keys=("challenges",))
+
+    assert result["fallback"] is True
+    assert "challenges" in result["error"]
+    assert model.calls == 1
+    assert cache.get(prompt_key("fake", "prompt")) is None
+
+
+def test_rejected_validation_returns_fallback_and_is_not_cached(cache):
+    model = FakeModel(latency=0.0)
+    client = make_client(model, cache)
+
+    def validate(value):
+        raise LLMResponseError("struktur salah")
+
+    assert client.generate_json("prompt", fallback, validate=validate)["error"] == "Error: struktur salah"
+    assert client.generate_json("prompt", fallback)["analysis"] == FakeModel.RESPONSE["analysis"]
+    assert model.calls == 2
+
+
+def test_without_model_returns_fallback():
+    client = make_client(None)
+
+    assert client.generate_json("prompt", fallback) == fallback("Analisis Gemini tidak tersedia.")
+    assert client.stats()["fallbacks"] == 1
+
+
+def test_slow_model_times_out_to_fallback():
+    client = make_client(FakeModel(latency=0.5), timeout=0.1)
+
+    result = client.generate_json("prompt", fallback)
+
+    assert result["fallback"] is True
+    assert client.stats()["timeouts"] >= 1
+
+
+def _run_concurrently(client, prompts):
+    results = [None] * len(prompts)
+
+    def worker(index, prompt):
+        results[index] = client.generate_json(prompt, fallback)
+
+    threads = [threading.Thread(target=worker, args=(i, prompt)) for i, prompt in enumerate(prompts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+def test_identical_concurrent_prompts_are_coalesced():
+    model = FakeModel(latency=0.3)
+    client = make_client(model)
+
+    results = _run_concurrently(client, ["prompt"] * 5)
+
+    assert results == [FakeModel.RESPONSE] * 5
+    assert model.calls == 1
+    assert client.stats()["coalesced"] == 4
+
+
+def test_different_prompts_are_not_coalesced():
+    model = FakeModel(latency=0.1)
+    client = make_client(model)
+
+    _run_concurrently(client, ["prompt-a", "prompt-b"])
+
+    assert model.calls == 2
+    assert client.stats()["coalesced"] == 0
+
+
+def test_waiters_get_fallback_when_leader_is_interrupted():
+    model = InterruptedModel(latency=0.3)
+    client = make_client(model)
+    outcome = {}
+
+    def leader():
+        try:
+            client.generate_json("prompt", fallback)
+        except KeyboardInterrupt:
+            outcome["leader"] = "interrupted"
+
+    def waiter():
+        outcome["waiter"] = client.generate_json("prompt", fallback)
+
+    leader_thread = threading.Thread(target=leader)
+    leader_thread.start()
+    # Pastikan pemimpin sudah mendaftarkan prompt sebagai in-flight sebelum penunggu bergabung
+    deadline = time.monotonic() + 2
+    while not client._inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    waiter_thread = threading.Thread(target=waiter)
+    waiter_thread.start()
+    leader_thread.join(timeout=5)
+    waiter_thread.join(timeout=5)
+
+    assert outcome["leader"] == "interrupted"
+    assert outcome["waiter"]["fallback"] is True
+    assert "KeyboardInterrupt" in outcome["waiter"]["error"]
+    assert client.stats()["coalesced"] == 1
+    assert not client._inflight
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from modules.result_cache import MemoryBackend, ResultCache
+
+
+def make_result(n=1):
+    return {"total_comments_analyzed": n, "api_usage": {"api_calls": 3}, "stage_timings_ms": {"fetch_comments": 12.5}}
+
+
+def test_cache_hit_drops_per_request_fields():
+    async def scenario():
+        cache = ResultCache(MemoryBackend())
+
+        async def compute():
+            return make_result()
+
+        first, first_source = await cache.get_or_compute("video:x", compute)
+        second, second_source = await cache.get_or_compute("video:x", compute)
+        return first, first_source, second, second_source
+
+    first, first_source, second, second_source = asyncio.run(scenario())
+
+    assert first_source == "computed" and first["api_usage"] == {"api_calls": 3}
+    assert second_source == "cache"
+    assert second == {"total_comments_analyzed": 1}
+
+
+def test_coalesced_waiters_share_one_computation():
+    async def scenario():
+        cache = ResultCache(MemoryBackend())
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return make_result()
+
+        results = await asyncio.gather(*(cache.get_or_compute("video:x", compute) for _ in range(3)))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert [source for _, source in results] == ["computed", "coalesced", "coalesced"]
+    assert all("api_usage" not in result for result, source in results if source == "coalesced")
+    assert cache.stats()["coalesced"] == 2 and cache.stats()["inflight"] == 0
+
+
+def test_cancelled_leader_does_not_fail_waiters():
+    async def scenario():
+        cache = ResultCache(MemoryBackend())
+
+        async def compute():
+            await asyncio.sleep(0.1)
+            return make_result()
+
+        leader = asyncio.ensure_future(cache.get_or_compute("video:x", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(cache.get_or_compute("video:x", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await waiter
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return cache, result
+
+    cache, (result, source) = asyncio.run(scenario())
+
+    assert source == "coalesced"
+    assert result == {"total_comments_analyzed": 1}
+    # Komputasi tetap selesai dan tersimpan di cache
+    assert cache.backend.get("video:x")["total_comments_analyzed"] == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = ResultCache(MemoryBackend())
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            raise ValueError("gagal")
+
+        outcomes = await asyncio.gather(
+            *(cache.get_or_compute("video:x", compute) for _ in range(2)), return_exceptions=True
+        )
+        return cache, outcomes
+
+    cache, outcomes = asyncio.run(scenario())
+
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert cache.backend.get("video:x") is None
+    assert cache.stats()["inflight"] == 0
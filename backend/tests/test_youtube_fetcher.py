@@ -0,0 +1,102 @@
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from benchmarks.fakes import FakeYouTube
+from modules import youtube_fetcher
+
+
+class FlakyYouTube(FakeYouTube):
+    """FakeYouTube yang gagal (HTTP 403) untuk video tertentu dan lebih lambat untuk video lain."""
+
+    def __init__(self, failing=(), delays=None, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failing = set(failing)
+        self.delays = delays or {}
+
+    def _list_comment_threads(self, videoId, maxResults=20, pageToken=None, **kwargs):
+        request = super()._list_comment_threads(videoId, maxResults=maxResults, pageToken=pageToken, **kwargs)
+        fetch = request._fn
+
+        def run():
+            time.sleep(self.delays.get(videoId, 0.0))
+            if videoId in self.failing:
+                raise HttpError(httplib2.Response({"status": 403}), b'{"error": "commentsDisabled"}')
+            return fetch()
+
+        request._fn = run
+        return request
+
+
+def _fetch(client, video_ids, **kwargs):
+    kwargs.setdefault("max_comments_per_video", 30)
+    return youtube_fetcher.get_comments_from_videos(video_ids, client=client, **kwargs)
+
+
+def test_http_error_on_one_video_keeps_other_videos():
+    client = FlakyYouTube(failing={"vid-b"}, comments_per_video=30)
+    progress = {}
+
+    comments = _fetch(client, ["vid-a", "vid-b", "vid-c"], max_concurrency=3, progress=progress)
+
+    video_ids = [comment["video_id"] for comment in comments]
+    assert "vid-b" not in video_ids
+    assert video_ids.count("vid-a") == 30
+    assert video_ids.count("vid-c") == 30
+    assert progress["vid-b"] == {"complete": False, "next_page_token": None, "newest": None}
+    assert progress["vid-a"]["complete"] and progress["vid-c"]["complete"]
+
+
+def test_parallel_results_follow_video_id_order():
+    video_ids = ["vid-a", "vid-b", "vid-c", "vid-d"]
+    # Video pertama paling lambat, sehingga urutan selesai di thread pool terbalik dari urutan input
+    delays = {"vid-a": 0.15, "vid-b": 0.1, "vid-c": 0.05}
+    parallel = _fetch(FlakyYouTube(delays=delays, comments_per_video=10), video_ids, max_concurrency=4)
+    sequential = _fetch(FlakyYouTube(comments_per_video=10), video_ids, max_concurrency=1)
+
+    assert [c["comment_id"] for c in parallel] == [c["comment_id"] for c in sequential]
+    assert [c["video_id"] for c in parallel] == [video_id for video_id in video_ids for _ in range(10)]
+
+
+def test_parallel_order_is_kept_when_a_middle_video_fails():
+    delays = {"vid-a": 0.1}
+    comments = _fetch(
+        FlakyYouTube(failing={"vid-b"}, delays=delays, comments_per_video=5),
+        ["vid-a", "vid-b", "vid-c"], max_concurrency=3,
+    )
+
+    assert [c["comment_id"] for c in comments] == [f"vid-a-{n}" for n in range(5)] + [f"vid-c-{n}" for n in range(5)]
+
+
+def test_watermark_stops_at_older_comments():
+    client = FlakyYouTube(comments_per_video=30)
+    # Komentar ke-n dipublikasikan n menit sebelum 2026-01-01T00:00:00Z
+    watermarks = {"vid-a": "2025-12-31T23:50:00Z"}
+    progress = {}
+
+    comments = _fetch(client, ["vid-a"], watermarks=watermarks, progress=progress)
+
+    assert [c["comment_id"] for c in comments] == [f"vid-a-{n}" for n in range(11)]
+    assert progress["vid-a"] == {"complete": True, "next_page_token": None, "newest": "2026-01-01T00:00:00Z"}
+
+
+def test_truncated_incremental_fetch_returns_resume_token():
+    client = FlakyYouTube(comments_per_video=250)
+    watermarks = {"vid-a": "2025-12-01T00:00:00Z"}
+    progress = {}
+
+    comments = _fetch(client, ["vid-a"], max_comments_per_video=100, watermarks=watermarks, progress=progress)
+
+    assert len(comments) == 100
+    assert progress["vid-a"]["complete"] is False
+    assert progress["vid-a"]["next_page_token"] == "100"
+
+
+def test_failed_calls_are_counted_in_quota_usage():
+    client = FlakyYouTube(failing={"vid-b"}, comments_per_video=5)
+    usage = youtube_fetcher.QuotaUsage()
+
+    _fetch(client, ["vid-a", "vid-b"], max_concurrency=2, usage=usage)
+
+    assert usage.as_dict()["calls_by_endpoint"] == {"commentThreads.list": 2}